@@ -59,6 +59,14 @@ class RaftNode:
         From Pseudocode 1/9
         """
         self.node_id = node_id
+        # Paths and log prefixes never change for a node, so build them once here
+        # instead of re-concatenating str(node_id) in every RPC handler.
+        self._log_dir = f"logs_node_{node_id}"
+        self._dump_path = f"{self._log_dir}/dump.txt"
+        self._logs_path = f"{self._log_dir}/logs.txt"
+        self._meta_path = f"{self._log_dir}/metadata.txt"
+        self._node_tag = f"Node {node_id}"
+        self._leader_tag = f"Leader {node_id}"
         self.current_term = 0
         self.voted_for = None
         self.log = []
@@ -90,24 +98,24 @@ class RaftNode:
         self.global_zmq_socket.bind(self_addr)
 
         # Check if folder exists else create it
-        if not os.path.exists("logs_node_"+str(node_id)):
-            os.makedirs("logs_node_"+str(node_id))
+        if not os.path.exists(self._log_dir):
+            os.makedirs(self._log_dir)
 
         if restarting == False:
-            if os.path.isfile("logs_node_"+str(node_id)+"/logs.txt"):
-                os.remove("logs_node_"+str(node_id)+"/logs.txt")
-            if os.path.isfile("logs_node_"+str(node_id)+"/metadata.txt"):
-                os.remove("logs_node_"+str(node_id)+"/metadata.txt")
-            if os.path.isfile("logs_node_"+str(node_id)+"/dump.txt"):
-                os.remove("logs_node_"+str(node_id)+"/dump.txt")
+            if os.path.isfile(self._logs_path):
+                os.remove(self._logs_path)
+            if os.path.isfile(self._meta_path):
+                os.remove(self._meta_path)
+            if os.path.isfile(self._dump_path):
+                os.remove(self._dump_path)
         else:
             self.restarting_node()
 
         
 
         # if dump.txt doesn't exist create it and don't write anything
-        if not os.path.isfile("logs_node_"+str(node_id)+"/dump.txt"):
-            with open("logs_node_"+str(node_id)+"/dump.txt", "w") as file:
+        if not os.path.isfile(self._dump_path):
+            with open(self._dump_path, "w") as file:
                 pass
 
         self.MAX_LEASE_TIMER_LEFT = 7
@@ -121,13 +129,13 @@ class RaftNode:
     def restarting_node(self):
         self.recovery_from_crash()
         # Read metadata.txt
-        with open("logs_node_"+str(self.node_id)+"/metadata.txt", "r") as file:
+        with open(self._meta_path, "r") as file:
             metadata = file.read().split(" ")
             self.commit_length = int(metadata[2])
             self.current_term = int(metadata[4])
             self.voted_for = int(metadata[-1])
         # Read logs.txt
-        with open("logs_node_"+str(self.node_id)+"/logs.txt", "r") as file:
+        with open(self._logs_path, "r") as file:
             logs = file.readlines()
             for idx, log in enumerate(logs):
                 log = log.strip()
@@ -170,16 +178,16 @@ class RaftNode:
         elif self.current_role == 'Candidate' and converting_to_leader and self.current_leader != None:
             self.lease_timer = MyTimer(self.MAX_LEASE_TIMER_LEFT, self.convert_to_leader_on_lease_timer_end)
             self.lease_timer.start()
-            with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-                file.write("Node "+str(self.node_id)+" waiting for old lease to expire \n")
-            print("Node "+str(self.node_id)+" waiting for old lease to expire ")
+            with open(self._dump_path, "a", newline="") as file:
+                file.write(f"{self._node_tag} waiting for old lease to expire \n")
+            print(f"{self._node_tag} waiting for old lease to expire ")
 
     def convert_to_leader_on_lease_timer_end(self):
         self.current_role = "Leader"
         self.current_leader = self.node_id
-        with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-            file.write("Node "+str(self.node_id)+" became the leader for term "+str(self.term)+"\n")
-        print("Node "+str(self.node_id)+" became the leader for term "+str(self.term))
+        with open(self._dump_path, "a", newline="") as file:
+            file.write(f"{self._node_tag} became the leader for term {self.term}\n")
+        print(f"{self._node_tag} became the leader for term {self.term}")
         self.cancel_timers()
         self.handle_timers()
 
@@ -191,9 +199,9 @@ class RaftNode:
 
     def step_down(self):
         if self.current_role == "Leader":
-            with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-                file.write("Leader "+str(self.node_id)+" lease timer timed out. Stepping down. \n")
-            print("Leader "+str(self.node_id)+" lease timer timed out. Stepping down.")
+            with open(self._dump_path, "a", newline="") as file:
+                file.write(f"{self._leader_tag} lease timer timed out. Stepping down. \n")
+            print(f"{self._leader_tag} lease timer timed out. Stepping down.")
             self.current_role = "Follower"
             self.voted_for = None
             self.current_leader = "None"
@@ -277,10 +285,10 @@ class RaftNode:
         """
         From Pseudocode 1/9
         """
-        with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-            file.write("Node "+str(self.node_id)+" election timer timed out, Starting election. \n")
+        with open(self._dump_path, "a", newline="") as file:
+            file.write(f"{self._node_tag} election timer timed out, Starting election. \n")
 
-        print("Node "+str(self.node_id)+" election timer timed out, Starting election. ")
+        print(f"{self._node_tag} election timer timed out, Starting election. ")
         self.current_term += 1
         self.current_role = "Candidate"
         self.voted_for = self.node_id
@@ -325,7 +333,7 @@ class RaftNode:
             t.start()
             candidate_socket.connect(candidate_socket_addr)
             candidate_socket.send(message.encode())
-            with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
+            with open(self._dump_path, "a", newline="") as file:
                 file.write("Vote Granted for Node "+str(cId)+" in term."+str(cTerm) +"\n")
             print("Vote Granted for Node "+str(cId)+" in term."+str(cTerm))
         else:
@@ -340,7 +348,7 @@ class RaftNode:
             t.start()
             candidate_socket.connect(candidate_socket_addr)
             candidate_socket.send(message.encode())
-            with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
+            with open(self._dump_path, "a", newline="") as file:
                 file.write("Vote denied for Node "+str(cId)+" in term."+str(cTerm) +"\n")
             print("Vote denied for Node "+str(cId)+" in term."+str(cTerm))
         self.handle_timers()
@@ -364,9 +372,9 @@ class RaftNode:
                 print("Slept for ", e_time - s_time , " expected was ", self.LEADER_TIME_LEFT)
                 print("Woke up")
                 self.current_role = "Leader"
-                with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-                    file.write("Node "+str(self.node_id)+" became the leader for term "+str(term)+"\n")
-                print("Node "+str(self.node_id)+" became the leader for term "+str(term))
+                with open(self._dump_path, "a", newline="") as file:
+                    file.write(f"{self._node_tag} became the leader for term {term}\n")
+                print(f"{self._node_tag} became the leader for term {term}")
                 self.current_leader = self.node_id
                 self.cancel_timers()
                 self.handle_timers()
@@ -389,9 +397,9 @@ class RaftNode:
         """
         if self.current_role == "Leader":
             self.log.append({"term": self.current_term, "message": message})
-            with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-                file.write("Leader Node "+str(self.node_id)+" received an entry request "+message+"\n")
-            print("Leader Node "+str(self.node_id)+" received an entry request "+message+"\n")
+            with open(self._dump_path, "a", newline="") as file:
+                file.write(f"Leader {self._node_tag} received an entry request {message}\n")
+            print(f"Leader {self._node_tag} received an entry request {message}\n")
             self.acked_length[str(self.node_id)] = len(self.log)
             self.COUNT_OF_SUCCESSFUL_LEASE_RENEWALS = 1
             for follower, _ in self.connections.items():
@@ -412,9 +420,9 @@ class RaftNode:
         From Pseudocode 4/9
         """
         if self.current_role == "Leader":
-            with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-                file.write("Leader "+str(self.node_id)+" sending heartbeat & Renewing Lease \n")
-            print("Leader "+str(self.node_id)+" sending heartbeat & Renewing Lease ")
+            with open(self._dump_path, "a", newline="") as file:
+                file.write(f"{self._leader_tag} sending heartbeat & Renewing Lease \n")
+            print(f"{self._leader_tag} sending heartbeat & Renewing Lease ")
             self.COUNT_OF_SUCCESSFUL_LEASE_RENEWALS = 1
             for follower, _ in self.connections.items():
                 self.replicate_log(self.node_id, follower)
@@ -465,9 +473,9 @@ class RaftNode:
             ack = prefix_len + len(suffix)
             log_response_message = "LogResponse " + str(self.node_id) + " " + str(self.current_term) + " " + str(ack) + " " + str(True)
         else:
-            with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-                    file.write("Node "+str(self.node_id)+"  rejected AppendEntries RPC from "+str(self.current_leader)+ "\n")
-            print("Node "+str(self.node_id)+"  rejected AppendEntries RPC from "+str(self.current_leader))
+            with open(self._dump_path, "a", newline="") as file:
+                    file.write(f"{self._node_tag}  rejected AppendEntries RPC from {self.current_leader}\n")
+            print(f"{self._node_tag}  rejected AppendEntries RPC from {self.current_leader}")
             log_response_message = "LogResponse " + str(self.node_id) + " " + str(self.current_term) + " " + "0" + " " + str(False)
         candidate_socket_addr = self.connections[str(self.current_leader)]
         context = zmq.Context()
@@ -491,12 +499,12 @@ class RaftNode:
         if prefix_len + len(suffix) > len(self.log):
             for i in range(len(self.log) - prefix_len, len(suffix)):
                 self.log.append(suffix[i])
-                with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-                    file.write("Node "+str(self.node_id)+"  accepted AppendEntries RPC from "+str(self.current_leader)+ "\n")
-                print("Node "+str(self.node_id)+"  accepted AppendEntries RPC from "+str(self.current_leader))
+                with open(self._dump_path, "a", newline="") as file:
+                    file.write(f"{self._node_tag}  accepted AppendEntries RPC from {self.current_leader}\n")
+                print(f"{self._node_tag}  accepted AppendEntries RPC from {self.current_leader}")
                 last_message = suffix[i]
                 last_message = last_message["message"]
-                with open("logs_node_"+str(self.node_id)+"/logs.txt", "a", newline="") as file:
+                with open(self._logs_path, "a", newline="") as file:
                     file.write(last_message +" "+str(self.current_term) +" \n")
 
         if leader_commit > self.commit_length:
@@ -505,15 +513,15 @@ class RaftNode:
                 if message.startswith("SET"):
                     _, key, value = message.split(" ")
                     self.data_truths[key] = value
-                    with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-                       file.write(" Node"+str(self.node_id) +" (follower) committed the entry "+message+" to the state machine \n")
-                    print(" Node"+str(self.node_id) +" (follower) committed the entry "+message+" to the state machine ")
+                    with open(self._dump_path, "a", newline="") as file:
+                       file.write(f" {self._node_tag} (follower) committed the entry {message} to the state machine \n")
+                    print(f" {self._node_tag} (follower) committed the entry {message} to the state machine ")
                     
             self.commit_length = leader_commit
 
-        if os.path.isfile("logs_node_"+str(self.node_id)+"/metadata.txt"):
-            os.remove("logs_node_"+str(self.node_id)+"/metadata.txt")
-        with open("logs_node_"+str(self.node_id)+"/metadata.txt", "w") as file:
+        if os.path.isfile(self._meta_path):
+            os.remove(self._meta_path)
+        with open(self._meta_path, "w") as file:
             file.write("Commit length "+str(self.commit_length)+" Term "+str(self.current_term)+" Node Voted For ID "+str(self.voted_for))
 
     def handle_log_response(self, follower_id, term, ack, success):
@@ -521,7 +529,7 @@ class RaftNode:
         From Pseudocode 8/9
         """
         # Write to disk
-        with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
+        with open(self._dump_path, "a", newline="") as file:
             file.write("Handling Log Response from Follower "+ str(follower_id) + " for term "+str(term) + " ack "+str(ack) + " success "+str(success) + "\n")
         print("Handling Log Response from Follower "+ str(follower_id) + " for term "+str(term) + " ack "+str(ack) + " success "+str(success))
         follower_id = str(follower_id)
@@ -537,8 +545,8 @@ class RaftNode:
                 self.commit_log_entries()
             elif self.sent_length[str(follower_id)] > 0:
                 # open dump
-                with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-                    file.write("Node "+str(self.node_id)+"  rejected AppendEntries RPC from "+str(follower_id)+ "hence reducing the sent length \n")
+                with open(self._dump_path, "a", newline="") as file:
+                    file.write(f"{self._node_tag}  rejected AppendEntries RPC from {follower_id}hence reducing the sent length \n")
                 self.sent_length[str(follower_id)] -= 1
                 self.replicate_log(self.node_id, str(follower_id))
         elif term > self.current_term:
@@ -572,16 +580,16 @@ class RaftNode:
                 if last_message.startswith("SET"):
                     _, key, value = last_message.split(" ")
                     self.data_truths[key] = value
-                with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-                    file.write("Leader Node "+str(self.node_id)+" committed the entry "+last_message+" to the state machine \n")
-                print("Leader Node "+str(self.node_id)+" committed the entry "+last_message+" to the state machine ")
-                with open("logs_node_"+str(self.node_id)+"/logs.txt", "a", newline="") as file:
+                with open(self._dump_path, "a", newline="") as file:
+                    file.write(f"Leader {self._node_tag} committed the entry {last_message} to the state machine \n")
+                print(f"Leader {self._node_tag} committed the entry {last_message} to the state machine ")
+                with open(self._logs_path, "a", newline="") as file:
                     file.write(last_message +" "+str(self.current_term) +" \n")
 
             self.commit_length = max_ready_index_offset_handled
-        if os.path.isfile("logs_node_"+str(self.node_id)+"/metadata.txt"):
-            os.remove("logs_node_"+str(self.node_id)+"/metadata.txt")
-        with open("logs_node_"+str(self.node_id)+"/metadata.txt", "w") as file:
+        if os.path.isfile(self._meta_path):
+            os.remove(self._meta_path)
+        with open(self._meta_path, "w") as file:
             file.write("Commit length "+str(self.commit_length)+" Term "+str(self.current_term)+" Node ID "+str(self.voted_for))
         
 
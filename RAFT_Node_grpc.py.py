@@ -63,6 +63,14 @@ class RaftNode(node_pb2_grpc.NodeServicer):
         From Pseudocode 1/9
         """
         self.node_id = node_id
+        # Paths and log prefixes never change for a node, so build them once here
+        # instead of re-concatenating str(node_id) in every RPC handler.
+        self._log_dir = f"logs_node_{node_id}"
+        self._dump_path = f"{self._log_dir}/dump.txt"
+        self._logs_path = f"{self._log_dir}/logs.txt"
+        self._meta_path = f"{self._log_dir}/metadata.txt"
+        self._node_tag = f"Node {node_id}"
+        self._leader_tag = f"Leader {node_id}"
         self.current_term = 0
         self.voted_for = None
         self.log = []
@@ -101,12 +109,12 @@ class RaftNode(node_pb2_grpc.NodeServicer):
         # self.log_file =  open("logs_node_0/logs.txt", "w")
         # TODO change the reconntruction of log file
         if restarting == False:
-            if os.path.isfile("logs_node_"+str(node_id)+"/logs.txt"):
-                os.remove("logs_node_"+str(node_id)+"/logs.txt")
-            if os.path.isfile("logs_node_"+str(node_id)+"/metadata.txt"):
-                os.remove("logs_node_"+str(node_id)+"/metadata.txt")
-            if os.path.isfile("logs_node_"+str(node_id)+"/dump.txt"):
-                os.remove("logs_node_"+str(node_id)+"/dump.txt")
+            if os.path.isfile(self._logs_path):
+                os.remove(self._logs_path)
+            if os.path.isfile(self._meta_path):
+                os.remove(self._meta_path)
+            if os.path.isfile(self._dump_path):
+                os.remove(self._dump_path)
         else:
             self.restarting_node()
 
@@ -119,13 +127,13 @@ class RaftNode(node_pb2_grpc.NodeServicer):
     def restarting_node(self):
         self.recovery_from_crash()
         # Read metadata.txt
-        with open("logs_node_"+str(self.node_id)+"/metadata.txt", "r") as file:
+        with open(self._meta_path, "r") as file:
             metadata = file.read().split(" ")
             self.commit_length = int(metadata[2])
             self.current_term = int(metadata[4])
             self.voted_for = int(metadata[-1])
         # Read logs.txt
-        with open("logs_node_"+str(self.node_id)+"/logs.txt", "r") as file:
+        with open(self._logs_path, "r") as file:
             logs = file.readlines()
             for idx, log in enumerate(logs):
                 term, message = log.split(" ")
@@ -165,16 +173,16 @@ class RaftNode(node_pb2_grpc.NodeServicer):
         elif self.current_role == 'Candidate' and converting_to_leader and self.current_leader != None:
             self.lease_timer = MyTimer(self.MAX_LEASE_TIMER_LEFT, self.convert_to_leader_on_lease_timer_end)
             self.lease_timer.start()
-            with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-                file.write("Node "+str(self.node_id)+" waiting for old lease to expire \n")
-            print("Node "+str(self.node_id)+" waiting for old lease to expire ")
+            with open(self._dump_path, "a", newline="") as file:
+                file.write(f"{self._node_tag} waiting for old lease to expire \n")
+            print(f"{self._node_tag} waiting for old lease to expire ")
 
     def convert_to_leader_on_lease_timer_end(self):
         self.current_role = "Leader"
         self.current_leader = self.node_id
-        with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-            file.write("Node "+str(self.node_id)+" became the leader for term "+str(self.term)+"\n")
-        print("Node "+str(self.node_id)+" became the leader for term "+str(self.term))
+        with open(self._dump_path, "a", newline="") as file:
+            file.write(f"{self._node_tag} became the leader for term {self.term}\n")
+        print(f"{self._node_tag} became the leader for term {self.term}")
         self.cancel_timers()
         self.handle_timers()
 
@@ -186,9 +194,9 @@ class RaftNode(node_pb2_grpc.NodeServicer):
 
     def step_down(self):
         if self.current_role == "Leader":
-            with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-                file.write("Leader "+str(self.node_id)+" lease timer timed out. Stepping down. \n")
-            print("Leader "+str(self.node_id)+" lease timer timed out. Stepping down.")
+            with open(self._dump_path, "a", newline="") as file:
+                file.write(f"{self._leader_tag} lease timer timed out. Stepping down. \n")
+            print(f"{self._leader_tag} lease timer timed out. Stepping down.")
             self.current_role = "Follower"
             self.voted_for = None
             self.cancel_timers()
@@ -212,18 +220,6 @@ class RaftNode(node_pb2_grpc.NodeServicer):
         elif message_parts[0] == "VoteResponse":
             voterId, term, granted, lease_timer_left_according_to_voter = message_parts[1:]
             self.handle_vote_response(int(voterId), int(term), granted == "True", float(lease_timer_left_according_to_voter))
-        elif message_parts[0] == "LogRequest":
-            # print(message_parts)
-            # print("Length of message parts: ", len(message_parts))
-            leader_id, term, prefix_len, prefix_term, leader_commit = message_parts[1:6]
-            lease_timer_left_according_to_leader = message_parts[-1]
-            suffix = message_parts[6:-1]
-            suffix = " ".join(suffix)
-            # print(suffix)
-            suffix = eval(suffix)
-            # print("Suffix: ", suffix)
-            lease_timer_left_according_to_leader = float(lease_timer_left_according_to_leader)
-            self.handle_log_request(int(leader_id), int(term), int(prefix_len), int(prefix_term), int(leader_commit), suffix, lease_timer_left_according_to_leader)
         elif message_parts[0] == "LogResponse":
             follower_id, term, ack, success = message_parts[1:]
             self.handle_log_response(int(follower_id), int(term), int(ack), success == "True")
@@ -252,6 +248,13 @@ class RaftNode(node_pb2_grpc.NodeServicer):
             self.set_query(key, value,return_address)
         iteration += 1
         return node_pb2.res()
+
+    def AppendEntries(self, request, context):
+        # Replaces the old text "LogRequest" message: the suffix arrives as repeated
+        # entries with a packed terms array instead of a repr()'d list that had to be eval()'d
+        suffix = [{"term": term, "message": entry.message} for entry, term in zip(request.entries, request.terms)]
+        self.handle_log_request(request.leader_id, request.term, request.prefix_len, request.prefix_term, request.leader_commit, suffix, request.lease_timer_left)
+        return node_pb2.res()
     
 
     def get_query(self, key):
@@ -292,10 +295,10 @@ class RaftNode(node_pb2_grpc.NodeServicer):
         From Pseudocode 1/9
         """
         self.cancel_timers()
-        with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-            file.write("Node "+str(self.node_id)+" election timer timed out, Starting election. \n")
+        with open(self._dump_path, "a", newline="") as file:
+            file.write(f"{self._node_tag} election timer timed out, Starting election. \n")
 
-        print("Node "+str(self.node_id)+" election timer timed out, Starting election. ")
+        print(f"{self._node_tag} election timer timed out, Starting election. ")
         self.current_term += 1
         self.current_role = "Candidate"
         self.voted_for = self.node_id
@@ -332,7 +335,7 @@ class RaftNode(node_pb2_grpc.NodeServicer):
             except Exception as e:
                 print(e)
                 print("Error occurred while sending RPC to Node "+str(n_id))
-                with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
+                with open(self._dump_path, "a", newline="") as file:
                     file.write("Error occurred while sending RPC to Node "+str(n_id)+"\n")
 
         self.handle_timers()
@@ -369,13 +372,13 @@ class RaftNode(node_pb2_grpc.NodeServicer):
             request = node_pb2.req(message= message)
             try:
                 stub.main(request)
-                with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
+                with open(self._dump_path, "a", newline="") as file:
                     file.write("Vote Granted for Node "+str(cId)+" in term."+str(cTerm) +"\n")
                 print("Vote Granted for Node "+str(cId)+" in term."+str(cTerm))
             except Exception as e:
                 print(e)
                 print("Error occurred while sending RPC to Node "+str(cId))
-                with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
+                with open(self._dump_path, "a", newline="") as file:
                     file.write("Error occurred while sending RPC to Node "+str(cId)+"\n")
 
             # Even if the one you vote for doesn't wins, you'll recieve heartbeat so no need to handle response 
@@ -400,13 +403,13 @@ class RaftNode(node_pb2_grpc.NodeServicer):
             request = node_pb2.req(message= message)
             try:
                 stub.main(request)
-                with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
+                with open(self._dump_path, "a", newline="") as file:
                     file.write("Vote denied for Node "+str(cId)+" in term."+str(cTerm) +"\n")
                 print("Vote denied for Node "+str(cId)+" in term."+str(cTerm))
             except Exception as e:
                 print(e)
                 print("Error occurred while sending RPC to Node "+str(cId))
-                with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
+                with open(self._dump_path, "a", newline="") as file:
                     file.write("Error occurred while sending RPC to Node "+str(cId)+"\n")
             # response = self.global_zmq_socket.recv().decode()
             # # Handle response
@@ -421,9 +424,9 @@ class RaftNode(node_pb2_grpc.NodeServicer):
             self.votes_received.add(voterId)
             if len(self.votes_received) >= math.ceil((len(self.connections) + 1) / 2):
                 self.current_role = "Leader"
-                with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-                    file.write("Node "+str(self.node_id)+" became the leader for term "+str(term)+"\n")
-                print("Node "+str(self.node_id)+" became the leader for term "+str(term))
+                with open(self._dump_path, "a", newline="") as file:
+                    file.write(f"{self._node_tag} became the leader for term {term}\n")
+                print(f"{self._node_tag} became the leader for term {term}")
                 self.current_leader = self.node_id
                 # Cancel election timer
                 self.cancel_timers()
@@ -432,7 +435,7 @@ class RaftNode(node_pb2_grpc.NodeServicer):
                 # Send AppendEntries to all other nodes
                 # TODO: Check if this is correct
 
-                with open("logs_node_"+str(self.node_id)+"/logs.txt", "a", newline="") as file:
+                with open(self._logs_path, "a", newline="") as file:
                     file.write("No-OP "+str(self.current_term) +"\n")
                 print("No-OP "+str(self.current_term) )
                 self.log.append({"term": self.current_term, "message": "No-OP"})
@@ -455,9 +458,9 @@ class RaftNode(node_pb2_grpc.NodeServicer):
         """
         if self.current_role == "Leader":
             self.log.append({"term": self.current_term, "message": message})
-            with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-                file.write("Leader Node "+str(self.node_id)+" received an entry request "+message+"\n")
-            print("Leader Node "+str(self.node_id)+" received an entry request "+message+"\n")
+            with open(self._dump_path, "a", newline="") as file:
+                file.write(f"Leader {self._node_tag} received an entry request {message}\n")
+            print(f"Leader {self._node_tag} received an entry request {message}\n")
             self.acked_length[self.node_id] = len(self.log)
             self.COUNT_OF_SUCCESSFUL_LEASE_RENEWALS = 0
             for follower, _ in self.connections.items():
@@ -482,7 +485,7 @@ class RaftNode(node_pb2_grpc.NodeServicer):
             except Exception as e:
                 print(e)
                 print("Error occurred while sending RPC to Node "+str(self.current_leader))
-                with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
+                with open(self._dump_path, "a", newline="") as file:
                     file.write("Error occurred while sending RPC to Node "+str(self.current_leader)+"\n")
 
     def periodic_heartbeat(self):
@@ -491,9 +494,9 @@ class RaftNode(node_pb2_grpc.NodeServicer):
         """
         if self.current_role == "Leader":
             # TODO = "Leader {NodeID of Leader} lease renewal failed. Stepping Down."
-            with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-                file.write("Leader "+str(self.node_id)+" sending heartbeat & Renewing Lease \n")
-            print("Leader "+str(self.node_id)+" sending heartbeat & Renewing Lease ")
+            with open(self._dump_path, "a", newline="") as file:
+                file.write(f"{self._leader_tag} sending heartbeat & Renewing Lease \n")
+            print(f"{self._leader_tag} sending heartbeat & Renewing Lease ")
             self.COUNT_OF_SUCCESSFUL_LEASE_RENEWALS = 0
             # self.cancel_timers()
             # self.handle_timers()
@@ -514,7 +517,16 @@ class RaftNode(node_pb2_grpc.NodeServicer):
         if prefix_len > 0:
             prefix_term = self.log[prefix_len - 1]["term"]
         lease_timer_left = self.lease_timer.remaining()
-        message = "LogRequest " + str(leader_id) + " " + str(self.current_term) + " " + str(prefix_len) + " " + str(prefix_term) + " " + str(self.commit_length) + " " + str(suffix) + " " + str(lease_timer_left)
+        request = node_pb2.AppendEntriesRequest(
+            leader_id=int(leader_id),
+            term=self.current_term,
+            prefix_len=prefix_len,
+            prefix_term=int(prefix_term),
+            leader_commit=self.commit_length,
+            lease_timer_left=lease_timer_left,
+        )
+        request.entries.extend(node_pb2.LogEntry(message=entry["message"]) for entry in suffix)
+        request.terms.extend(int(entry["term"]) for entry in suffix)
         # print("Replicate Log Message: ", message)
         # context = zmq.Context()
         # socket = context.socket(zmq.PUSH)
@@ -525,14 +537,13 @@ class RaftNode(node_pb2_grpc.NodeServicer):
         # socket.send(message.encode())
         channel = grpc.insecure_channel(self.connections[follower_id])
         stub = node_pb2_grpc.NodeStub(channel)
-        request = node_pb2.req(message= message)
         try:
-            stub.main(request)
+            stub.AppendEntries(request)
             print("Replicated log from Leader "+str(leader_id)+" to Follower "+str(follower_id))
         except Exception as e:
             print(e)
             print("Error occurred while sending RPC to Node "+str(follower_id))
-            with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
+            with open(self._dump_path, "a", newline="") as file:
                 file.write("Error occurred while sending RPC to Node "+str(follower_id)+"\n")
 
     def handle_log_request(self, leader_id, term, prefix_len, prefix_term, leader_commit, suffix, lease_timer_left_according_to_leader):
@@ -563,9 +574,9 @@ class RaftNode(node_pb2_grpc.NodeServicer):
             log_response_message = "LogResponse " + str(self.node_id) + " " + str(self.current_term) + " " + str(ack) + " " + str(True)
         else:
             # print("Rejected Append E")
-            with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-                    file.write("Node "+str(self.node_id)+"  rejected AppendEntries RPC from "+str(self.current_leader)+ "\n")
-            print("Node "+str(self.node_id)+"  rejected AppendEntries RPC from "+str(self.current_leader))
+            with open(self._dump_path, "a", newline="") as file:
+                    file.write(f"{self._node_tag}  rejected AppendEntries RPC from {self.current_leader}\n")
+            print(f"{self._node_tag}  rejected AppendEntries RPC from {self.current_leader}")
             log_response_message = "LogResponse " + str(self.node_id) + " " + str(self.current_term) + " " + "0" + " " + str(False)
         candidate_socket_addr = self.connections[str(leader_id)]
         # context = zmq.Context()
@@ -586,7 +597,7 @@ class RaftNode(node_pb2_grpc.NodeServicer):
         except Exception as e:
             print(e)
             print("Error occurred while sending RPC to Node "+str(leader_id))
-            with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
+            with open(self._dump_path, "a", newline="") as file:
                 file.write("Error occurred while sending RPC to Node "+str(leader_id)+"\n")
 
 
@@ -601,18 +612,15 @@ class RaftNode(node_pb2_grpc.NodeServicer):
                 self.log = self.log[:prefix_len]
         
         if prefix_len + len(suffix) > len(self.log):
-            for i in range(len(self.log) - prefix_len, len(suffix)):
-                self.log.append(suffix[i])
-                with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-                    file.write("Node "+str(self.node_id)+"  accepted AppendEntries RPC from "+str(self.current_leader)+ "\n")
-                print("Node "+str(self.node_id)+"  accepted AppendEntries RPC from "+str(self.current_leader))
-                # TODO: check if writing to log is correct
-                last_message = suffix[i]["message"]   
-                with open("logs_node_"+str(self.node_id)+"/logs.txt", "a", newline="") as file:
-                    file.write(last_message +" "+str(self.current_term) +" \n")
-
-
-                # write to log file
+            # Open the dump and log files once for the whole batch rather than once per entry
+            with open(self._dump_path, "a", newline="") as dump_file, open(self._logs_path, "a", newline="") as log_file:
+                for i in range(len(self.log) - prefix_len, len(suffix)):
+                    self.log.append(suffix[i])
+                    dump_file.write(f"{self._node_tag}  accepted AppendEntries RPC from {self.current_leader}\n")
+                    print(f"{self._node_tag}  accepted AppendEntries RPC from {self.current_leader}")
+                    # TODO: check if writing to log is correct
+                    last_message = suffix[i]["message"]
+                    log_file.write(last_message +" "+str(self.current_term) +" \n")
 
         if leader_commit > self.commit_length:
             for i in range(self.commit_length, leader_commit):
@@ -623,15 +631,15 @@ class RaftNode(node_pb2_grpc.NodeServicer):
                 if message.startswith("SET"):
                     _, key, value = message.split(" ")
                     self.data_truths[key] = value
-                    with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-                       file.write(" Node"+str(self.node_id) +" (follower) committed the entry "+message+" to the state machine \n")
-                    print(" Node"+str(self.node_id) +" (follower) committed the entry "+message+" to the state machine ")
+                    with open(self._dump_path, "a", newline="") as file:
+                       file.write(f" {self._node_tag} (follower) committed the entry {message} to the state machine \n")
+                    print(f" {self._node_tag} (follower) committed the entry {message} to the state machine ")
                     
             self.commit_length = leader_commit
 
-            if os.path.isfile("logs_node_"+str(self.node_id)+"/metadata.txt"):
-                os.remove("logs_node_"+str(self.node_id)+"/metadata.txt")
-            with open("logs_node_"+str(self.node_id)+"/metadata.txt", "w") as file:
+            if os.path.isfile(self._meta_path):
+                os.remove(self._meta_path)
+            with open(self._meta_path, "w") as file:
                 file.write("Commit length "+str(self.commit_length)+" Term "+str(self.current_term)+" Node Voted For ID "+str(self.voted_for))
 
     def handle_log_response(self, follower_id, term, ack, success):
@@ -653,8 +661,8 @@ class RaftNode(node_pb2_grpc.NodeServicer):
                 self.commit_log_entries()
             elif self.sent_length[follower_id] > 0:
                 # open dump
-                with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-                    file.write("Node "+str(self.node_id)+"  rejected AppendEntries RPC from "+str(follower_id)+ " hence reducing the sent length \n")
+                with open(self._dump_path, "a", newline="") as file:
+                    file.write(f"{self._node_tag}  rejected AppendEntries RPC from {follower_id} hence reducing the sent length \n")
                 self.sent_length[follower_id] -= 1
                 self.replicate_log(self.node_id, follower_id)
         elif term > self.current_term:
@@ -687,10 +695,10 @@ class RaftNode(node_pb2_grpc.NodeServicer):
                 if last_message.startswith("SET"):
                     _, key, value = last_message.split(" ")
                     self.data_truths[key] = value
-                    with open("logs_node_"+str(self.node_id)+"/dump.txt", "a", newline="") as file:
-                        file.write("Leader Node "+str(self.node_id)+" committed the entry "+last_message+" to the state machine \n")
-                    print("Leader Node "+str(self.node_id)+" committed the entry "+last_message+" to the state machine ")
-                    with open("logs_node_"+str(self.node_id)+"/logs.txt", "a", newline="") as file:
+                    with open(self._dump_path, "a", newline="") as file:
+                        file.write(f"Leader {self._node_tag} committed the entry {last_message} to the state machine \n")
+                    print(f"Leader {self._node_tag} committed the entry {last_message} to the state machine ")
+                    with open(self._logs_path, "a", newline="") as file:
                         file.write(last_message +" "+self.current_term +" \n")
                     
                 # deliver log[i].message to application
@@ -702,9 +710,9 @@ class RaftNode(node_pb2_grpc.NodeServicer):
 
 
             self.commit_length = max_ready_index_offset_handled
-            if os.path.isfile("logs_node_"+str(self.node_id)+"/metadata.txt"):
-                os.remove("logs_node_"+str(self.node_id)+"/metadata.txt")
-            with open("logs_node_"+str(self.node_id)+"/metadata.txt", "w") as file:
+            if os.path.isfile(self._meta_path):
+                os.remove(self._meta_path)
+            with open(self._meta_path, "w") as file:
                 file.write("Commit length "+str(self.commit_length)+" Term "+str(self.current_term)+" Node ID "+str(self.voted_for))
         
 
@@ -0,0 +1,65 @@
+"""
+Compiled inner loops shared by the Bloom filters in the bloom-filter-*.py
+scripts. The Redis-backed filters in bloom-filter-safe-browsing.py and
+cdn-bloom-filter-cache.py use the same block layout without the kernels.
+
+Both kernels walk the k positions of one item inside its block,
+base + ((g1 + i*g2) & (BLOCK_BITS - 1)), over the filter's bits stored as
+uint64 words (bit i is bit i % 64 of word i // 64). cache=True stores the
+compiled machine code next to this file so only the first run compiles, and
+nogil=True lets threads calling into the filters run the loops in parallel.
+"""
+import functools
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; the kernels still run as plain Python
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Every item's k bits land in one 512-bit block, i.e. a single 64-byte cache line
+BLOCK_BITS = 512
+
+
+def block_count_for(bit_size):
+    """
+    Number of blocks needed for bit_size bits, rounded up to a power of two.
+
+    A power-of-two count lets the filters pick a block with h1 & (count - 1)
+    instead of a 64-bit modulo, at the cost of up to 2x the bits.
+    """
+    blocks = -(-bit_size // BLOCK_BITS)
+    return 1 << (blocks - 1).bit_length()
+
+
+@functools.lru_cache(maxsize=None)
+def specialize(k):
+    """
+    Return (add_bits, contains_bits) compiled for a fixed hash count.
+
+    k is a closure constant, so Numba sees a constant trip count and unrolls
+    the loop; filters with the same k share one pair of kernels.
+    """
+    @njit(cache=True, nogil=True, boundscheck=False)
+    def add_bits(bits, base, g1, g2):
+        for i in range(k):
+            index = base + ((g1 + i * g2) & (BLOCK_BITS - 1))
+            bits[index >> 6] |= np.uint64(1) << np.uint64(index & 63)
+
+    @njit(cache=True, nogil=True, boundscheck=False)
+    def contains_bits(bits, base, g1, g2):
+        for i in range(k):
+            index = base + ((g1 + i * g2) & (BLOCK_BITS - 1))
+            if not (bits[index >> 6] >> np.uint64(index & 63)) & np.uint64(1):
+                return False
+        return True
+
+    # Load (or compile) both kernels now instead of on the first lookup
+    warmup = np.zeros(BLOCK_BITS // 64, dtype=np.uint64)
+    add_bits(warmup, 0, 0, 1)
+    contains_bits(warmup, 0, 0, 1)
+    return add_bits, contains_bits
@@ -0,0 +1,101 @@
+"""
+Numba-compiled hot paths of cassandra-lsm.py: the xor filter probe and
+construction, and the search for a key hash in an SSTable index.
+
+cassandra-lsm.py is a script that cannot be imported by module name, so its
+kernels live here, where cache=True can load the compiled code again on the
+next run instead of recompiling it. Each function matches a pure Python
+version in cassandra-lsm.py, which is used when Numba is not installed.
+
+All hash arithmetic is done on np.uint64 values: Numba promotes mixed
+signed/unsigned 64-bit operands to float64, which would lose hash bits.
+"""
+import numpy as np
+from numba import njit
+
+_U32 = np.uint64(0xFFFFFFFF)
+
+
+@njit(cache=True, nogil=True)
+def _mix_hash(h, seed):
+    h = h + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+    h ^= h >> np.uint64(33)
+    h *= np.uint64(0xFF51AFD7ED558CCD)
+    h ^= h >> np.uint64(33)
+    h *= np.uint64(0xC4CEB9FE1A85EC53)
+    h ^= h >> np.uint64(33)
+    return h
+
+
+@njit(cache=True, nogil=True, boundscheck=False)
+def xor_contains(table, block_length, seed, key_hash):
+    h = _mix_hash(np.uint64(key_hash), seed)
+    length = np.uint64(block_length)
+    h0 = ((h & _U32) * length) >> np.uint64(32)
+    h1 = (((h >> np.uint64(21)) & _U32) * length) >> np.uint64(32)
+    h2 = ((((h >> np.uint64(42)) | (h << np.uint64(22))) & _U32) * length) >> np.uint64(32)
+    fingerprint = (h ^ (h >> np.uint64(32))) & np.uint64(0xFF)
+    return fingerprint == np.uint64(table[h0] ^ table[h1 + length] ^ table[h2 + length + length])
+
+
+@njit(cache=True, nogil=True, boundscheck=False)
+def hash_range(key_hashes, key_hash):
+    h = np.uint64(key_hash)
+    lo, hi = 0, key_hashes.size
+    while lo < hi:
+        mid = (lo + hi) >> 1
+        if key_hashes[mid] < h:
+            lo = mid + 1
+        else:
+            hi = mid
+    end = lo
+    while end < key_hashes.size and key_hashes[end] == h:
+        end += 1
+    return lo, end
+
+
+@njit(cache=True, nogil=True)
+def xor_peel(slots, fingerprints, table):
+    n = slots.shape[0]
+    counts = np.zeros(table.size, dtype=np.int32)
+    key_xor = np.zeros(table.size, dtype=np.int64)
+    for k in range(n):
+        for j in range(3):
+            counts[slots[k, j]] += 1
+            key_xor[slots[k, j]] ^= k
+
+    queue = np.empty(table.size + 3 * n, dtype=np.int64)
+    tail = 0
+    for c in range(table.size):
+        if counts[c] == 1:
+            queue[tail] = c
+            tail += 1
+    order_keys = np.empty(n, dtype=np.int64)
+    order_slots = np.empty(n, dtype=np.int64)
+    peeled = 0
+    head = 0
+    while head < tail:
+        c = queue[head]
+        head += 1
+        if counts[c] != 1:
+            continue
+        k = key_xor[c]
+        order_keys[peeled] = k
+        order_slots[peeled] = c
+        peeled += 1
+        for j in range(3):
+            s = slots[k, j]
+            counts[s] -= 1
+            key_xor[s] ^= k
+            if counts[s] == 1:
+                queue[tail] = s
+                tail += 1
+    if peeled < n:
+        return False
+
+    for i in range(n - 1, -1, -1):
+        k = order_keys[i]
+        table[order_slots[i]] = 0
+        table[order_slots[i]] = (fingerprints[k] ^ table[slots[k, 0]]
+                                 ^ table[slots[k, 1]] ^ table[slots[k, 2]])
+    return True
@@ -1,10 +1,11 @@
 # File: auto_ssl_service.py
 
+import asyncio
+import os
 import time
-from concurrent.futures import ThreadPoolExecutor
 from cryptography import x509
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
 from cryptography.x509.oid import NameOID
 import datetime
 from acme import client, messages
@@ -21,7 +22,9 @@ logger = logging.getLogger(__name__)
 # Constants
 ACME_DIRECTORY_URL = "https://acme-v02.api.letsencrypt.org/directory"
 ACCOUNT_KEY_SIZE = 2048
-CERT_KEY_SIZE = 2048
+ACCOUNT_KEY_PATH = "acme_account_key.pem"
+# P-256 keys generate far faster than RSA-2048 and are accepted by every ACME CA
+CERT_KEY_CURVE = ec.SECP256R1()
 CERT_VALIDITY_DAYS = 90
 RENEWAL_THRESHOLD_DAYS = 30
 MAX_DOMAINS_PER_CERT = 100
@@ -35,21 +38,45 @@ class AutoSSLService:
     def __init__(self):
         self.redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
         self.acme_client = self.get_acme_client()
-        self.thread_pool = ThreadPoolExecutor(max_workers=100)
+        # Expiration timestamps per domain group, refreshed once per run() iteration
+        self.expirations = {}
+
+    def load_account_key(self):
+        # Reuse the persisted account key so restarts skip RSA keygen and keep the same ACME account
+        if os.path.exists(ACCOUNT_KEY_PATH):
+            with open(ACCOUNT_KEY_PATH, "rb") as f:
+                return serialization.load_pem_private_key(f.read(), password=None)
 
-    def get_acme_client(self):
         account_key = rsa.generate_private_key(
             public_exponent=65537,
             key_size=ACCOUNT_KEY_SIZE
         )
+        # Owner-only from the moment it exists, whatever the umask, and renamed into
+        # place so a crash never leaves a partial key behind
+        temp_path = f"{ACCOUNT_KEY_PATH}.{os.getpid()}.tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(account_key.private_bytes(
+                    encoding=serialization.Encoding.PEM,
+                    format=serialization.PrivateFormat.PKCS8,
+                    encryption_algorithm=serialization.NoEncryption()
+                ))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, ACCOUNT_KEY_PATH)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return account_key
+
+    def get_acme_client(self):
+        account_key = self.load_account_key()
         acme_client = client.ClientV2(ACME_DIRECTORY_URL, account_key)
         return acme_client
 
     def generate_csr(self, domains):
-        private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=CERT_KEY_SIZE
-        )
+        private_key = ec.generate_private_key(CERT_KEY_CURVE)
         builder = x509.CertificateSigningRequestBuilder()
         builder = builder.subject_name(x509.Name([
             x509.NameAttribute(NameOID.COMMON_NAME, domains[0]),
@@ -61,71 +88,98 @@ class AutoSSLService:
         csr = builder.sign(private_key, hashes.SHA256())
         return private_key, csr
 
-    def perform_dns_challenge(self, domain, token, validation):
+    async def perform_dns_challenge(self, domain, token, validation):
         # Implement DNS challenge logic here
         # This would typically involve updating DNS records
         pass
 
-    def request_certificate(self, domains):
-        private_key, csr = self.generate_csr(domains)
-        order = self.acme_client.new_order(csr)
+    async def answer_authorization(self, authorization):
+        domain = authorization.body.identifier.value
+        challenge = next(c for c in authorization.body.challenges if c.typ == "dns-01")
+        token = challenge.token
+        # The ACME client is blocking, so keep its HTTP calls off the event loop
+        validation = await asyncio.to_thread(self.acme_client.answer_challenge, challenge, token)
 
-        for authorization in order.authorizations:
-            domain = authorization.body.identifier.value
-            challenge = next(c for c in authorization.body.challenges if c.typ == "dns-01")
-            token = challenge.token
-            validation = self.acme_client.answer_challenge(challenge, token)
+        await self.perform_dns_challenge(domain, token, validation)
 
-            self.perform_dns_challenge(domain, token, validation)
+        # Wait for DNS propagation
+        await asyncio.sleep(60)
 
-            # Wait for DNS propagation
-            time.sleep(60)
+        await asyncio.to_thread(self.acme_client.answer_challenge, challenge, validation)
 
-            self.acme_client.answer_challenge(challenge, validation)
+    async def request_certificate(self, domains):
+        private_key, csr = self.generate_csr(domains)
+        order = await asyncio.to_thread(self.acme_client.new_order, csr)
+
+        # Every authorization waits out DNS propagation independently, so answer them concurrently
+        await asyncio.gather(*(self.answer_authorization(authorization) for authorization in order.authorizations))
 
-        finalized_order = self.acme_client.finalize_order(order, csr)
+        finalized_order = await asyncio.to_thread(self.acme_client.finalize_order, order, csr)
         return private_key, finalized_order.fullchain_pem
 
+    def certificate_key(self, domains):
+        return f"ssl:{','.join(domains)}"
+
     def store_certificate(self, domains, private_key, cert_pem):
-        key = f"ssl:{','.join(domains)}"
-        data = {
-            "private_key": private_key.private_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PrivateFormat.PKCS8,
-                encryption_algorithm=serialization.NoEncryption()
-            ).decode(),
-            "cert_pem": cert_pem,
-            "expiration": int((datetime.datetime.utcnow() + datetime.timedelta(days=CERT_VALIDITY_DAYS)).timestamp())
-        }
-        self.redis_client.hmset(key, data)
+        self.store_certificates([(domains, private_key, cert_pem)])
+
+    def store_certificates(self, certificates):
+        # Queue every renewed certificate and write them in a single round trip
+        pipe = self.redis_client.pipeline(transaction=False)
+        expiration = int((datetime.datetime.utcnow() + datetime.timedelta(days=CERT_VALIDITY_DAYS)).timestamp())
+        for domains, private_key, cert_pem in certificates:
+            data = {
+                "private_key": private_key.private_bytes(
+                    encoding=serialization.Encoding.PEM,
+                    format=serialization.PrivateFormat.PKCS8,
+                    encryption_algorithm=serialization.NoEncryption()
+                ).decode(),
+                "cert_pem": cert_pem,
+                "expiration": expiration
+            }
+            pipe.hset(self.certificate_key(domains), mapping=data)
+            self.expirations[tuple(domains)] = expiration
+        pipe.execute()
 
     def get_certificate(self, domains):
-        key = f"ssl:{','.join(domains)}"
-        data = self.redis_client.hgetall(key)
+        data = self.redis_client.hgetall(self.certificate_key(domains))
         if data:
             return data[b"private_key"].decode(), data[b"cert_pem"].decode()
         return None, None
 
+    def load_expirations(self, domain_groups):
+        pipe = self.redis_client.pipeline(transaction=False)
+        for domains in domain_groups:
+            pipe.hget(self.certificate_key(domains), "expiration")
+        self.expirations = {
+            tuple(domains): int(expiration) if expiration else None
+            for domains, expiration in zip(domain_groups, pipe.execute())
+        }
+
     def needs_renewal(self, domains):
-        key = f"ssl:{','.join(domains)}"
-        expiration = self.redis_client.hget(key, "expiration")
+        group = tuple(domains)
+        if group in self.expirations:
+            expiration = self.expirations[group]
+        else:
+            expiration = self.redis_client.hget(self.certificate_key(domains), "expiration")
         if expiration:
             expiration = int(expiration)
             return (expiration - time.time()) < (RENEWAL_THRESHOLD_DAYS * 24 * 3600)
         return True
 
-    def process_domain_group(self, domains):
+    async def process_domain_group(self, domains):
         try:
             if self.needs_renewal(domains):
                 logger.info(f"Renewing certificate for domains: {domains}")
-                private_key, cert_pem = self.request_certificate(domains)
-                self.store_certificate(domains, private_key, cert_pem)
+                private_key, cert_pem = await self.request_certificate(domains)
+                return domains, private_key, cert_pem
             else:
                 logger.info(f"Certificate for domains {domains} is still valid")
         except Exception as e:
             logger.error(f"Error processing domains {domains}: {str(e)}")
+        return None
 
-    def run(self):
+    async def run(self):
         while True:
             # Fetch domains from your platform's database or API
             all_domains = self.fetch_all_domains()
@@ -133,11 +187,21 @@ class AutoSSLService:
             # Group domains (max 100 per certificate)
             domain_groups = [all_domains[i:i + MAX_DOMAINS_PER_CERT] for i in range(0, len(all_domains), MAX_DOMAINS_PER_CERT)]
 
-            # Process domain groups in parallel
-            self.thread_pool.map(self.process_domain_group, domain_groups)
+            # One pipelined read for every group's expiration instead of a round trip per group
+            self.load_expirations(domain_groups)
+
+            # Process domain groups concurrently, storing each certificate as soon as
+            # it is issued so a slow or failing order doesn't hold back the others
+            for processed in asyncio.as_completed([self.process_domain_group(domains) for domains in domain_groups]):
+                try:
+                    result = await processed
+                    if result is not None:
+                        self.store_certificate(*result)
+                except Exception as e:
+                    logger.error(f"Error renewing certificate: {str(e)}")
 
             # Sleep for a day before the next check
-            time.sleep(24 * 3600)
+            await asyncio.sleep(24 * 3600)
 
     def fetch_all_domains(self):
         # Implement logic to fetch all domains from your platform
@@ -146,4 +210,4 @@ class AutoSSLService:
 
 if __name__ == "__main__":
     service = AutoSSLService()
-    service.run()
+    asyncio.run(service.run())
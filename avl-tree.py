@@ -1,4 +1,6 @@
 class Node:
+    __slots__ = ("key", "left", "right", "height")
+
     def __init__(self, key):
         self.key = key
         self.left = None
@@ -6,110 +8,135 @@ class Node:
         self.height = 1
 
 class AVLTree:
-    def getHeight(self, node):
-        if not node:
-            return 0
-        return node.height
-    
-    def getBalance(self, node):
+    @staticmethod
+    def getHeight(node):
+        return node.height if node else 0
+
+    @staticmethod
+    def getBalance(node):
         if not node:
             return 0
-        return self.getHeight(node.left) - self.getHeight(node.right)
-    
+        return (node.left.height if node.left else 0) - (node.right.height if node.right else 0)
+
     def rightRotate(self, y):
         x = y.left
         T2 = x.right
         x.right = y
         y.left = T2
-        y.height = max(self.getHeight(y.left), self.getHeight(y.right)) + 1
-        x.height = max(self.getHeight(x.left), self.getHeight(x.right)) + 1
+        lh = T2.height if T2 else 0
+        rh = y.right.height if y.right else 0
+        y.height = (lh if lh > rh else rh) + 1
+        lh = x.left.height if x.left else 0
+        rh = y.height
+        x.height = (lh if lh > rh else rh) + 1
         return x
-    
+
     def leftRotate(self, x):
         y = x.right
         T2 = y.left
         y.left = x
         x.right = T2
-        x.height = max(self.getHeight(x.left), self.getHeight(x.right)) + 1
-        y.height = max(self.getHeight(y.left), self.getHeight(y.right)) + 1
+        lh = x.left.height if x.left else 0
+        rh = T2.height if T2 else 0
+        x.height = (lh if lh > rh else rh) + 1
+        lh = x.height
+        rh = y.right.height if y.right else 0
+        y.height = (lh if lh > rh else rh) + 1
         return y
-    
+
+    def rebalance(self, node):
+        left = node.left
+        right = node.right
+        lh = left.height if left else 0
+        rh = right.height if right else 0
+        node.height = (lh if lh > rh else rh) + 1
+        balance = lh - rh
+
+        if balance > 1:
+            # Left Right
+            if (left.left.height if left.left else 0) < (left.right.height if left.right else 0):
+                node.left = self.leftRotate(left)
+            # Left Left
+            return self.rightRotate(node)
+
+        if balance < -1:
+            # Right Left
+            if (right.left.height if right.left else 0) > (right.right.height if right.right else 0):
+                node.right = self.rightRotate(right)
+            # Right Right
+            return self.leftRotate(node)
+
+        return node
+
+    def retrace(self, path):
+        # Walk back up the recorded path, rebalancing each ancestor and
+        # re-linking whichever subtree root the rotation produced.
+        node = None
+        for i in range(len(path) - 1, -1, -1):
+            old = path[i]
+            node = self.rebalance(old)
+            if i > 0:
+                parent = path[i - 1]
+                if parent.left is old:
+                    parent.left = node
+                else:
+                    parent.right = node
+        return node
+
     def insert(self, root, key):
         if not root:
             return Node(key)
-            
-        if key < root.key:
-            root.left = self.insert(root.left, key)
-        elif key > root.key:
-            root.right = self.insert(root.right, key)
+
+        path = []
+        node = root
+        while node:
+            if key < node.key:
+                path.append(node)
+                node = node.left
+            elif key > node.key:
+                path.append(node)
+                node = node.right
+            else:
+                return root
+
+        parent = path[-1]
+        if key < parent.key:
+            parent.left = Node(key)
         else:
-            return root
-        
-        root.height = max(self.getHeight(root.left), self.getHeight(root.right)) + 1
-        balance = self.getBalance(root)
-        
-        # Left Left
-        if balance > 1 and key < root.left.key:
-            return self.rightRotate(root)
-        
-        # Right Right
-        if balance < -1 and key > root.right.key:
-            return self.leftRotate(root)
-        
-        # Left Right
-        if balance > 1 and key > root.left.key:
-            root.left = self.leftRotate(root.left)
-            return self.rightRotate(root)
-        
-        # Right Left
-        if balance < -1 and key < root.right.key:
-            root.right = self.rightRotate(root.right)
-            return self.leftRotate(root)
-        
-        return root
-    
+            parent.right = Node(key)
+        return self.retrace(path)
+
     def delete(self, root, key):
-        if not root:
+        path = []
+        node = root
+        while node and key != node.key:
+            path.append(node)
+            node = node.left if key < node.key else node.right
+
+        if not node:
             return root
-            
-        if key < root.key:
-            root.left = self.delete(root.left, key)
-        elif key > root.key:
-            root.right = self.delete(root.right, key)
+
+        if node.left and node.right:
+            # Replace the key with the inorder successor and unlink that node instead
+            path.append(node)
+            successor = node.right
+            while successor.left:
+                path.append(successor)
+                successor = successor.left
+            node.key = successor.key
+            node, child = successor, successor.right
         else:
-            if not root.left:
-                return root.right
-            elif not root.right:
-                return root.left
-            temp = self.getMinValueNode(root.right)
-            root.key = temp.key
-            root.right = self.delete(root.right, temp.key)
-            
-        if not root:
-            return root
-            
-        root.height = max(self.getHeight(root.left), self.getHeight(root.right)) + 1
-        balance = self.getBalance(root)
-        
-        # Left Left
-        if balance > 1 and self.getBalance(root.left) >= 0:
-            return self.rightRotate(root)
-        
-        # Right Right
-        if balance < -1 and self.getBalance(root.right) <= 0:
-            return self.leftRotate(root)
-        
-        # Left Right
-        if balance > 1 and self.getBalance(root.left) < 0:
-            root.left = self.leftRotate(root.left)
-            return self.rightRotate(root)
-        
-        # Right Left
-        if balance < -1 and self.getBalance(root.right) > 0:
-            root.right = self.rightRotate(root.right)
-            return self.leftRotate(root)
-            
-        return root
+            child = node.left if node.left else node.right
+
+        if not path:
+            return child
+
+        parent = path[-1]
+        if parent.left is node:
+            parent.left = child
+        else:
+            parent.right = child
+        return self.retrace(path)
         
     def getMinValueNode(self, root):
         current = root
@@ -118,6 +145,14 @@ class AVLTree:
         return current
 
     def inorderTraversal(self, root):
-        if not root:
-            return []
-        return self.inorderTraversal(root.left) + [root.key] + self.inorderTraversal(root.right)
+        result = []
+        stack = []
+        node = root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            result.append(node.key)
+            node = node.right
+        return result
\ No newline at end of file
@@ -0,0 +1,176 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+# Cython port of avl-tree.py. Build in place with `cythonize -i avl_tree.pyx`,
+# then `from avl_tree import AVLTree, Node` - the API matches the pure Python tree.
+
+cdef class Node:
+    cdef public object key
+    cdef public Node left
+    cdef public Node right
+    cdef public int height
+
+    def __init__(self, key):
+        self.key = key
+        self.left = None
+        self.right = None
+        self.height = 1
+
+
+cdef inline int _height(Node node):
+    return node.height if node is not None else 0
+
+
+cdef inline void _update_height(Node node):
+    cdef int lh = _height(node.left)
+    cdef int rh = _height(node.right)
+    node.height = (lh if lh > rh else rh) + 1
+
+
+cdef inline int _balance(Node node):
+    if node is None:
+        return 0
+    return _height(node.left) - _height(node.right)
+
+
+cdef inline Node _right_rotate(Node y):
+    cdef Node x = y.left
+    y.left = x.right
+    x.right = y
+    _update_height(y)
+    _update_height(x)
+    return x
+
+
+cdef inline Node _left_rotate(Node x):
+    cdef Node y = x.right
+    x.right = y.left
+    y.left = x
+    _update_height(x)
+    _update_height(y)
+    return y
+
+
+cdef Node _rebalance(Node node):
+    _update_height(node)
+    cdef int balance = _balance(node)
+
+    if balance > 1:
+        # Left Right
+        if _balance(node.left) < 0:
+            node.left = _left_rotate(node.left)
+        # Left Left
+        return _right_rotate(node)
+
+    if balance < -1:
+        # Right Left
+        if _balance(node.right) > 0:
+            node.right = _right_rotate(node.right)
+        # Right Right
+        return _left_rotate(node)
+
+    return node
+
+
+cdef Node _retrace(list path):
+    cdef Py_ssize_t i
+    cdef Node old, parent
+    cdef Node node = None
+    for i in range(len(path) - 1, -1, -1):
+        old = <Node>path[i]
+        node = _rebalance(old)
+        if i > 0:
+            parent = <Node>path[i - 1]
+            if parent.left is old:
+                parent.left = node
+            else:
+                parent.right = node
+    return node
+
+
+cdef class AVLTree:
+    cpdef int getHeight(self, Node node):
+        return _height(node)
+
+    cpdef int getBalance(self, Node node):
+        return _balance(node)
+
+    cpdef Node rightRotate(self, Node y):
+        return _right_rotate(y)
+
+    cpdef Node leftRotate(self, Node x):
+        return _left_rotate(x)
+
+    cpdef Node insert(self, Node root, key):
+        if root is None:
+            return Node(key)
+
+        cdef list path = []
+        cdef Node node = root
+        while node is not None:
+            if key < node.key:
+                path.append(node)
+                node = node.left
+            elif key > node.key:
+                path.append(node)
+                node = node.right
+            else:
+                return root
+
+        cdef Node parent = <Node>path[len(path) - 1]
+        if key < parent.key:
+            parent.left = Node(key)
+        else:
+            parent.right = Node(key)
+        return _retrace(path)
+
+    cpdef Node delete(self, Node root, key):
+        cdef list path = []
+        cdef Node node = root
+        cdef Node child, successor, parent
+        while node is not None and key != node.key:
+            path.append(node)
+            node = node.left if key < node.key else node.right
+
+        if node is None:
+            return root
+
+        if node.left is not None and node.right is not None:
+            # Replace the key with the inorder successor and unlink that node instead
+            path.append(node)
+            successor = node.right
+            while successor.left is not None:
+                path.append(successor)
+                successor = successor.left
+            node.key = successor.key
+            node = successor
+            child = successor.right
+        else:
+            child = node.left if node.left is not None else node.right
+
+        if not path:
+            return child
+
+        parent = <Node>path[len(path) - 1]
+        if parent.left is node:
+            parent.left = child
+        else:
+            parent.right = child
+        return _retrace(path)
+
+    cpdef Node getMinValueNode(self, Node root):
+        cdef Node current = root
+        while current.left is not None:
+            current = current.left
+        return current
+
+    cpdef list inorderTraversal(self, Node root):
+        cdef list result = []
+        cdef list stack = []
+        cdef Node node = root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = <Node>stack.pop()
+            result.append(node.key)
+            node = node.right
+        return result
@@ -1,19 +1,30 @@
+import math
 import mmh3
-from bitarray import bitarray
+import numpy as np
+from _bloom_kernels import BLOCK_BITS, block_count_for, specialize
 import redis
-from typing import List, Set, Tuple, Optional
+from typing import Dict, List, Set, Tuple, Optional
 import logging
 import time
 import json
 
 class BloomFilter:
-    def __init__(self, capacity: int, error_rate: float = 0.01):
+    def __init__(self, capacity: int, error_rate: float = 0.01, bits: Optional[np.ndarray] = None):
         self.capacity = capacity
         self.error_rate = error_rate
-        self.bit_size = self._get_size(capacity, error_rate)
+        self.block_count = block_count_for(self._get_size(capacity, error_rate))
+        self.block_mask = self.block_count - 1
+        self.bit_size = self.block_count * BLOCK_BITS
         self.hash_count = self._get_hash_count(self.bit_size, capacity)
-        self.bit_array = bitarray(self.bit_size)
-        self.bit_array.setall(0)
+        # bit_size is a whole number of blocks, so it always divides into 64-bit words;
+        # a loaded filter passes its words in and skips zeroing a fresh array
+        if bits is None:
+            bits = np.zeros(self.bit_size >> 6, dtype=np.uint64)
+        elif bits.size << 6 != self.bit_size:
+            raise ValueError("Bit array does not match the filter size")
+        self.bits = bits
+        # Kernels compiled with hash_count as a constant
+        self._add_bits, self._contains_bits = specialize(self.hash_count)
     
     @staticmethod
     def _get_size(n: int, p: float) -> int:
@@ -26,38 +37,59 @@ class BloomFilter:
         return int(k)
     
     def add(self, item: str) -> None:
-        for i in range(self.hash_count):
-            index = mmh3.hash(item, i) % self.bit_size
-            self.bit_array[index] = 1
+        # One 128-bit hash: h1 picks the block, and the k in-block offsets are derived
+        # from the halves of h2 as g1 + i*g2 (Kirsch-Mitzenmacher, odd step so they differ)
+        h1, h2 = mmh3.hash64(item, signed=False)
+        base = (h1 & self.block_mask) * BLOCK_BITS
+        self._add_bits(self.bits, base, h2 & 0xFFFFFFFF, (h2 >> 32) | 1)
     
     def contains(self, item: str) -> bool:
-        for i in range(self.hash_count):
-            index = mmh3.hash(item, i) % self.bit_size
-            if not self.bit_array[index]:
-                return False
-        return True
+        h1, h2 = mmh3.hash64(item, signed=False)
+        base = (h1 & self.block_mask) * BLOCK_BITS
+        return self._contains_bits(self.bits, base, h2 & 0xFFFFFFFF, (h2 >> 32) | 1)
 
 class DistributedBloomFilter:
-    def __init__(self, redis_client: redis.Redis, key: str, capacity: int, error_rate: float = 0.01):
+    def __init__(self, redis_client: redis.Redis, key: str, capacity: int, error_rate: float = 0.01,
+                 load: bool = True, bloom_data: Optional[bytes] = None):
         self.redis = redis_client
         self.key = key
-        self.bloom_filter = BloomFilter(capacity, error_rate)
-        self._load_or_initialize()
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.dirty = False
+        # Only build an empty (zeroed) filter when there is nothing to load
+        if bloom_data:
+            self.load_bytes(bloom_data)
+        elif load:
+            self._load_or_initialize()
+        else:
+            self.bloom_filter = BloomFilter(capacity, error_rate)
     
     def _load_or_initialize(self) -> None:
         bloom_data = self.redis.get(self.key)
         if bloom_data:
-            self.bloom_filter.bit_array = bitarray()
-            self.bloom_filter.bit_array.frombytes(bloom_data)
+            self.load_bytes(bloom_data)
         else:
+            self.bloom_filter = BloomFilter(self.capacity, self.error_rate)
             self._save_to_redis()
     
-    def _save_to_redis(self) -> None:
-        self.redis.set(self.key, self.bloom_filter.bit_array.tobytes())
+    def load_bytes(self, bloom_data: bytes) -> None:
+        # frombuffer views the reply read-only; copy() makes the one writable array
+        bits = np.frombuffer(bloom_data, dtype=np.uint64).copy()
+        self.bloom_filter = BloomFilter(self.capacity, self.error_rate, bits)
+    
+    def _save_to_redis(self, client: Optional[redis.Redis] = None) -> None:
+        # client may be a pipeline so the save can share a round trip with other commands
+        (client or self.redis).set(self.key, self.bloom_filter.bits.tobytes())
     
     def add(self, item: str) -> None:
+        # Only mark the filter dirty; callers flush() once after a batch of adds
         self.bloom_filter.add(item)
-        self._save_to_redis()
+        self.dirty = True
+    
+    def flush(self, client: Optional[redis.Redis] = None) -> None:
+        if self.dirty:
+            self._save_to_redis(client)
+            self.dirty = False
     
     def contains(self, item: str) -> bool:
         return self.bloom_filter.contains(item)
@@ -72,26 +104,39 @@ class FriendSuggestionSystem:
     def get_user_filter(self, user_id: str) -> DistributedBloomFilter:
         return DistributedBloomFilter(self.redis, f"user:{user_id}:friends", self.capacity, self.error_rate)
     
+    def get_user_filters(self, user_ids: List[str]) -> Dict[str, DistributedBloomFilter]:
+        # Fetch every requested filter with one MGET instead of a GET per user
+        user_ids = list(dict.fromkeys(user_ids))
+        keys = [f"user:{user_id}:friends" for user_id in user_ids]
+        filters = {}
+        for user_id, key, bloom_data in zip(user_ids, keys, self.redis.mget(keys)):
+            filters[user_id] = DistributedBloomFilter(self.redis, key, self.capacity, self.error_rate,
+                                                      load=False, bloom_data=bloom_data)
+        return filters
+    
     def add_friend(self, user_id: str, friend_id: str) -> None:
         user_filter = self.get_user_filter(user_id)
         user_filter.add(friend_id)
+        user_filter.flush()
         self.logger.info(f"Added friend {friend_id} to user {user_id}")
     
     def might_have_common_friends(self, user1_id: str, user2_id: str) -> bool:
-        user1_filter = self.get_user_filter(user1_id)
-        user2_filter = self.get_user_filter(user2_id)
-        
-        # Check if any of user1's friends might be in user2's filter
-        for i in range(user1_filter.bloom_filter.bit_size):
-            if user1_filter.bloom_filter.bit_array[i] and user2_filter.bloom_filter.bit_array[i]:
-                return True
-        return False
+        filters = self.get_user_filters([user1_id, user2_id])
+        return self._filters_overlap(filters[user1_id], filters[user2_id])
+    
+    @staticmethod
+    def _filters_overlap(user1_filter: DistributedBloomFilter, user2_filter: DistributedBloomFilter) -> bool:
+        # Check if any of user1's friends might be in user2's filter with one
+        # vectorized AND-reduction over the two uint64 word arrays
+        return bool(np.any(user1_filter.bloom_filter.bits & user2_filter.bloom_filter.bits))
     
     def suggest_friends(self, user_id: str, potential_friends: List[str]) -> List[str]:
-        user_filter = self.get_user_filter(user_id)
+        # Load the user's and every candidate's filter up front so the checks below run locally
+        filters = self.get_user_filters([user_id] + potential_friends)
+        user_filter = filters[user_id]
         suggestions = [
             friend for friend in potential_friends
-            if self.might_have_common_friends(user_id, friend) and not user_filter.contains(friend)
+            if self._filters_overlap(user_filter, filters[friend]) and not user_filter.contains(friend)
         ]
         self.logger.info(f"Suggested {len(suggestions)} friends for user {user_id}")
         return suggestions
@@ -103,14 +148,9 @@ class QueryCache:
         self.ttl = ttl
         self.logger = logging.getLogger(__name__)
     
-    def should_cache(self, query: str) -> bool:
-        if not self.bloom_filter.contains(query):
-            self.bloom_filter.add(query)
-            return True
-        return False
-    
     def get(self, query: str) -> Optional[str]:
-        if self.should_cache(query):
+        # A negative filter check means the query was never cached; skip the GET
+        if not self.bloom_filter.contains(query):
             return None
         
         result = self.redis.get(f"query_cache:{query}")
@@ -121,9 +161,13 @@ class QueryCache:
         return None
     
     def set(self, query: str, result: str) -> None:
-        if self.should_cache(query):
-            self.redis.setex(f"query_cache:{query}", self.ttl, result)
-            self.logger.info(f"Cached result for query: {query}")
+        # Record the query in the filter and store the result in one round trip
+        self.bloom_filter.add(query)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.setex(f"query_cache:{query}", self.ttl, result)
+        self.bloom_filter.flush(pipe)
+        pipe.execute()
+        self.logger.info(f"Cached result for query: {query}")
 
 def simulate_friend_suggestions():
     redis_client = redis.Redis(host='localhost', port=6379, db=0)
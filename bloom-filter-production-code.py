@@ -1,25 +1,35 @@
 import math
 import mmh3
-from bitarray import bitarray
-import pickle
+import numpy as np
+from _bloom_kernels import BLOCK_BITS, block_count_for, specialize
 import redis
 from typing import Any, List, Optional
 import logging
 
 class BloomFilter:
-    def __init__(self, capacity: int, error_rate: float = 0.01):
+    def __init__(self, capacity: int, error_rate: float = 0.01, bits: Optional[np.ndarray] = None):
         """
         Initialize a Bloom Filter.
         
         :param capacity: The expected number of items to be added
         :param error_rate: The desired false positive probability
+        :param bits: Existing uint64 bit words to use instead of an empty array
         """
         self.capacity = capacity
         self.error_rate = error_rate
-        self.bit_size = self._get_size(capacity, error_rate)
+        self.block_count = block_count_for(self._get_size(capacity, error_rate))
+        self.block_mask = self.block_count - 1
+        self.bit_size = self.block_count * BLOCK_BITS
         self.hash_count = self._get_hash_count(self.bit_size, capacity)
-        self.bit_array = bitarray(self.bit_size)
-        self.bit_array.setall(0)
+        # bit_size is a whole number of blocks, so it always divides into 64-bit words;
+        # a loaded filter passes its words in and skips zeroing a fresh array
+        if bits is None:
+            bits = np.zeros(self.bit_size >> 6, dtype=np.uint64)
+        elif bits.size << 6 != self.bit_size:
+            raise ValueError("Bit array does not match the filter size")
+        self.bits = bits
+        # Kernels compiled with hash_count as a constant
+        self._add_bits, self._contains_bits = specialize(self.hash_count)
     
     @staticmethod
     def _get_size(n: int, p: float) -> int:
@@ -33,23 +43,28 @@ class BloomFilter:
         k = (m / n) * math.log(2)
         return int(k)
     
+    @staticmethod
+    def _encode(item: Any) -> bytes:
+        """Encode an item once to the UTF-8 bytes of str(item) that get hashed."""
+        return (item if isinstance(item, str) else str(item)).encode()
+    
     def add(self, item: Any) -> None:
         """Add an item to the Bloom filter."""
-        for i in range(self.hash_count):
-            index = mmh3.hash(str(item), i) % self.bit_size
-            self.bit_array[index] = 1
+        # One 128-bit hash: h1 picks the block, and the k in-block offsets are derived
+        # from the halves of h2 as g1 + i*g2 (Kirsch-Mitzenmacher, odd step so they differ)
+        h1, h2 = mmh3.hash64(self._encode(item), signed=False)
+        base = (h1 & self.block_mask) * BLOCK_BITS
+        self._add_bits(self.bits, base, h2 & 0xFFFFFFFF, (h2 >> 32) | 1)
     
     def contains(self, item: Any) -> bool:
         """Check if an item is in the Bloom filter."""
-        for i in range(self.hash_count):
-            index = mmh3.hash(str(item), i) % self.bit_size
-            if not self.bit_array[index]:
-                return False
-        return True
+        h1, h2 = mmh3.hash64(self._encode(item), signed=False)
+        base = (h1 & self.block_mask) * BLOCK_BITS
+        return self._contains_bits(self.bits, base, h2 & 0xFFFFFFFF, (h2 >> 32) | 1)
     
     def __len__(self) -> int:
         """Return the number of bits set to 1."""
-        return self.bit_array.count(1)
+        return int(np.bitwise_count(self.bits).sum())
 
 class DistributedBloomFilter:
     def __init__(self, redis_host: str, redis_port: int, redis_db: int, 
@@ -70,39 +85,71 @@ class DistributedBloomFilter:
         self.error_rate = error_rate
         self.key_prefix = key_prefix
         self.logger = logging.getLogger(__name__)
+        self.dirty = False
         
         # Create or load the Bloom filter
         bloom_key = f"{self.key_prefix}:filter"
         if not self.redis.exists(bloom_key):
             self.bloom_filter = BloomFilter(capacity, error_rate)
+            self._save_meta()
             self._save_to_redis()
         else:
             self._load_from_redis()
     
     def add(self, item: Any) -> None:
-        """Add an item to the Distributed Bloom Filter."""
+        """
+        Add an item to the Distributed Bloom Filter.
+        
+        The change is kept in memory until flush() is called.
+        """
         self.bloom_filter.add(item)
-        self._save_to_redis()
+        self.dirty = True
+    
+    def flush(self) -> None:
+        """Write pending additions to Redis in a single SET."""
+        if self.dirty:
+            self._save_to_redis()
+            self.dirty = False
     
     def contains(self, item: Any) -> bool:
         """Check if an item is in the Distributed Bloom Filter."""
         return self.bloom_filter.contains(item)
     
+    def _save_meta(self) -> None:
+        """Save the filter parameters to Redis; they never change after creation."""
+        meta_key = f"{self.key_prefix}:meta"
+        try:
+            self.redis.hset(meta_key, mapping={
+                'capacity': self.bloom_filter.capacity,
+                'error_rate': self.bloom_filter.error_rate,
+                'bit_size': self.bloom_filter.bit_size,
+                'hash_count': self.bloom_filter.hash_count,
+            })
+        except Exception as e:
+            self.logger.error(f"Failed to save Bloom filter metadata to Redis: {str(e)}")
+    
     def _save_to_redis(self) -> None:
-        """Save the Bloom filter to Redis."""
+        """Save the Bloom filter's raw bit buffer to Redis."""
         bloom_key = f"{self.key_prefix}:filter"
         try:
-            self.redis.set(bloom_key, pickle.dumps(self.bloom_filter))
+            self.redis.set(bloom_key, self.bloom_filter.bits.tobytes())
         except Exception as e:
             self.logger.error(f"Failed to save Bloom filter to Redis: {str(e)}")
     
     def _load_from_redis(self) -> None:
         """Load the Bloom filter from Redis."""
         bloom_key = f"{self.key_prefix}:filter"
+        meta_key = f"{self.key_prefix}:meta"
         try:
             bloom_data = self.redis.get(bloom_key)
-            if bloom_data:
-                self.bloom_filter = pickle.loads(bloom_data)
+            meta = self.redis.hgetall(meta_key)
+            if bloom_data and meta:
+                # frombuffer views the reply read-only; copy() makes the one writable array
+                bits = np.frombuffer(bloom_data, dtype=np.uint64).copy()
+                bloom_filter = BloomFilter(int(meta[b'capacity']), float(meta[b'error_rate']), bits)
+                if bloom_filter.bit_size != int(meta[b'bit_size']):
+                    raise ValueError("Bloom filter data in Redis does not match its metadata")
+                self.bloom_filter = bloom_filter
             else:
                 raise ValueError("Bloom filter data not found in Redis")
         except Exception as e:
@@ -134,6 +181,7 @@ class BloomFilterCache:
         """Add a list of keys to the Bloom filter cache."""
         for key in keys:
             self.bloom_filter.add(key)
+        self.bloom_filter.flush()
     
     def might_exist(self, key: str) -> bool:
         """
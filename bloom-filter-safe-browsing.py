@@ -1,70 +1,138 @@
+import math
 import mmh3
-from bitarray import bitarray
+import numpy as np
+from _bloom_kernels import BLOCK_BITS, block_count_for
 import redis
 from typing import List, Tuple, Optional
 import logging
 import time
+import functools
 import urllib.parse
-from concurrent.futures import ThreadPoolExecutor
 import requests
 import hashlib
 import struct
 
-class BloomFilter:
-    def __init__(self, capacity: int, error_rate: float = 0.01):
-        self.capacity = capacity
-        self.error_rate = error_rate
-        self.bit_size = self._get_size(capacity, error_rate)
-        self.hash_count = self._get_hash_count(self.bit_size, capacity)
-        self.bit_array = bitarray(self.bit_size)
-        self.bit_array.setall(0)
-    
-    @staticmethod
-    def _get_size(n: int, p: float) -> int:
-        m = -(n * math.log(p)) / (math.log(2)**2)
-        return int(m)
-    
-    @staticmethod
-    def _get_hash_count(m: int, n: int) -> int:
-        k = (m / n) * math.log(2)
-        return int(k)
-    
-    def add(self, item: bytes) -> None:
-        for i in range(self.hash_count):
-            index = mmh3.hash(item, i) % self.bit_size
-            self.bit_array[index] = 1
-    
-    def contains(self, item: bytes) -> bool:
-        for i in range(self.hash_count):
-            index = mmh3.hash(item, i) % self.bit_size
-            if not self.bit_array[index]:
-                return False
-        return True
+def bloom_size(n: int, p: float) -> int:
+    """Bits needed for n items at false positive rate p."""
+    m = -(n * math.log(p)) / (math.log(2)**2)
+    return int(m)
+
+def bloom_hash_count(m: int, n: int) -> int:
+    """Optimal number of hashes for m bits and n items."""
+    k = (m / n) * math.log(2)
+    return int(k)
+
+def bloom_offset_matrix(items: List[bytes], block_count: int, hash_count: int) -> np.ndarray:
+    """Bit offsets for a batch of items as a (len(items), hash_count) uint64 array."""
+    hashes = np.array([mmh3.hash64(item, signed=False) for item in items], dtype=np.uint64).reshape(-1, 2)
+    h1, h2 = hashes[:, 0], hashes[:, 1]
+    base = (h1 & np.uint64(block_count - 1)) * np.uint64(BLOCK_BITS)
+    g1 = h2 & np.uint64(0xFFFFFFFF)
+    g2 = (h2 >> np.uint64(32)) | np.uint64(1)
+    i = np.arange(hash_count, dtype=np.uint64)
+    # uint64 wraparound in g1 + i*g2 is harmless: BLOCK_BITS divides 2**64
+    return base[:, None] + ((g1[:, None] + i[None, :] * g2[:, None]) & np.uint64(BLOCK_BITS - 1))
 
 class DistributedBloomFilter:
     def __init__(self, redis_client: redis.Redis, key: str, capacity: int, error_rate: float = 0.01):
         self.redis = redis_client
         self.key = key
-        self.bloom_filter = BloomFilter(capacity, error_rate)
-        self._load_or_initialize()
-    
-    def _load_or_initialize(self) -> None:
-        bloom_data = self.redis.get(self.key)
-        if bloom_data:
-            self.bloom_filter.bit_array = bitarray()
-            self.bloom_filter.bit_array.frombytes(bloom_data)
-        else:
-            self._save_to_redis()
-    
-    def _save_to_redis(self) -> None:
-        self.redis.set(self.key, self.bloom_filter.bit_array.tobytes())
+        # The bitmap only lives in Redis: SETBIT/GETBIT touch hash_count bits per
+        # operation and Redis grows the string on the first SETBIT past its end
+        self.block_count = block_count_for(bloom_size(capacity, error_rate))
+        self.block_mask = self.block_count - 1
+        self.bit_size = self.block_count * BLOCK_BITS
+        self.hash_count = bloom_hash_count(self.bit_size, capacity)
+        self._pending = self.redis.pipeline(transaction=False)
+        self.dirty = False
+    
+    def _bit_offsets(self, item: bytes) -> List[int]:
+        # Same blocked layout as bloom_offset_matrix, so an item's GETBITs hit one 64-byte span
+        h1, h2 = mmh3.hash64(item, signed=False)
+        base = (h1 & self.block_mask) * BLOCK_BITS
+        g1, g2 = h2 & 0xFFFFFFFF, (h2 >> 32) | 1
+        return [base + ((g1 + i * g2) & (BLOCK_BITS - 1)) for i in range(self.hash_count)]
     
     def add(self, item: bytes) -> None:
-        self.bloom_filter.add(item)
-        self._save_to_redis()
+        # Queue the SETBITs; callers flush() once after a batch of adds
+        for offset in self._bit_offsets(item):
+            self._pending.setbit(self.key, offset, 1)
+        self.dirty = True
+    
+    def add_many(self, items: List[bytes]) -> None:
+        # Offsets for the whole batch come from one NumPy expression
+        for offset in bloom_offset_matrix(items, self.block_count, self.hash_count).ravel().tolist():
+            self._pending.setbit(self.key, offset, 1)
+        self.dirty = True
+    
+    def flush(self) -> None:
+        if self.dirty:
+            self._pending.execute()
+            self.dirty = False
     
     def contains(self, item: bytes) -> bool:
-        return self.bloom_filter.contains(item)
+        pipe = self.redis.pipeline(transaction=False)
+        for offset in self._bit_offsets(item):
+            pipe.getbit(self.key, offset)
+        return all(pipe.execute())
+    
+    def contains_many(self, items: List[bytes]) -> List[bool]:
+        # Offsets for the whole batch come from one NumPy expression and every GETBIT
+        # goes out in a single pipeline; the replies are reduced per item
+        offsets = bloom_offset_matrix(items, self.block_count, self.hash_count)
+        pipe = self.redis.pipeline(transaction=False)
+        for offset in offsets.ravel().tolist():
+            pipe.getbit(self.key, offset)
+        present = np.array(pipe.execute(), dtype=bool).reshape(offsets.shape)
+        return present.all(axis=1).tolist()
+
+# URL parsing is pure Python and the same URLs come back on every add/check,
+# so canonical forms and variants are memoized per URL string
+@functools.lru_cache(maxsize=100_000)
+def canonicalize_url(url: str) -> str:
+    """Canonicalize the URL to a standard format."""
+    parsed = urllib.parse.urlparse(url.strip().lower())
+    hostname = parsed.hostname or ""
+    path = parsed.path or "/"
+    query = parsed.query
+
+    # Remove www. from the beginning of the hostname
+    if hostname.startswith("www."):
+        hostname = hostname[4:]
+
+    # Ensure the path ends with a '/'
+    if not path.endswith("/"):
+        path += "/"
+
+    # Sort query parameters
+    if query:
+        query_params = sorted(urllib.parse.parse_qsl(query))
+        query = urllib.parse.urlencode(query_params)
+
+    return urllib.parse.urlunparse((parsed.scheme, hostname, path, "", query, ""))
+
+@functools.lru_cache(maxsize=100_000)
+def generate_url_variants(url: str) -> Tuple[str, ...]:
+    """Generate URL variants to check against the Bloom filter."""
+    canonical_url = canonicalize_url(url)
+    parsed = urllib.parse.urlparse(canonical_url)
+
+    variants = [
+        canonical_url,
+        f"{parsed.scheme}://{parsed.netloc}/",
+        parsed.netloc,
+    ]
+
+    path_parts = parsed.path.split("/")
+    for i in range(1, len(path_parts)):
+        variants.append(f"{parsed.scheme}://{parsed.netloc}{'/'.join(path_parts[:i])}/")
+
+    return tuple(variants)
+
+@functools.lru_cache(maxsize=100_000)
+def encoded_url_variants(url: str) -> Tuple[bytes, ...]:
+    """URL variants encoded once for hashing."""
+    return tuple(variant.encode() for variant in generate_url_variants(url))
 
 class SafeBrowsingChecker:
     def __init__(self, redis_client: redis.Redis, capacity: int = 100000000, error_rate: float = 0.000001):
@@ -74,59 +142,41 @@ class SafeBrowsingChecker:
     
     def canonicalize_url(self, url: str) -> str:
         """Canonicalize the URL to a standard format."""
-        parsed = urllib.parse.urlparse(url.strip().lower())
-        hostname = parsed.hostname or ""
-        path = parsed.path or "/"
-        query = parsed.query
-        
-        # Remove www. from the beginning of the hostname
-        if hostname.startswith("www."):
-            hostname = hostname[4:]
-        
-        # Ensure the path ends with a '/'
-        if not path.endswith("/"):
-            path += "/"
-        
-        # Sort query parameters
-        if query:
-            query_params = sorted(urllib.parse.parse_qsl(query))
-            query = urllib.parse.urlencode(query_params)
-        
-        return urllib.parse.urlunparse((parsed.scheme, hostname, path, "", query, ""))
+        return canonicalize_url(url)
     
     def generate_url_variants(self, url: str) -> List[str]:
         """Generate URL variants to check against the Bloom filter."""
-        canonical_url = self.canonicalize_url(url)
-        parsed = urllib.parse.urlparse(canonical_url)
-        
-        variants = [
-            canonical_url,
-            f"{parsed.scheme}://{parsed.netloc}/",
-            parsed.netloc,
-        ]
-        
-        path_parts = parsed.path.split("/")
-        for i in range(1, len(path_parts)):
-            variants.append(f"{parsed.scheme}://{parsed.netloc}{'/'.join(path_parts[:i])}/")
-        
-        return variants
+        return list(generate_url_variants(url))
     
     def add_malicious_url(self, url: str) -> None:
         """Add a malicious URL to the Bloom filter."""
-        variants = self.generate_url_variants(url)
-        for variant in variants:
-            self.bloom_filter.add(variant.encode())
-        self.logger.info(f"Added malicious URL and its variants: {url}")
+        self.add_malicious_urls([url])
+    
+    def add_malicious_urls(self, urls: List[str]) -> None:
+        """Add a batch of malicious URLs, writing the filter to Redis once."""
+        self.bloom_filter.add_many([variant for url in urls for variant in encoded_url_variants(url)])
+        for url in urls:
+            self.logger.info(f"Added malicious URL and its variants: {url}")
+        self.bloom_filter.flush()
     
     def is_potentially_malicious(self, url: str) -> bool:
         """Check if a URL is potentially malicious."""
-        variants = self.generate_url_variants(url)
-        return any(self.bloom_filter.contains(variant.encode()) for variant in variants)
+        return any(self.bloom_filter.contains_many(list(encoded_url_variants(url))))
+    
+    def _batch_contains(self, variant_lists: List[Tuple[bytes, ...]]) -> List[bool]:
+        """Check every variant of every URL in one batch and reduce to one result per URL."""
+        if not variant_lists:
+            return []
+        # Flatten the variants and remember which URL each one came from
+        owners = np.repeat(np.arange(len(variant_lists)), [len(variants) for variants in variant_lists])
+        flat = [variant for variants in variant_lists for variant in variants]
+        hits = np.array(self.bloom_filter.contains_many(flat), dtype=bool)
+        # A URL is flagged if any of its variants hit
+        return (np.bincount(owners[hits], minlength=len(variant_lists)) > 0).tolist()
     
     def bulk_check_urls(self, urls: List[str]) -> List[bool]:
-        """Check multiple URLs in parallel."""
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            return list(executor.map(self.is_potentially_malicious, urls))
+        """Check multiple URLs with a single batched filter lookup."""
+        return self._batch_contains([encoded_url_variants(url) for url in urls])
 
 class SafeBrowsingSystem:
     def __init__(self, redis_client: redis.Redis, update_interval: int = 3600):
@@ -165,8 +215,7 @@ class SafeBrowsingSystem:
             "https://fake-bank.com/login",
             "http://malware-distribution.net/download"
         ]
-        for url in example_malicious_urls:
-            self.safe_browsing.add_malicious_url(url)
+        self.safe_browsing.add_malicious_urls(example_malicious_urls)
         self.logger.info("Updated malicious URL database")
 
 def simulate_safe_browsing():
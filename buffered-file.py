@@ -1,3 +1,7 @@
+import io
+import os
+
+
 class BufferedFile:
     def __init__(self, file_obj, buffer_size):
         """
@@ -14,7 +18,19 @@ class BufferedFile:
             
         self._file = file_obj
         self._buffer_size = buffer_size
-        self._buffer = bytearray()
+        # Binary files backed by an OS descriptor are written with os.write/os.writev,
+        # skipping the io layer's own buffer; anything else goes through file_obj.write
+        self._fd = None
+        if isinstance(file_obj, (io.FileIO, io.BufferedWriter)):
+            try:
+                self._fd = file_obj.fileno()
+                file_obj.flush()
+            except io.UnsupportedOperation:
+                # e.g. a BufferedWriter over an in-memory stream
+                self._fd = None
+        # Allocated once; _pos marks how much of it holds pending data
+        self._buffer = bytearray(buffer_size)
+        self._pos = 0
         
     def write(self, data):
         """
@@ -29,34 +45,70 @@ class BufferedFile:
         if not isinstance(data, (bytes, bytearray)):
             raise TypeError("Data must be bytes or bytearray")
             
-        # Convert to bytearray if needed
-        data = bytearray(data)
-        bytes_to_write = len(data)
+        # View the caller's bytes instead of copying them
+        mv = memoryview(data).cast('B')
+        bytes_to_write = len(mv)
+        
+        # Writes at least as large as the buffer gain nothing from buffering;
+        # drain what is pending and hand the data straight to the file
+        if bytes_to_write >= self._buffer_size:
+            self._write_all([memoryview(self._buffer)[:self._pos], mv])
+            self._pos = 0
+            return bytes_to_write
+        
         bytes_written = 0
         
         while bytes_written < bytes_to_write:
             # Calculate how many bytes we can add to buffer
-            space_in_buffer = self._buffer_size - len(self._buffer)
+            space_in_buffer = self._buffer_size - self._pos
             chunk_size = min(space_in_buffer, bytes_to_write - bytes_written)
             
-            # Add chunk to buffer
-            self._buffer.extend(data[bytes_written:bytes_written + chunk_size])
+            # Copy chunk into the free end of the buffer
+            self._buffer[self._pos:self._pos + chunk_size] = mv[bytes_written:bytes_written + chunk_size]
+            self._pos += chunk_size
             bytes_written += chunk_size
             
             # If buffer is full, flush it
-            if len(self._buffer) >= self._buffer_size:
+            if self._pos >= self._buffer_size:
                 self.flush()
                 
         return bytes_written
         
-    def flush(self):
+    def _write_all(self, views):
+        """
+        Write a list of buffers in order, using a single writev when possible.
+        
+        Args:
+            views: List of memoryviews; empty ones are skipped
+        """
+        views = [view for view in views if len(view)]
+        if self._fd is None:
+            for view in views:
+                self._file.write(view)
+            return
+        
+        while views:
+            written = os.writev(self._fd, views)
+            # Drop fully written views and trim a partially written one
+            while views and written >= len(views[0]):
+                written -= len(views[0])
+                views.pop(0)
+            if written:
+                views[0] = views[0][written:]
+            
+    def flush(self, fsync=False):
         """
-        Flush the buffer contents to disk and clear the buffer.
+        Write the buffer contents to the file and reset the write position.
+        
+        Args:
+            fsync: Also flush the file object and fsync it so the data reaches disk
         """
-        if self._buffer:
-            self._file.write(self._buffer)
+        if self._pos:
+            self._write_all([memoryview(self._buffer)[:self._pos]])
+            self._pos = 0
+        if fsync:
             self._file.flush()
-            self._buffer.clear()
+            os.fsync(self._file.fileno())
             
     def close(self):
         """
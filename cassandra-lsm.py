@@ -1,90 +1,435 @@
 import os
-import json
+import mmap
 import time
 import bisect
-import hashlib
+import heapq
+import itertools
+import struct
 import threading
-from typing import Any, Dict, List, Optional, Tuple, Set
+import mmh3
+import msgspec
+import numpy as np
+from concurrent.futures import Future
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Set
 from collections import OrderedDict
-from dataclasses import dataclass
 from pathlib import Path
+from sortedcontainers import SortedDict
 
-@dataclass
 class Tombstone:
     """Represents a deleted entry."""
-    timestamp: float
+    __slots__ = ('timestamp',)
+    
+    def __init__(self, timestamp: float):
+        self.timestamp = timestamp
+        
+    def __repr__(self) -> str:
+        return f"Tombstone(timestamp={self.timestamp})"
     
-@dataclass
-class SSTableIndex:
-    """Index entry for SSTable."""
+class LogEntry(msgspec.Struct, array_like=True):
+    """Mutation record in the commit log and SSTable data files."""
     key: str
-    position: int
+    value: Any
     timestamp: float
 
+# Records are msgpack, framed by a 4-byte big-endian length so files can be
+# scanned without a delimiter and read back with exact-size reads. Tombstones
+# travel as a msgpack extension type so they decode as Tombstone again rather
+# than as a plain dict once they reach an SSTable
+TOMBSTONE_EXT = 1
+
+def _enc_hook(obj: Any) -> Any:
+    if isinstance(obj, Tombstone):
+        return msgspec.msgpack.Ext(TOMBSTONE_EXT, struct.pack('>d', obj.timestamp))
+    raise NotImplementedError(f"Cannot encode {type(obj).__name__}")
+
+def _ext_hook(code: int, data: memoryview) -> Any:
+    if code == TOMBSTONE_EXT:
+        return Tombstone(struct.unpack('>d', data)[0])
+    raise NotImplementedError(f"Unknown extension type {code}")
+
+ENCODER = msgspec.msgpack.Encoder(enc_hook=_enc_hook)
+LOG_DECODER = msgspec.msgpack.Decoder(LogEntry, ext_hook=_ext_hook)
+
+def frame(record: msgspec.Struct) -> bytes:
+    """Encode a record with its length prefix."""
+    payload = ENCODER.encode(record)
+    return len(payload).to_bytes(4, 'big') + payload
+
+def read_frame(f: BinaryIO) -> Optional[bytes]:
+    """Read the next length-prefixed payload, or None at end of data."""
+    header = f.read(4)
+    # A zero length marks the end of a commit log segment (see CommitLog._write_batch)
+    if len(header) < 4 or header == b'\0\0\0\0':
+        return None
+    return f.read(int.from_bytes(header, 'big'))
+
+def iter_frames(f: BinaryIO) -> Iterator[bytes]:
+    """Yield every length-prefixed payload in the file."""
+    while (payload := read_frame(f)) is not None:
+        yield payload
+
+class DescriptorCache:
+    """LRU of open SSTable data file mappings, bounded by count and idle time."""
+    def __init__(self, capacity: int = 256, idle_seconds: float = 60.0):
+        self.capacity = capacity
+        self.idle_seconds = idle_seconds
+        self._entries: OrderedDict = OrderedDict()  # path -> (mapping, last used)
+        self._lock = threading.Lock()
+        
+    def acquire(self, path: str, loader: Callable[[], mmap.mmap]) -> mmap.mmap:
+        """Return the cached mapping for path, opening it with loader on a miss."""
+        with self._lock:
+            now = time.monotonic()
+            entry = self._entries.pop(path, None)
+            mapping = entry[0] if entry else loader()
+            self._entries[path] = (mapping, now)
+            
+            # Evicted mappings are only dereferenced, not closed, so a reader still
+            # holding one finishes safely; CPython unmaps it when the last reference goes
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+            while self._entries:
+                _, (_, last_used) = next(iter(self._entries.items()))
+                if now - last_used <= self.idle_seconds:
+                    break
+                self._entries.popitem(last=False)
+            return mapping
+            
+    def release(self, path: str) -> None:
+        """Forget the mapping for path, e.g. before the file is deleted."""
+        with self._lock:
+            self._entries.pop(path, None)
+
+DESCRIPTOR_CACHE = DescriptorCache()
+
+# SSTable data is written in slices of this size
+WRITE_CHUNK_SIZE = 1024 * 1024
+
+def write_fully(f: BinaryIO, buffer: bytearray) -> None:
+    """Write all of buffer to an unbuffered file, WRITE_CHUNK_SIZE at a time."""
+    with memoryview(buffer) as view:
+        offset = 0
+        while offset < len(view):
+            offset += f.write(view[offset:offset + WRITE_CHUNK_SIZE])
+
+MASK64 = 0xFFFFFFFFFFFFFFFF
+
+def key_hash(key: str) -> int:
+    """64-bit hash used to order and search SSTable indexes."""
+    return mmh3.hash64(key.encode('utf-8'), signed=False)[0]
+
+# In group mode the writer thread also flushes early once this much is queued
+GROUP_COMMIT_BYTES = 64 * 1024
+
 class CommitLog:
-    """Cassandra-style commit log for durability."""
-    def __init__(self, directory: str):
+    """
+    Cassandra-style commit log for durability.
+    
+    flush_mode 'batch' makes append() return once the record is durable.
+    'group' makes it return at once with a Future that a writer thread
+    completes when the record is durable; the thread writes everything queued
+    every flush_interval_ms (or at GROUP_COMMIT_BYTES), so callers that do not
+    wait on the Future pay no sync latency.
+    """
+    def __init__(self, directory: str, flush_mode: str = 'batch', flush_interval_ms: float = 5):
+        if flush_mode not in ('batch', 'group'):
+            raise ValueError(f"Unknown commit log flush mode: {flush_mode}")
         self.directory = directory
+        self.flush_mode = flush_mode
+        self.flush_interval_ms = flush_interval_ms
         self.current_segment = None
         self.segment_size = 32 * 1024 * 1024  # 32MB
         self.current_position = 0
+        # Segments are preallocated and opened O_DSYNC, so each write is durable
+        # without an fsync and never extends the file; truncated segments are
+        # renamed into a small recycle pool instead of being recreated
+        self.max_recycled = 2
+        self._segments: List[str] = []
+        self._recycled: List[str] = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.startswith("commitlog-recycled-")
+        ) if os.path.isdir(directory) else []
+        # Group commit: appenders queue their records and one of them writes and
+        # fsyncs everything queued so far, so concurrent appends share one fsync
+        self._cv = threading.Condition()
+        self._pending: List[bytes] = []
+        self._flushing = False
+        # Bumped by rotate; tells appenders which segments their records went to
+        self.generation = 0
+        # Futures of the records in _pending, and their size
+        self._waiters: List[Future] = []
+        self._pending_bytes = 0
         os.makedirs(directory, exist_ok=True)
         self._init_new_segment()
+        if flush_mode == 'group':
+            threading.Thread(target=self._group_writer, daemon=True).start()
         
     def _init_new_segment(self):
         """Initialize a new commit log segment."""
-        timestamp = int(time.time() * 1000)
-        filename = os.path.join(self.directory, f"commitlog-{timestamp}.log")
-        self.current_segment = open(filename, 'ab+')
+        # Nanoseconds: a rotation can follow the previous segment within a millisecond
+        filename = os.path.join(self.directory, f"commitlog-{time.time_ns()}.log")
+        flags = os.O_WRONLY | os.O_CREAT | getattr(os, 'O_DSYNC', 0)
+        if self._recycled:
+            os.rename(self._recycled.pop(), filename)
+            fd = os.open(filename, flags)
+        else:
+            fd = os.open(filename, flags)
+            if hasattr(os, 'posix_fallocate'):
+                os.posix_fallocate(fd, 0, self.segment_size)
+        self.current_segment = os.fdopen(fd, 'wb', buffering=0)
+        # Cover the recycled segment's old records before anything is appended
+        os.pwrite(fd, b'\0\0\0\0', 0)
+        self._segments.append(filename)
         self.current_position = 0
         
-    def append(self, key: str, value: Any, timestamp: float) -> None:
-        """Append mutation to commit log."""
-        entry = {
-            'key': key,
-            'value': value,
-            'timestamp': timestamp
-        }
-        serialized = json.dumps(entry).encode('utf-8') + b'\n'
+    def append(self, key: str, value: Any, timestamp: float) -> Optional[Future]:
+        """
+        Append mutation to commit log. In batch mode, returns once the mutation
+        is durable; in group mode, returns a Future that completes then.
+        """
+        future, _ = self.enqueue(key, value, timestamp)
+        if self.flush_mode == 'group':
+            return future
+        self.sync(future)
+        return None
+        
+    def enqueue(self, key: str, value: Any, timestamp: float) -> Tuple[Future, int]:
+        """
+        Queue a mutation without waiting for it. Returns its Future and the
+        generation of the segments it will be written to (see rotate).
+        """
+        serialized = frame(LogEntry(key, value, timestamp))
+        future = Future()
+        with self._cv:
+            self._pending.append(serialized)
+            self._waiters.append(future)
+            self._pending_bytes += len(serialized)
+            if self.flush_mode == 'group' and self._pending_bytes >= GROUP_COMMIT_BYTES:
+                self._cv.notify_all()
+            return future, self.generation
+            
+    def sync(self, future: Future) -> None:
+        """Wait until an enqueued mutation is durable; raises if its write failed."""
+        if self.flush_mode == 'batch':
+            with self._cv:
+                while not future.done():
+                    if self._flushing:
+                        # Another appender is writing; our record rides in its batch or the next
+                        self._cv.wait()
+                        continue
+                        
+                    # Become the flusher for everything queued so far
+                    try:
+                        self._flush_pending()
+                    except Exception:
+                        pass  # reported through the batch's Futures, ours included
+        future.result()
+        
+    def _flush_pending(self) -> None:
+        """
+        Write everything queued and settle its Futures. Called with _cv held and
+        no flush running; the lock is released during the write.
+        
+        A failed batch is dropped rather than requeued: every appender in it is
+        told it failed, so none of its records is written later behind the
+        caller's back and replayed after the error was reported.
+        """
+        batch, self._pending = self._pending, []
+        waiters, self._waiters = self._waiters, []
+        self._pending_bytes = 0
+        self._flushing = True
+        self._cv.release()
+        try:
+            self._write_batch(batch)
+        except BaseException as e:
+            for future in waiters:
+                future.set_exception(e)
+            raise
+        else:
+            for future in waiters:
+                future.set_result(None)
+        finally:
+            self._cv.acquire()
+            self._flushing = False
+            self._cv.notify_all()
         
-        if self.current_position + len(serialized) > self.segment_size:
+    def _group_writer(self) -> None:
+        """Group mode writer: write whatever is queued every flush_interval_ms."""
+        while True:
+            with self._cv:
+                self._cv.wait_for(lambda: self._pending_bytes >= GROUP_COMMIT_BYTES,
+                                  timeout=self.flush_interval_ms / 1000)
+                if not self._pending or self._flushing:
+                    continue
+                try:
+                    self._flush_pending()
+                except Exception:
+                    pass  # reported through the batch's Futures
+                
+    def _write_batch(self, batch: List[bytes]) -> None:
+        """Write a batch of framed records with one synchronous write."""
+        data = b''.join(batch)
+        
+        if self.current_position and self.current_position + len(data) + 4 > self.segment_size:
             self.current_segment.close()
             self._init_new_segment()
             
-        self.current_segment.write(serialized)
-        self.current_segment.flush()
-        os.fsync(self.current_segment.fileno())
-        self.current_position += len(serialized)
-        
-    def truncate(self):
-        """Truncate commit log after successful flush."""
-        self.current_segment.close()
-        self._init_new_segment()
+        # A zero length header after the batch ends the segment for readers; a
+        # recycled segment still holds old records past it. The next batch
+        # overwrites the terminator.
+        os.pwrite(self.current_segment.fileno(), data + b'\0\0\0\0', self.current_position)
+        if not hasattr(os, 'O_DSYNC'):
+            os.fsync(self.current_segment.fileno())
+        self.current_position += len(data)
+        
+    def rotate(self) -> List[str]:
+        """
+        Seal the current segments and start a new generation. Everything
+        enqueued so far is written to the sealed segments first, so a record
+        is in the sealed segments exactly when it was enqueued before the call.
+        Returns the sealed paths, to pass to truncate once their data is flushed.
+        """
+        with self._cv:
+            # Never swap segments under a flusher that is writing outside the lock
+            while self._flushing:
+                self._cv.wait()
+            if self._pending:
+                try:
+                    self._flush_pending()
+                except Exception:
+                    pass  # reported through the batch's Futures
+            self.current_segment.close()
+            sealed, self._segments = self._segments, []
+            self.generation += 1
+            self._init_new_segment()
+            return sealed
+            
+    def truncate(self, segments: List[str]):
+        """Recycle segments sealed by rotate, once their data is flushed."""
+        with self._cv:
+            for path in segments:
+                self._recycle_segment(path)
+            
+    def _recycle_segment(self, path: str) -> None:
+        """Keep a flushed segment for reuse, or delete it if the pool is full."""
+        if len(self._recycled) < self.max_recycled:
+            # Rename the file only: the directory may contain "commitlog-" too
+            name = os.path.basename(path)[len("commitlog-"):]
+            recycled = os.path.join(os.path.dirname(path), "commitlog-recycled-" + name)
+            os.rename(path, recycled)
+            self._recycled.append(recycled)
+        else:
+            os.remove(path)
+
+def mix_hash(h, seed: int):
+    """Reseed a 64-bit hash with the murmur3 finalizer; works on ints and uint64 arrays."""
+    h = (h + ((seed * 0x9E3779B97F4A7C15) & MASK64)) & MASK64
+    h ^= h >> 33
+    h = (h * 0xFF51AFD7ED558CCD) & MASK64
+    h ^= h >> 33
+    h = (h * 0xC4CEB9FE1A85EC53) & MASK64
+    h ^= h >> 33
+    return h
+
+def xor_slots(h, block_length: int):
+    """One slot in each third of the table, from three 32-bit slices of h."""
+    h0 = ((h & 0xFFFFFFFF) * block_length) >> 32
+    h1 = (((h >> 21) & 0xFFFFFFFF) * block_length) >> 32
+    h2 = ((((h >> 42) | (h << 22)) & 0xFFFFFFFF) * block_length) >> 32
+    return h0, h1 + block_length, h2 + 2 * block_length
 
-class BloomFilter:
-    """Bloom filter for SSTable lookups."""
-    def __init__(self, size: int = 1000000, num_hashes: int = 3):
-        self.size = size
-        self.num_hashes = num_hashes
-        self.bit_array = [False] * size
-        
-    def _get_hash_values(self, key: str) -> List[int]:
-        """Generate hash values for key."""
-        values = []
-        for i in range(self.num_hashes):
-            hash_input = f"{key}:{i}".encode('utf-8')
-            hash_value = int(hashlib.md5(hash_input).hexdigest(), 16)
-            values.append(hash_value % self.size)
-        return values
-        
-    def add(self, key: str):
-        """Add key to Bloom filter."""
-        for pos in self._get_hash_values(key):
-            self.bit_array[pos] = True
+def xor_contains(table: np.ndarray, block_length: int, seed: int, key_hash: int) -> bool:
+    """Check key_hash's fingerprint against the XOR of its three table slots."""
+    h = mix_hash(int(key_hash), seed)
+    h0, h1, h2 = xor_slots(h, block_length)
+    return (h ^ (h >> 32)) & 0xFF == table[h0] ^ table[h1] ^ table[h2]
+
+def xor_peel(slots: np.ndarray, fingerprints: np.ndarray, table: np.ndarray) -> bool:
+    """Fill table so each key's three slots XOR to its fingerprint; False if peeling gets stuck."""
+    n = slots.shape[0]
+    counts = np.zeros(table.size, dtype=np.int32)
+    key_xor = np.zeros(table.size, dtype=np.int64)
+    for k in range(n):
+        for j in range(3):
+            counts[slots[k, j]] += 1
+            key_xor[slots[k, j]] ^= k
             
-    def might_contain(self, key: str) -> bool:
-        """Check if key might be in set."""
-        return all(self.bit_array[pos] for pos in self._get_hash_values(key))
+    # Repeatedly take a slot used by a single key; that key can be assigned last
+    queue = [c for c in range(table.size) if counts[c] == 1]
+    order = []
+    while queue:
+        c = queue.pop()
+        if counts[c] != 1:
+            continue
+        k = key_xor[c]
+        order.append((k, c))
+        for j in range(3):
+            s = slots[k, j]
+            counts[s] -= 1
+            key_xor[s] ^= k
+            if counts[s] == 1:
+                queue.append(s)
+    if len(order) < n:
+        return False
+        
+    for k, c in reversed(order):
+        table[c] = 0
+        table[c] = fingerprints[k] ^ table[slots[k, 0]] ^ table[slots[k, 1]] ^ table[slots[k, 2]]
+    return True
+
+def hash_range(key_hashes: np.ndarray, key_hash: int) -> Tuple[int, int]:
+    """Index range of the entries equal to key_hash in a sorted hash column."""
+    h = np.uint64(key_hash)
+    return int(np.searchsorted(key_hashes, h, side='left')), int(np.searchsorted(key_hashes, h, side='right'))
+
+try:
+    # Compiled versions of the three functions above
+    from _lsm_kernels import hash_range, xor_contains, xor_peel
+except ImportError:  # Numba is optional
+    pass
+
+class XorFilter:
+    """
+    Xor filter with 8-bit fingerprints for an SSTable's keys.
+    
+    Built once from the final key hashes, it takes about 9.84 bits per key for a
+    0.4% false positive rate, and a probe is three byte loads on the key hash
+    the index search needs anyway. It cannot take keys after construction,
+    which is fine for immutable SSTables.
+    """
+    def __init__(self, seed: int, table: np.ndarray):
+        self.seed = seed
+        self.table = table
+        self.block_length = len(table) // 3
+        
+    @classmethod
+    def build(cls, key_hashes: np.ndarray) -> 'XorFilter':
+        """Build the filter for a set of key_hash() values."""
+        hashes = np.unique(key_hashes)
+        block_length = (32 + int(1.23 * len(hashes))) // 3
+        for seed in range(1, 64):  # a retry with a new seed is rarely needed
+            mixed = mix_hash(hashes, seed)
+            slots = np.stack(xor_slots(mixed, block_length), axis=1).astype(np.int64)
+            fingerprints = ((mixed ^ (mixed >> 32)) & 0xFF).astype(np.uint8)
+            table = np.zeros(3 * block_length, dtype=np.uint8)
+            if xor_peel(slots, fingerprints, table):
+                return cls(seed, table)
+        raise RuntimeError("Could not build an xor filter for the key set")
+        
+    def contains(self, key_hash: int) -> bool:
+        """Check if the key with this key_hash() might be in the set."""
+        # As np.uint64: Numba would take a Python int for int64 and overflow
+        return xor_contains(self.table, self.block_length, self.seed, np.uint64(key_hash))
+        
+    def save(self, path: str):
+        """Write the seed, then the fingerprint table."""
+        np.concatenate([np.array([self.seed], dtype='<u8').view(np.uint8), self.table]).tofile(path)
+        
+    @classmethod
+    def load(cls, path: str) -> 'XorFilter':
+        """Read a filter written by save()."""
+        raw = np.fromfile(path, dtype=np.uint8)
+        return cls(int(raw[:8].view('<u8')[0]), raw[8:])
 
 class SSTable:
     """Sorted String Table implementation."""
@@ -93,113 +438,245 @@ class SSTable:
         self.directory = directory
         self.data_file = os.path.join(directory, f"data-{table_id}.db")
         self.index_file = os.path.join(directory, f"index-{table_id}.db")
-        self.bloom_filter = BloomFilter()
-        self.index: List[SSTableIndex] = []
+        self.filter_file = os.path.join(directory, f"filter-{table_id}.db")
+        self.filter: Optional[XorFilter] = None
+        # Index as parallel arrays sorted by key hash; lookups binary-search
+        # key_hashes with NumPy and read the record through an mmap of the data file
+        self.key_hashes = np.empty(0, dtype='<u8')
+        self.positions = np.empty(0, dtype='<u8')
+        self.timestamps = np.empty(0, dtype='<f8')
+        # Key range of the table; lookups outside it skip the table entirely
+        self.min_key: Optional[str] = None
+        self.max_key: Optional[str] = None
+        if os.path.exists(self.index_file):
+            self._load_index()
+            if os.path.exists(self.filter_file):
+                self.filter = XorFilter.load(self.filter_file)
+            else:
+                self.filter = XorFilter.build(self.key_hashes)
+            
+    def _load_index(self):
+        """Load the index file: all key hashes, then all positions, then all timestamps."""
+        columns = np.fromfile(self.index_file, dtype='<u8')
+        n = len(columns) // 3
+        self.key_hashes = columns[:n]
+        self.positions = columns[n:2 * n]
+        self.timestamps = columns[2 * n:].view('<f8')
+        # The data file is in key order: its first record (offset 0) holds the
+        # smallest key and the record at the highest offset the largest
+        data = self._open_data()
+        if data is not None:
+            self.min_key = self._read_entry(data, 0).key
+            self.max_key = self._read_entry(data, int(self.positions.max())).key
+        
+    def _map_data_file(self) -> mmap.mmap:
+        with open(self.data_file, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            
+    def _open_data(self) -> Optional[mmap.mmap]:
+        """Get the data file mapping from the shared descriptor cache."""
+        if not self.positions.size:
+            return None
+        return DESCRIPTOR_CACHE.acquire(self.data_file, self._map_data_file)
+        
+    @staticmethod
+    def _read_entry(data: mmap.mmap, position: int) -> LogEntry:
+        """Decode the length-prefixed record at position."""
+        length = int.from_bytes(data[position:position + 4], 'big')
+        with memoryview(data)[position + 4:position + 4 + length] as payload:
+            return LOG_DECODER.decode(payload)
         
+    def iter_records(self) -> Iterator[LogEntry]:
+        """Yield every record in file (key) order."""
+        data = self._open_data()
+        if data is None:
+            return
+        position = 0
+        while position < len(data):
+            length = int.from_bytes(data[position:position + 4], 'big')
+            yield self._read_entry(data, position)
+            position += 4 + length
+        
+    def close(self):
+        """Drop the data file mapping from the descriptor cache."""
+        DESCRIPTOR_CACHE.release(self.data_file)
+            
     def write(self, data: Dict[str, Any], timestamps: Dict[str, float]):
         """Write sorted data to SSTable."""
-        with open(self.data_file, 'wb') as df, open(self.index_file, 'wb') as if_:
-            position = 0
-            
-            for key in sorted(data.keys()):
-                # Write data entry
-                entry = {
-                    'key': key,
-                    'value': data[key],
-                    'timestamp': timestamps[key]
-                }
-                serialized = json.dumps(entry).encode('utf-8') + b'\n'
-                df.write(serialized)
+        self.write_records(LogEntry(key, data[key], timestamps[key]) for key in sorted(data.keys()))
+        
+    def write_records(self, records: Iterable[LogEntry], max_bytes: Optional[int] = None):
+        """
+        Write records that arrive in key order, buffering at most about WRITE_CHUNK_SIZE bytes.
+        
+        With max_bytes set, stop taking records once the data file reaches that
+        size; the rest stay in the iterator for the next table.
+        """
+        key_hashes: List[int] = []
+        positions: List[int] = []
+        record_timestamps: List[float] = []
+        
+        # Encode records straight into one buffer: reserve the 4-byte length,
+        # let msgspec append the payload after it, then fill the length in
+        out = bytearray()
+        written = 0
+        min_key = max_key = None
+        with open(self.data_file, 'wb', buffering=0) as df:
+            for entry in records:
+                if min_key is None:
+                    min_key = entry.key
+                max_key = entry.key
+                start = len(out)
+                ENCODER.encode_into(entry, out, start + 4)
+                out[start:start + 4] = (len(out) - start - 4).to_bytes(4, 'big')
                 
                 # Update index
-                index_entry = SSTableIndex(key, position, timestamps[key])
-                self.index.append(index_entry)
-                if_.write(json.dumps(vars(index_entry)).encode('utf-8') + b'\n')
+                key_hashes.append(key_hash(entry.key))
+                positions.append(written + start)
+                record_timestamps.append(entry.timestamp)
                 
-                # Update bloom filter
-                self.bloom_filter.add(key)
+                if len(out) >= WRITE_CHUNK_SIZE:
+                    write_fully(df, out)
+                    written += len(out)
+                    out.clear()
+                if max_bytes is not None and written + len(out) >= max_bytes:
+                    break
+            write_fully(df, out)
                 
-                position += len(serialized)
+        key_hashes = np.array(key_hashes, dtype='<u8')
+        order = np.argsort(key_hashes, kind='stable')
+        self.key_hashes = key_hashes[order]
+        self.positions = np.array(positions, dtype='<u8')[order]
+        self.timestamps = np.array(record_timestamps, dtype='<f8')[order]
+        np.concatenate([self.key_hashes, self.positions, self.timestamps.view('<u8')]).tofile(self.index_file)
+        self.filter = XorFilter.build(self.key_hashes)
+        self.filter.save(self.filter_file)
+        self.min_key, self.max_key = min_key, max_key
                 
-    def get(self, key: str) -> Optional[Tuple[Any, float]]:
-        """Retrieve value and timestamp for key."""
-        if not self.bloom_filter.might_contain(key):
-            return None
-            
-        # Binary search in index
-        left = 0
-        right = len(self.index) - 1
+    def locate(self, key: str) -> np.ndarray:
+        """
+        Offsets of the records that may hold key, without touching the data file.
+        
+        Empty unless key is in the table's range and passes the xor filter;
+        otherwise every record whose key hash matches, since distinct keys can
+        share a hash.
+        """
+        if self.min_key is None or key < self.min_key or key > self.max_key:
+            return self.positions[:0]
+        h = np.uint64(key_hash(key))
+        if not self.filter.contains(h):
+            return self.positions[:0]
+        start, end = hash_range(self.key_hashes, h)
+        return self.positions[start:end]
         
-        while left <= right:
-            mid = (left + right) // 2
-            index_entry = self.index[mid]
+    def prefetch(self, positions: np.ndarray):
+        """Ask the kernel to start reading the pages holding these records."""
+        data = self._open_data()
+        if data is None or not hasattr(data, 'madvise'):
+            return
+        for position in positions.tolist():
+            start = position - position % mmap.PAGESIZE
+            data.madvise(mmap.MADV_WILLNEED, start, min(position - start + mmap.PAGESIZE, len(data) - start))
             
-            if index_entry.key == key:
-                # Found key in index, read from data file
-                with open(self.data_file, 'rb') as f:
-                    f.seek(index_entry.position)
-                    entry = json.loads(f.readline().decode('utf-8'))
-                    return entry['value'], entry['timestamp']
-            elif index_entry.key < key:
-                left = mid + 1
-            else:
-                right = mid - 1
-                
+    def read(self, key: str, positions: np.ndarray) -> Optional[Tuple[Any, float]]:
+        """Return value and timestamp for key from the records at positions."""
+        if not positions.size:
+            return None
+        data = self._open_data()
+        for position in positions.tolist():
+            entry = self._read_entry(data, position)
+            if entry.key == key:
+                return entry.value, entry.timestamp
         return None
+        
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Retrieve value and timestamp for key."""
+        return self.read(key, self.locate(key))
 
 class Memtable:
     """In-memory sorted structure for recent writes."""
     def __init__(self, threshold_bytes: int = 64 * 1024 * 1024):  # 64MB
-        self.data: Dict[str, Any] = {}
-        self.timestamps: Dict[str, float] = {}
+        # key -> (value, timestamp, encoded_size); kept sorted so a flush
+        # streams records in key order without sorting
+        self.records: SortedDict = SortedDict()
         self.size_bytes = 0
         self.threshold_bytes = threshold_bytes
         self.lock = threading.RLock()
         
+    def _set(self, key: str, value: Any) -> None:
+        # Size by the msgpack encoding the record is flushed as, not str(value)
+        entry_size = len(key) + len(ENCODER.encode(value))
+        previous = self.records.get(key)
+        if previous is not None:
+            self.size_bytes -= previous[2]
+        self.records[key] = (value, time.time(), entry_size)
+        self.size_bytes += entry_size
+        
     def put(self, key: str, value: Any) -> bool:
         """Insert key-value pair. Returns True if memtable is full."""
         with self.lock:
-            timestamp = time.time()
-            entry_size = len(key) + len(str(value))
-            
-            if key in self.data:
-                self.size_bytes -= len(key) + len(str(self.data[key]))
-                
-            self.data[key] = value
-            self.timestamps[key] = timestamp
-            self.size_bytes += entry_size
-            
+            self._set(key, value)
             return self.size_bytes >= self.threshold_bytes
             
     def get(self, key: str) -> Optional[Tuple[Any, float]]:
         """Get value and timestamp for key."""
         with self.lock:
-            if key in self.data:
-                return self.data[key], self.timestamps[key]
+            record = self.records.get(key)
+            if record is not None:
+                return record[0], record[1]
             return None
             
     def delete(self, key: str):
         """Mark key as deleted using a tombstone."""
         with self.lock:
-            self.data[key] = Tombstone(time.time())
+            self._set(key, Tombstone(time.time()))
             
     def is_empty(self) -> bool:
         """Check if memtable is empty."""
         with self.lock:
-            return len(self.data) == 0
+            return len(self.records) == 0
+            
+    def iter_records(self) -> Iterator[LogEntry]:
+        """Yield the memtable's records in key order."""
+        with self.lock:
+            items = list(self.records.items())
+        for key, (value, timestamp, _) in items:
+            yield LogEntry(key, value, timestamp)
+
+# Leveled compaction shape: L1 holds level_base_bytes and every deeper level
+# LEVEL_MULTIPLIER times more than the one above it
+MAX_LEVELS = 7
+LEVEL_MULTIPLIER = 10
 
 class CassandraLSM:
     """Cassandra-style LSM tree implementation."""
     def __init__(self, 
                  directory: str,
                  memtable_threshold: int = 64 * 1024 * 1024,  # 64MB
-                 compaction_threshold: int = 4):
+                 compaction_threshold: int = 4,
+                 level_base_bytes: int = 256 * 1024 * 1024,  # 256MB
+                 max_sstable_bytes: int = 64 * 1024 * 1024,  # 64MB
+                 commit_log_mode: str = 'batch',
+                 commit_log_interval_ms: float = 5):
         self.directory = directory
         self.memtable = Memtable(memtable_threshold)
         self.immutable_memtable: Optional[Memtable] = None
-        self.sstables: List[SSTable] = []
-        self.commit_log = CommitLog(os.path.join(directory, "commit_log"))
-        self.compaction_threshold = compaction_threshold
+        # Commit log segments sealed when immutable_memtable was swapped out
+        self.immutable_segments: List[str] = []
+        # levels[0] holds flushed tables, which may overlap, ordered by table_id;
+        # deeper levels hold non-overlapping tables ordered by key range. The
+        # whole structure is copy-on-write: writers publish a new tuple and
+        # readers iterate whatever tuple they picked up, without the lock
+        self.levels: Tuple[Tuple[SSTable, ...], ...] = ((),) * MAX_LEVELS
+        self.manifest_file = os.path.join(directory, "manifest.db")
+        self.commit_log = CommitLog(os.path.join(directory, "commit_log"),
+                                    commit_log_mode, commit_log_interval_ms)
+        self.compaction_threshold = compaction_threshold  # L0 tables that trigger a compaction
+        self.level_base_bytes = level_base_bytes
+        self.max_sstable_bytes = max_sstable_bytes
+        # Per level, the min_key of the table compacted last; the next pick
+        # resumes after it so compactions rotate through the key space
+        self.compact_pointers: List[Optional[str]] = [None] * MAX_LEVELS
         self.next_table_id = 0
         self.lock = threading.RLock()
         
@@ -215,26 +692,82 @@ class CassandraLSM:
         self.compaction_thread.start()
         
     def _load_existing_sstables(self):
-        """Load existing SSTables from disk."""
+        """Load existing SSTables from disk into the levels named by the manifest."""
+        manifest = None
+        if os.path.exists(self.manifest_file):
+            with open(self.manifest_file, 'rb') as f:
+                manifest = msgspec.msgpack.decode(f.read(), type=Dict[int, int])
+                
+        levels: List[List[SSTable]] = [[] for _ in range(MAX_LEVELS)]
         for filename in os.listdir(self.directory):
             if filename.startswith("data-"):
                 table_id = int(filename.split("-")[1].split(".")[0])
-                sstable = SSTable(table_id, self.directory)
-                self.sstables.append(sstable)
                 self.next_table_id = max(self.next_table_id, table_id + 1)
+                sstable = SSTable(table_id, self.directory)
+                if manifest is not None and table_id not in manifest:
+                    # Left behind by a compaction that did not finish, or one
+                    # that finished but had not deleted its inputs yet
+                    self._remove_sstable(sstable)
+                    continue
+                levels[manifest[table_id] if manifest is not None else 0].append(sstable)
+        self.levels = tuple(self._sorted_level(i, tables) for i, tables in enumerate(levels))
+        
+    @staticmethod
+    def _sorted_level(level: int, tables: Iterable[SSTable]) -> Tuple[SSTable, ...]:
+        if level == 0:
+            return tuple(sorted(tables, key=lambda ss: ss.table_id))
+        return tuple(sorted(tables, key=lambda ss: ss.min_key))
+        
+    def _save_manifest(self, levels: Tuple[Tuple[SSTable, ...], ...]):
+        """Atomically record which level every live table belongs to."""
+        manifest = {ss.table_id: level for level, tables in enumerate(levels) for ss in tables}
+        temp_file = self.manifest_file + ".tmp"
+        with open(temp_file, 'wb') as f:
+            f.write(ENCODER.encode(manifest))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.manifest_file)
+        
+    @staticmethod
+    def _remove_sstable(sstable: SSTable):
+        sstable.close()
+        os.remove(sstable.data_file)
+        os.remove(sstable.index_file)
+        if os.path.exists(sstable.filter_file):
+            os.remove(sstable.filter_file)
                 
-    def put(self, key: str, value: Any):
-        """Insert or update key-value pair."""
+    def put(self, key: str, value: Any) -> Optional[Future]:
+        """
+        Insert or update key-value pair. With commit_log_mode='group', returns
+        the commit log's Future for callers that need to wait for durability.
+        """
+        # Write to commit log first; this happens outside the lock so concurrent
+        # writers can share a group commit
+        timestamp = time.time()
+        durable, generation = self.commit_log.enqueue(key, value, timestamp)
+        if self.commit_log.flush_mode == 'batch':
+            self.commit_log.sync(durable)
+        
         with self.lock:
-            # Write to commit log first
-            self.commit_log.append(key, value, time.time())
-            
+            relogged = generation != self.commit_log.generation
+            if relogged:
+                # The memtable this write was logged with was swapped out while
+                # we waited, and its segments go once it is flushed; log the
+                # write again in the segments of the memtable it lands in
+                durable, _ = self.commit_log.enqueue(key, value, timestamp)
+                
             # Write to memtable
-            if self.memtable.put(key, value):
-                # Memtable is full, mark it as immutable
+            if self.memtable.put(key, value) and self.immutable_memtable is None:
+                # Memtable is full, mark it as immutable. Its writes are exactly
+                # the ones in the segments sealed here, which the flush truncates
                 self.immutable_memtable = self.memtable
+                self.immutable_segments = self.commit_log.rotate()
                 self.memtable = Memtable(self.memtable.threshold_bytes)
                 
+        if relogged and self.commit_log.flush_mode == 'batch':
+            self.commit_log.sync(durable)
+        return durable if self.commit_log.flush_mode == 'group' else None
+                
     def get(self, key: str) -> Optional[Any]:
         """Retrieve latest value for key."""
         # Check memtable first
@@ -246,30 +779,101 @@ class CassandraLSM:
             return value
             
         # Check immutable memtable if exists
-        if self.immutable_memtable:
-            result = self.immutable_memtable.get(key)
+        immutable_memtable = self.immutable_memtable
+        if immutable_memtable:
+            result = immutable_memtable.get(key)
             if result:
                 value, timestamp = result
                 if isinstance(value, Tombstone):
                     return None
                 return value
                 
-        # Check SSTables in reverse order (newest first)
-        latest_value = None
-        latest_timestamp = float('-inf')
+        # Check SSTables on a snapshot of the levels. Tables come newest data
+        # first, so the first one holding the key has its latest value
+        while True:
+            levels = self.levels
+            try:
+                for sstable in self._tables_for_key(levels, key):
+                    result = sstable.get(key)
+                    if result:
+                        value, timestamp = result
+                        if isinstance(value, Tombstone):
+                            return None
+                        return value
+                return None
+            except FileNotFoundError:
+                # A compaction removed a table from our snapshot; its data is in
+                # the newly published levels
+                if levels is self.levels:
+                    raise
+            
+    @staticmethod
+    def _tables_for_key(levels: Tuple[Tuple[SSTable, ...], ...], key: str) -> Iterator[SSTable]:
+        """
+        Yield the tables that may hold key, newest data first: every L0 table by
+        descending table_id, then at most one table per level. Compaction only
+        moves data down a level, so a shallower table always holds newer records.
+        """
+        yield from reversed(levels[0])
+        for tables in levels[1:]:
+            # Key ranges within a level are disjoint and sorted, so only the
+            # first table ending at or after key can contain it
+            i = bisect.bisect_left(tables, key, key=lambda ss: ss.max_key)
+            if i < len(tables):
+                yield tables[i]
+        
+    def multi_get(self, keys: Iterable[str]) -> Dict[str, Optional[Any]]:
+        """
+        Retrieve latest values for many keys; missing and deleted keys map to None.
         
-        for sstable in reversed(self.sstables):
-            result = sstable.get(key)
+        Candidate records are found for every key from key ranges, xor filters
+        and the hash indexes alone, and their pages are all requested from the
+        kernel before the first one is decoded, so the disk reads overlap.
+        """
+        results: Dict[str, Optional[Any]] = {}
+        pending = []
+        immutable_memtable = self.immutable_memtable
+        for key in keys:
+            result = self.memtable.get(key)
+            if not result and immutable_memtable:
+                result = immutable_memtable.get(key)
             if result:
                 value, timestamp = result
-                if timestamp > latest_timestamp:
-                    latest_value = value
-                    latest_timestamp = timestamp
+                results[key] = None if isinstance(value, Tombstone) else value
+            else:
+                pending.append(key)
+                
+        while True:
+            levels = self.levels
+            try:
+                candidates = {}
+                for key in pending:
+                    candidates[key] = [
+                        (sstable, positions)
+                        for sstable in self._tables_for_key(levels, key)
+                        if (positions := sstable.locate(key)).size
+                    ]
+                    # Filter false positives are rare, so the first candidate
+                    # is almost always the record that will be read
+                    if candidates[key]:
+                        candidates[key][0][0].prefetch(candidates[key][0][1])
+                        
+                for key in pending:
+                    results[key] = None
+                    for sstable, positions in candidates[key]:
+                        result = sstable.read(key, positions)
+                        if result:
+                            value, timestamp = result
+                            if not isinstance(value, Tombstone):
+                                results[key] = value
+                            break
+                return results
+            except FileNotFoundError:
+                # A compaction removed a table from our snapshot; its data is in
+                # the newly published levels
+                if levels is self.levels:
+                    raise
                     
-        if isinstance(latest_value, Tombstone):
-            return None
-        return latest_value
-        
     def delete(self, key: str):
         """Delete key using tombstone."""
         with self.lock:
@@ -287,19 +891,19 @@ class CassandraLSM:
                     self.next_table_id += 1
                     
                     # Write memtable data to SSTable
-                    sstable.write(
-                        self.immutable_memtable.data,
-                        self.immutable_memtable.timestamps
-                    )
+                    sstable.write_records(self.immutable_memtable.iter_records())
                     
-                    # Add to SSTables list
-                    self.sstables.append(sstable)
+                    # Publish the table in L0
+                    levels = (self.levels[0] + (sstable,),) + self.levels[1:]
+                    self._save_manifest(levels)
+                    self.levels = levels
                     
                     # Clear immutable memtable
                     self.immutable_memtable = None
                     
-                    # Truncate commit log
-                    self.commit_log.truncate()
+                    # Truncate the commit log segments holding only its writes
+                    self.commit_log.truncate(self.immutable_segments)
+                    self.immutable_segments = []
                     
     def _background_compact(self):
         """Background thread for compaction."""
@@ -307,48 +911,91 @@ class CassandraLSM:
             time.sleep(10)
             
             with self.lock:
-                if len(self.sstables) >= self.compaction_threshold:
-                    self._perform_compaction()
+                while self._perform_compaction():
+                    pass
                     
-    def _perform_compaction(self):
-        """Perform size-tiered compaction."""
-        # Sort SSTables by size
-        sstables_by_size = sorted(
-            self.sstables,
-            key=lambda ss: os.path.getsize(ss.data_file)
-        )
+    def _level_limit(self, level: int) -> int:
+        """Size budget in bytes for a level below L0."""
+        return self.level_base_bytes * LEVEL_MULTIPLIER ** (level - 1)
         
-        # Take smallest SSTables for compaction
-        tables_to_compact = sstables_by_size[:self.compaction_threshold]
+    @staticmethod
+    def _overlapping(tables: Tuple[SSTable, ...], min_key: str, max_key: str) -> List[SSTable]:
+        """Tables of a sorted, non-overlapping level whose range meets [min_key, max_key]."""
+        start = bisect.bisect_left(tables, min_key, key=lambda ss: ss.max_key)
+        end = bisect.bisect_right(tables, max_key, key=lambda ss: ss.min_key)
+        return list(tables[start:end])
         
-        # Merge data from all tables
-        merged_data = {}
-        merged_timestamps = {}
+    def _pick_table(self, level: int, tables: Tuple[SSTable, ...]) -> SSTable:
+        """Pick the next table of a level round-robin by key range."""
+        pointer = self.compact_pointers[level]
+        i = 0 if pointer is None else bisect.bisect_right(tables, pointer, key=lambda ss: ss.min_key)
+        if i == len(tables):
+            i = 0
+        self.compact_pointers[level] = tables[i].min_key
+        return tables[i]
         
-        for sstable in tables_to_compact:
-            with open(sstable.data_file, 'rb') as f:
-                for line in f:
-                    entry = json.loads(line.decode('utf-8'))
-                    key = entry['key']
-                    timestamp = entry['timestamp']
+    def _perform_compaction(self) -> bool:
+        """
+        Perform one leveled compaction step. Returns False if no level needs one.
+        
+        All of L0 is merged once it holds compaction_threshold tables; otherwise
+        one table of the first level over its size budget is. Either way the
+        inputs are merged with the overlapping tables of the next level, so the
+        output lands there as non-overlapping tables of at most max_sstable_bytes.
+        """
+        levels = self.levels
+        if len(levels[0]) >= self.compaction_threshold:
+            level = 0
+            inputs = list(levels[0])
+        else:
+            for level in range(1, MAX_LEVELS - 1):
+                if sum(os.path.getsize(ss.data_file) for ss in levels[level]) > self._level_limit(level):
+                    break
+            else:
+                return False
+            inputs = [self._pick_table(level, levels[level])]
+            
+        min_key = min(ss.min_key for ss in inputs)
+        max_key = max(ss.max_key for ss in inputs)
+        inputs += self._overlapping(levels[level + 1], min_key, max_key)
+        
+        # Stream a k-way merge of the key-sorted tables into the new ones; for
+        # equal keys the newest record comes first and the rest are dropped
+        merged = heapq.merge(
+            *(sstable.iter_records() for sstable in inputs),
+            key=lambda entry: (entry.key, -entry.timestamp)
+        )
+        
+        def latest_records() -> Iterator[LogEntry]:
+            previous_key = None
+            for entry in merged:
+                if entry.key != previous_key:
+                    previous_key = entry.key
+                    yield entry
                     
-                    if key not in merged_timestamps or timestamp > merged_timestamps[key]:
-                        merged_data[key] = entry['value']
-                        merged_timestamps[key] = timestamp
-                        
-        # Create new SSTable with merged data
-        new_sstable = SSTable(self.next_table_id, self.directory)
-        self.next_table_id += 1
-        new_sstable.write(merged_data, merged_timestamps)
-        
-        # Replace old SSTables with new one
-        self.sstables = [
-            ss for ss in self.sstables
-            if ss not in tables_to_compact
-        ]
-        self.sstables.append(new_sstable)
+        # Each write_records call stops at max_sstable_bytes and leaves the
+        # remaining records in the generator for the next table
+        records = latest_records()
+        outputs = []
+        for first in records:
+            new_sstable = SSTable(self.next_table_id, self.directory)
+            self.next_table_id += 1
+            new_sstable.write_records(itertools.chain((first,), records), self.max_sstable_bytes)
+            outputs.append(new_sstable)
+            
+        # Replace the inputs with the outputs in a single store, after the
+        # manifest says so
+        new_levels = list(levels)
+        new_levels[level] = tuple(ss for ss in levels[level] if ss not in inputs)
+        new_levels[level + 1] = self._sorted_level(
+            level + 1,
+            [ss for ss in levels[level + 1] if ss not in inputs] + outputs
+        )
+        new_levels = tuple(new_levels)
+        self._save_manifest(new_levels)
+        self.levels = new_levels
         
         # Delete old SSTable files
-        for sstable in tables_to_compact:
-            os.remove(sstable.data_file)
-            os.remove(sstable.index_file)
+        for sstable in inputs:
+            self._remove_sstable(sstable)
+        return True
@@ -1,81 +1,111 @@
+import math
+import asyncio
 import mmh3
-from bitarray import bitarray
+from _bloom_kernels import BLOCK_BITS, block_count_for
 import redis
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 import logging
 import time
-import hashlib
-from concurrent.futures import ThreadPoolExecutor
-import requests
+import functools
+from concurrent.futures import Future
+import threading
+import httpx
 
-class BloomFilter:
-    def __init__(self, capacity: int, error_rate: float = 0.01):
-        self.capacity = capacity
-        self.error_rate = error_rate
-        self.bit_size = self._get_size(capacity, error_rate)
-        self.hash_count = self._get_hash_count(self.bit_size, capacity)
-        self.bit_array = bitarray(self.bit_size)
-        self.bit_array.setall(0)
-    
-    @staticmethod
-    def _get_size(n: int, p: float) -> int:
-        m = -(n * math.log(p)) / (math.log(2)**2)
-        return int(m)
-    
-    @staticmethod
-    def _get_hash_count(m: int, n: int) -> int:
-        k = (m / n) * math.log(2)
-        return int(k)
-    
-    def add(self, item: str) -> None:
-        for i in range(self.hash_count):
-            index = mmh3.hash(item, i) % self.bit_size
-            self.bit_array[index] = 1
-    
-    def contains(self, item: str) -> bool:
-        for i in range(self.hash_count):
-            index = mmh3.hash(item, i) % self.bit_size
-            if not self.bit_array[index]:
-                return False
-        return True
+def bloom_size(n: int, p: float) -> int:
+    """Bits needed for n items at false positive rate p."""
+    m = -(n * math.log(p)) / (math.log(2)**2)
+    return int(m)
+
+def bloom_hash_count(m: int, n: int) -> int:
+    """Optimal number of hashes for m bits and n items."""
+    k = (m / n) * math.log(2)
+    return int(k)
 
 class DistributedBloomFilter:
     def __init__(self, redis_client: redis.Redis, key: str, capacity: int, error_rate: float = 0.01):
         self.redis = redis_client
         self.key = key
-        self.bloom_filter = BloomFilter(capacity, error_rate)
-        self._load_or_initialize()
-    
-    def _load_or_initialize(self) -> None:
-        bloom_data = self.redis.get(self.key)
-        if bloom_data:
-            self.bloom_filter.bit_array = bitarray()
-            self.bloom_filter.bit_array.frombytes(bloom_data)
-        else:
-            self._save_to_redis()
-    
-    def _save_to_redis(self) -> None:
-        self.redis.set(self.key, self.bloom_filter.bit_array.tobytes())
+        # The bitmap only lives in Redis: add/contains move hash_count bits with
+        # SETBIT/GETBIT instead of uploading or downloading the whole filter.
+        # Blocked layout: an item's bits all land in one 512-bit block
+        self.block_count = block_count_for(bloom_size(capacity, error_rate))
+        self.block_mask = self.block_count - 1
+        self.bit_size = self.block_count * BLOCK_BITS
+        self.hash_count = bloom_hash_count(self.bit_size, capacity)
+    
+    def _bit_offsets(self, item: str) -> List[int]:
+        # One 128-bit hash per item: h1 picks the block, h2 the in-block offsets
+        # g1 + i*g2, so an item's bits share one 64-byte span
+        h1, h2 = mmh3.hash64(item, signed=False)
+        base = (h1 & self.block_mask) * BLOCK_BITS
+        g1, g2 = h2 & 0xFFFFFFFF, (h2 >> 32) | 1
+        return [base + ((g1 + i * g2) & (BLOCK_BITS - 1)) for i in range(self.hash_count)]
     
     def add(self, item: str) -> None:
-        self.bloom_filter.add(item)
-        self._save_to_redis()
+        pipe = self.redis.pipeline(transaction=False)
+        for offset in self._bit_offsets(item):
+            pipe.setbit(self.key, offset, 1)
+        pipe.execute()
     
     def contains(self, item: str) -> bool:
-        return self.bloom_filter.contains(item)
+        pipe = self.redis.pipeline(transaction=False)
+        for offset in self._bit_offsets(item):
+            pipe.getbit(self.key, offset)
+        return all(pipe.execute())
+
+# One round trip for a lookup: return the cached content if there is any;
+# otherwise set the content key's Bloom filter bits (ARGV) and report whether
+# any of them was clear, i.e. whether the key is new to the filter.
+# Replies: {1, content} on a hit, {2} for a new key, {3} for a seen key.
+CHECK_AND_MARK = """
+local content = redis.call('GET', KEYS[1])
+if content then
+    return {1, content}
+end
+local new = 0
+for i = 1, #ARGV do
+    if redis.call('SETBIT', KEYS[2], ARGV[i], 1) == 0 then
+        new = 1
+    end
+end
+if new == 1 then
+    return {2}
+end
+return {3}
+"""
+CACHE_HIT, NEW_CONTENT, SEEN_CONTENT = 1, 2, 3
+
+# Request headers that select a distinct variant of the content
+RELEVANT_HEADERS = ('Accept', 'Accept-Encoding', 'Accept-Language')
+
+@functools.lru_cache(maxsize=8192)
+def content_key(url: str, header_values: Tuple[str, ...]) -> str:
+    """Cache key for a URL and its relevant header values (non-cryptographic 128-bit hash)."""
+    header_string = ''.join(f"{k}:{v}" for k, v in zip(RELEVANT_HEADERS, header_values))
+    return mmh3.hash_bytes(f"{url}{header_string}".encode()).hex()
 
 class CDNCacheOptimizer:
     def __init__(self, redis_client: redis.Redis, capacity: int = 10000000, error_rate: float = 0.01):
         self.redis = redis_client
         self.bloom_filter = DistributedBloomFilter(redis_client, "cdn:cache:filter", capacity, error_rate)
         self.logger = logging.getLogger(__name__)
-        self.executor = ThreadPoolExecutor(max_workers=10)  # Adjust based on your needs
+        self._check_and_mark = redis_client.register_script(CHECK_AND_MARK)
+        # Origin fetches run as coroutines on one event loop thread, sharing a
+        # pooled HTTP/2 client, so concurrent fetches reuse a few warm connections
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        self._client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+        )
+        # Origin fetches in progress, keyed by content key, so concurrent misses
+        # for the same content wait on one fetch instead of each going to origin
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
     
     def _generate_content_key(self, url: str, headers: dict) -> str:
         """Generate a unique key for the content based on URL and relevant headers."""
-        relevant_headers = ['Accept', 'Accept-Encoding', 'Accept-Language']
-        header_string = ''.join(f"{k}:{headers.get(k, '')}" for k in relevant_headers)
-        return hashlib.md5(f"{url}{header_string}".encode()).hexdigest()
+        return content_key(url, tuple(str(headers.get(k, '')) for k in RELEVANT_HEADERS))
     
     def should_fetch_from_origin(self, url: str, headers: dict) -> bool:
         """Determine if content should be fetched from the origin server."""
@@ -85,16 +115,16 @@ class CDNCacheOptimizer:
             return True
         return False
     
-    def fetch_and_cache_content(self, url: str, headers: dict) -> Tuple[bytes, dict]:
+    async def fetch_and_cache_content(self, url: str, headers: dict) -> Tuple[bytes, dict]:
         """Fetch content from origin and cache it."""
         try:
-            response = requests.get(url, headers=headers)
-            content = response.content
+            async with self._client.stream('GET', url, headers=headers) as response:
+                content = await response.aread()
             response_headers = dict(response.headers)
             
             # Cache the content (in a real CDN, this would be more complex)
             content_key = self._generate_content_key(url, headers)
-            self.redis.setex(f"cdn:content:{content_key}", 3600, content)  # Cache for 1 hour
+            await asyncio.to_thread(self.redis.setex, f"cdn:content:{content_key}", 3600, content)  # Cache for 1 hour
             
             self.logger.info(f"Fetched and cached content for URL: {url}")
             return content, response_headers
@@ -102,33 +132,75 @@ class CDNCacheOptimizer:
             self.logger.error(f"Error fetching content from origin: {str(e)}")
             raise
     
+    def _check_content(self, content_key: str, client=None) -> list:
+        """Run CHECK_AND_MARK for content_key, on a pipeline if one is given."""
+        return self._check_and_mark(
+            keys=[f"cdn:content:{content_key}", self.bloom_filter.key],
+            args=self.bloom_filter._bit_offsets(content_key),
+            client=client
+        )
+    
+    async def _fetch_from_origin(self, url: str, headers: dict, content_key: str, status: int) -> Tuple[bytes, dict]:
+        try:
+            if status == NEW_CONTENT:
+                self.logger.info(f"Fetching from origin for URL: {url}")
+            else:
+                # This is a false positive. In a real CDN, we might have a secondary cache layer.
+                self.logger.warning(f"Bloom filter false positive for URL: {url}")
+            return await self.fetch_and_cache_content(url, headers)
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(content_key, None)
+    
+    def _fetch_once(self, url: str, headers: dict, content_key: str, status: int) -> Future:
+        """Start an origin fetch on the event loop, or join the one in flight for content_key."""
+        with self._inflight_lock:
+            future = self._inflight.get(content_key)
+            if future is not None:
+                self.logger.info(f"Waiting for in-flight origin fetch for URL: {url}")
+                return future
+            # The coroutine clears its entry under this lock, so it cannot do
+            # that before the entry exists
+            future = asyncio.run_coroutine_threadsafe(
+                self._fetch_from_origin(url, headers, content_key, status), self._loop
+            )
+            self._inflight[content_key] = future
+            return future
+    
     def get_content(self, url: str, headers: dict) -> Tuple[bytes, dict]:
         """Get content, either from cache or origin."""
         content_key = self._generate_content_key(url, headers)
-        cached_content = self.redis.get(f"cdn:content:{content_key}")
+        reply = self._check_content(content_key)
         
-        if cached_content:
+        if reply[0] == CACHE_HIT:
             self.logger.info(f"Cache hit for URL: {url}")
-            return cached_content, {}  # In a real CDN, we'd also cache and return headers
+            return reply[1], {}  # In a real CDN, we'd also cache and return headers
         
-        if self.should_fetch_from_origin(url, headers):
-            self.logger.info(f"Fetching from origin for URL: {url}")
-            return self.fetch_and_cache_content(url, headers)
-        else:
-            # This is a false positive. In a real CDN, we might have a secondary cache layer.
-            self.logger.warning(f"Bloom filter false positive for URL: {url}")
-            return self.fetch_and_cache_content(url, headers)
+        return self._fetch_once(url, headers, content_key, reply[0]).result()
     
     def prefetch_content(self, urls: List[str]) -> None:
-        """Prefetch a list of URLs to warm up the cache."""
-        def prefetch_url(url):
-            try:
-                self.get_content(url, {})
+        """Prefetch a list of URLs to warm up the cache, without waiting for the fetches."""
+        content_keys = [self._generate_content_key(url, {}) for url in urls]
+        pipe = self.redis.pipeline(transaction=False)
+        for content_key in content_keys:
+            self._check_content(content_key, pipe)
+        
+        def log_result(url: str, future: Future) -> None:
+            if future.exception() is not None:
+                self.logger.error(f"Error prefetching content for URL {url}: {str(future.exception())}")
+            else:
                 self.logger.info(f"Prefetched content for URL: {url}")
-            except Exception as e:
-                self.logger.error(f"Error prefetching content for URL {url}: {str(e)}")
         
-        self.executor.map(prefetch_url, urls)
+        # The fetches all run concurrently on the event loop, bounded by the
+        # client's connection limits
+        for url, content_key, reply in zip(urls, content_keys, pipe.execute()):
+            if reply[0] != CACHE_HIT:
+                self._fetch_once(url, {}, content_key, reply[0]).add_done_callback(functools.partial(log_result, url))
+    
+    def close(self) -> None:
+        """Close the HTTP client's connections and stop the event loop."""
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
     
     def clear_cache_for_url(self, url: str) -> None:
         """Clear the cache for a specific URL (e.g., after content update)."""
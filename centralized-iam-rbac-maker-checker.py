@@ -5,17 +5,37 @@
 ```python
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey
+from sqlalchemy import create_engine, update, Column, Integer, String, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, relationship, raiseload
+from sqlalchemy.dialects import postgresql, sqlite
 from passlib.context import CryptContext
+from cachetools import TLRUCache, TTLCache
+from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import jwt
+import hashlib
+import os
+import time
 from datetime import datetime, timedelta
 
 app = FastAPI()
 Base = declarative_base()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Verified against when the username does not exist, so unknown and known users
+# take the same time to reject and response times do not reveal valid usernames
+_DUMMY_HASH = pwd_context.hash("dummy-password")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# One PyJWT instance for the service, and the HMAC key kept as bytes so signing
+# and verifying a token does not re-encode the secret every time
+_jwt = jwt.PyJWT()
+SECRET_KEY = b"SECRET_KEY"
+
+@app.on_event("startup")
+async def size_default_executor():
+    # bcrypt hashing runs in the loop's default executor; give it one thread per core
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=os.cpu_count()))
 
 # Database models
 class User(Base):
@@ -65,6 +85,22 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+# Permission names per user id, so repeat requests skip the role/permission joins.
+# Role and permission assignments invalidate it so privilege changes apply at once.
+_perm_cache = TTLCache(maxsize=5000, ttl=60)
+
+def invalidate_permissions(user_id: Optional[int] = None):
+    """Drop the cached permissions of one user, or of every user."""
+    if user_id is None:
+        _perm_cache.clear()
+    else:
+        _perm_cache.pop(user_id, None)
+
+def insert_ignore_duplicates(model, rows: List[dict]):
+    """Multi-row INSERT that skips rows whose primary key already exists."""
+    dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+    return dialect.insert(model.__table__).values(rows).on_conflict_do_nothing()
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
@@ -72,14 +108,18 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, "SECRET_KEY", algorithm="HS256")
+    encoded_jwt = _jwt.encode(to_encode, SECRET_KEY, algorithm="HS256")
     return encoded_jwt
 
 # Authentication endpoints
 @app.post("/token")
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    # bcrypt is deliberately slow; verify on a worker thread so the event loop keeps serving
+    loop = asyncio.get_running_loop()
+    hashed_password = user.hashed_password if user else _DUMMY_HASH
+    password_ok = await loop.run_in_executor(None, verify_password, form_data.password, hashed_password)
+    if not user or not password_ok:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
     access_token_expires = timedelta(minutes=30)
     access_token = create_access_token(
@@ -90,7 +130,8 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 # RBAC endpoints
 @app.post("/users/")
 async def create_user(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = User(username=user.username, hashed_password=get_password_hash(user.password))
+    hashed_password = await asyncio.get_running_loop().run_in_executor(None, get_password_hash, user.password)
+    db_user = User(username=user.username, hashed_password=hashed_password)
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
@@ -117,6 +158,7 @@ async def assign_role_to_user(user_id: int, role_id: int, db: Session = Depends(
     user_role = UserRole(user_id=user_id, role_id=role_id)
     db.add(user_role)
     db.commit()
+    invalidate_permissions(user_id)
     return {"message": "Role assigned successfully"}
 
 @app.post("/assign_permission/")
@@ -124,15 +166,40 @@ async def assign_permission_to_role(role_id: int, permission_id: int, db: Sessio
     role_permission = RolePermission(role_id=role_id, permission_id=permission_id)
     db.add(role_permission)
     db.commit()
+    # Any number of users may hold the role
+    invalidate_permissions()
     return {"message": "Permission assigned successfully"}
 
+# Bulk variants: one INSERT and one commit for the whole list, and pairs that are
+# already assigned are skipped, so re-running an assignment script is harmless
+@app.post("/assign_roles_bulk/")
+async def assign_roles_to_users(assignments: List[Tuple[int, int]], db: Session = Depends(get_db)):
+    if assignments:
+        rows = [{"user_id": user_id, "role_id": role_id} for user_id, role_id in assignments]
+        db.execute(insert_ignore_duplicates(UserRole, rows))
+        db.commit()
+        for user_id in {user_id for user_id, _ in assignments}:
+            invalidate_permissions(user_id)
+    return {"message": "Roles assigned successfully"}
+
+@app.post("/assign_permissions_bulk/")
+async def assign_permissions_to_roles(assignments: List[Tuple[int, int]], db: Session = Depends(get_db)):
+    if assignments:
+        rows = [{"role_id": role_id, "permission_id": permission_id} for role_id, permission_id in assignments]
+        db.execute(insert_ignore_duplicates(RolePermission, rows))
+        db.commit()
+        invalidate_permissions()
+    return {"message": "Permissions assigned successfully"}
+
 # Maker-Checker Pattern
 class PendingAction(Base):
     __tablename__ = "pending_actions"
+    # Approval queues and dashboards filter on status, usually per maker
+    __table_args__ = (Index("ix_pending_status_maker", "status", "maker_id"),)
     id = Column(Integer, primary_key=True, index=True)
     action_type = Column(String, index=True)
     action_data = Column(String)
-    maker_id = Column(Integer, ForeignKey("users.id"))
+    maker_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     status = Column(String, default="pending")
 
 @app.post("/create_pending_action/")
@@ -145,37 +212,73 @@ async def create_pending_action(action: PendingActionCreate, current_user: User
 
 @app.post("/approve_action/{action_id}")
 async def approve_action(action_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    action = db.query(PendingAction).filter(PendingAction.id == action_id).first()
-    if not action:
-        raise HTTPException(status_code=404, detail="Action not found")
-    if action.maker_id == current_user.id:
-        raise HTTPException(status_code=400, detail="Maker cannot be the checker")
+    # Check and approve in one statement, so two checkers cannot both approve
+    approved = db.execute(
+        update(PendingAction)
+        .where(
+            PendingAction.id == action_id,
+            PendingAction.maker_id != current_user.id,
+            PendingAction.status == "pending",
+        )
+        .values(status="approved")
+        .returning(PendingAction.id)
+    ).first()
+    if approved is None:
+        # Nothing was updated; look the action up only to report why
+        db.rollback()
+        action = db.query(PendingAction).filter(PendingAction.id == action_id).first()
+        if not action:
+            raise HTTPException(status_code=404, detail="Action not found")
+        if action.maker_id == current_user.id:
+            raise HTTPException(status_code=400, detail="Maker cannot be the checker")
+        raise HTTPException(status_code=409, detail="Action is not pending")
     
     # Perform the action based on action_type and action_data
     # This is where you'd implement the actual logic for different types of actions
     
-    action.status = "approved"
     db.commit()
     return {"message": "Action approved successfully"}
 
 # API Security Middleware
+
+# Decoded token payloads keyed by the token's SHA-256, so repeat requests skip the
+# HMAC check. Entries live 30 seconds, or until the token's exp if that is sooner,
+# so an expired token is never served from the cache.
+_jwt_cache = TLRUCache(
+    maxsize=10000,
+    ttu=lambda _key, payload, now: min(now + 30, payload.get("exp", now)),
+    timer=time.time,
+)
+
 async def check_api_permission(permission: str, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     try:
-        payload = jwt.decode(token, "SECRET_KEY", algorithms=["HS256"])
+        token_key = hashlib.sha256(token.encode()).hexdigest()
+        payload = _jwt_cache.get(token_key)
+        if payload is None:
+            payload = _jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+            _jwt_cache[token_key] = payload
         username: str = payload.get("sub")
         if username is None:
             raise HTTPException(status_code=401, detail="Could not validate credentials")
     except JWTError:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
     
-    user = db.query(User).filter(User.username == username).first()
+    # raiseload makes any lazy relationship load on the user fail loudly
+    user = db.query(User).options(raiseload("*")).filter(User.username == username).first()
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     
-    user_permissions = set()
-    for role in user.roles:
-        for perm in role.permissions:
-            user_permissions.add(perm.name)
+    user_permissions = _perm_cache.get(user.id)
+    if user_permissions is None:
+        # All of the user's permission names in one joined query
+        rows = (
+            db.query(Permission.name)
+            .join(RolePermission, RolePermission.permission_id == Permission.id)
+            .join(UserRole, UserRole.role_id == RolePermission.role_id)
+            .filter(UserRole.user_id == user.id)
+        )
+        user_permissions = frozenset(name for (name,) in rows)
+        _perm_cache[user.id] = user_permissions
     
     if permission not in user_permissions:
         raise HTTPException(status_code=403, detail="Not enough permissions")
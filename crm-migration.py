@@ -1,9 +1,10 @@
 import asyncio
 import concurrent.futures
+import os
+import threading
 from typing import List, Dict
 import pandas as pd
 from selenium import webdriver
-from selenium.webdriver.common.by import By
 from sqlalchemy import create_engine, Column, Integer, String
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -17,53 +18,136 @@ class CRMRecord(Base):
     email = Column(String)
     status = Column(String)
 
+def insert_with_execute_values(table, conn, keys, data_iter):
+    """pandas to_sql method: insert each chunk as one multi-row INSERT via psycopg2."""
+    from psycopg2.extras import execute_values  # only Postgres targets need psycopg2
+    
+    table_name = f'{table.schema}.{table.name}' if table.schema else table.name
+    columns = ', '.join(f'"{key}"' for key in keys)
+    with conn.connection.cursor() as cursor:
+        execute_values(cursor, f'INSERT INTO {table_name} ({columns}) VALUES %s', list(data_iter), page_size=1000)
+
 class CRMMigrationTool:
     def __init__(self, source_db_url: str, target_db_url: str):
         self.source_engine = create_engine(source_db_url)
         self.target_engine = create_engine(target_db_url)
         Base.metadata.create_all(self.target_engine)
         
-    async def migrate_records(self, batch_size: int = 500):
-        df = pd.read_sql('SELECT * FROM crm_records', self.source_engine)
-        batches = [df[i:i + batch_size] for i in range(0, len(df), batch_size)]
+    def _copy_records(self):
+        """Stream crm_records from source to target with COPY in Postgres binary format."""
+        columns = ', '.join(column.name for column in CRMRecord.__table__.columns)
+        read_fd, write_fd = os.pipe()
+        source = self.source_engine.raw_connection()
+        target = self.target_engine.raw_connection()
+        
+        def copy_out():
+            # Closing the pipe ends the target's COPY, even if this one fails
+            with os.fdopen(write_fd, 'wb') as pipe_out:
+                with source.cursor() as cursor:
+                    cursor.copy_expert(f'COPY crm_records ({columns}) TO STDOUT WITH BINARY', pipe_out)
+        
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+                copying_out = pool.submit(copy_out)
+                with os.fdopen(read_fd, 'rb') as pipe_in:
+                    with target.cursor() as cursor:
+                        cursor.copy_expert(f'COPY crm_records ({columns}) FROM STDIN WITH BINARY', pipe_in)
+                copying_out.result()
+            target.commit()
+        finally:
+            source.close()
+            target.close()
+    
+    async def migrate_records(self, batch_size: int = 500, max_workers: int = min(8, os.cpu_count() or 1)):
+        loop = asyncio.get_running_loop()
+        
+        # Postgres to Postgres: pipe the server's COPY output straight into the
+        # target's COPY input, without turning rows into Python objects
+        if self.source_engine.dialect.name == self.target_engine.dialect.name == 'postgresql':
+            await loop.run_in_executor(None, self._copy_records)
+            return
         
-        async def process_batch(batch):
-            batch.to_sql('crm_records', self.target_engine, 
-                        if_exists='append', index=False)
+        # execute_values is psycopg2-only; other targets get pandas' own multi-row INSERT
+        insert_method = (insert_with_execute_values
+                         if self.target_engine.dialect.name == 'postgresql' else 'multi')
         
-        tasks = [process_batch(batch) for batch in batches]
-        await asyncio.gather(*tasks)
+        def write_batch(batch):
+            # One transaction and one multi-row INSERT per batch
+            with self.target_engine.begin() as conn:
+                batch.to_sql('crm_records', conn, if_exists='append', index=False,
+                             method=insert_method)
+        
+        # Stream the source table a batch at a time (server-side cursor) while up
+        # to max_workers earlier batches are written on worker threads; at most
+        # max_workers + 1 batches are in memory
+        with self.source_engine.connect().execution_options(stream_results=True) as source, \
+                concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+            batches = pd.read_sql('SELECT * FROM crm_records', source, chunksize=batch_size)
+            writes = set()
+            while (batch := await loop.run_in_executor(None, next, batches, None)) is not None:
+                if len(writes) >= max_workers:
+                    done, writes = await asyncio.wait(writes, return_when=asyncio.FIRST_COMPLETED)
+                    for write in done:
+                        write.result()
+                writes.add(loop.run_in_executor(pool, write_batch, batch))
+            await asyncio.gather(*writes)
+
+# Reads all lead fields in one script round trip to the browser instead of one
+# find_element call per field
+EXTRACT_LEAD_JS = """
+const text = (selector) => document.querySelector(selector).innerText;
+return {
+    name: text('.contact-name'),
+    email: text('.contact-email'),
+    company: text('.company-name')
+};
+"""
 
 class LeadGenerator:
-    def __init__(self, urls: List[str]):
+    def __init__(self, urls: List[str], max_workers: int = 5):
         self.urls = urls
+        self.max_workers = max_workers
         self.options = webdriver.ChromeOptions()
         self.options.add_argument('--headless')
+        # One Chrome per worker thread, started on its first URL and reused for
+        # the rest, instead of one browser start-up per URL
+        self._local = threading.local()
+        self._drivers: List[webdriver.Chrome] = []
+        self._drivers_lock = threading.Lock()
     
     async def generate_leads(self) -> List[Dict]:
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            loop = asyncio.get_event_loop()
-            tasks = [
-                loop.run_in_executor(
-                    executor,
-                    self._scrape_lead_data,
-                    url
-                )
-                for url in self.urls
-            ]
-            return await asyncio.gather(*tasks)
-    
-    def _scrape_lead_data(self, url: str) -> Dict:
-        driver = webdriver.Chrome(options=self.options)
         try:
-            driver.get(url)
-            return {
-                'name': driver.find_element(By.CLASS_NAME, 'contact-name').text,
-                'email': driver.find_element(By.CLASS_NAME, 'contact-email').text,
-                'company': driver.find_element(By.CLASS_NAME, 'company-name').text
-            }
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                loop = asyncio.get_event_loop()
+                tasks = [
+                    loop.run_in_executor(
+                        executor,
+                        self._scrape_lead_data,
+                        url
+                    )
+                    for url in self.urls
+                ]
+                return await asyncio.gather(*tasks)
         finally:
-            driver.quit()
+            # The worker threads are gone once the executor shuts down
+            with self._drivers_lock:
+                drivers, self._drivers = self._drivers, []
+            for driver in drivers:
+                driver.quit()
+    
+    def _get_driver(self) -> webdriver.Chrome:
+        driver = getattr(self._local, 'driver', None)
+        if driver is None:
+            driver = webdriver.Chrome(options=self.options)
+            self._local.driver = driver
+            with self._drivers_lock:
+                self._drivers.append(driver)
+        return driver
+    
+    def _scrape_lead_data(self, url: str) -> Dict:
+        driver = self._get_driver()
+        driver.get(url)
+        return driver.execute_script(EXTRACT_LEAD_JS)
 
 async def main():
     # CRM Migration
@@ -25,13 +25,14 @@ if not conf.settings.configured:
                 "NAME": BASE_DIR / f"db_{slugify(APP_NAME)}.sqlite3",
                 "OPTIONS": {
                     "init_command": (
+                        "PRAGMA busy_timeout = 5000;"
                         "PRAGMA journal_mode = WAL;"
                         "PRAGMA synchronous = NORMAL;"
-                        "PRAGMA busy_timeout = 5000;"
                         "PRAGMA temp_store = MEMORY;"
-                        "PRAGMA mmap_size = 134217728;"
+                        "PRAGMA mmap_size = 1073741824;"
                         "PRAGMA journal_size_limit = 67108864;"
-                        "PRAGMA cache_size = 2000;"
+                        "PRAGMA wal_autocheckpoint = 10000;"
+                        "PRAGMA cache_size = -65536;"
                     ),
                     "transaction_mode": "IMMEDIATE",
                 },
@@ -1,17 +1,33 @@
+import logging
+import threading
+
 import boto3
 from src.app.services.notification_interface import NotificationInterface
 from botocore.exceptions import ClientError
 
+logger = logging.getLogger(__name__)
+
+# boto3 clients are slow to build and safe to share across threads, so one
+# SES client serves every notification
+_SES_CLIENT = None
+_SES_LOCK = threading.Lock()
 
-class EmailNotification(NotificationInterface):
 
-    def __init__(self):
-        self.client = boto3.client('ses', region_name='us-east-1')
+def _client():
+    global _SES_CLIENT
+    if _SES_CLIENT is None:
+        with _SES_LOCK:
+            if _SES_CLIENT is None:
+                _SES_CLIENT = boto3.client('ses', region_name='us-east-1')
+    return _SES_CLIENT
+
+
+class EmailNotification(NotificationInterface):
 
     def send(self, message: str, recipient: str) -> bool:
 
         try:
-            response = self.client.send_email(
+            response = _client().send_email(
                 Source='test@example.com',
                 Destination={'ToAddresses': [recipient]},
                 Message={
@@ -25,9 +41,9 @@ class EmailNotification(NotificationInterface):
                     },
                 }
             )
-            print(f"Email sent! Message ID: {response['MessageId']}")
+            logger.info("Email sent! Message ID: %s", response['MessageId'])
 
             return True
         except ClientError as e:
-            print(e)
+            logger.error("Email to %s failed: %s", recipient, e)
             return False
@@ -1,10 +1,15 @@
+import math
 import random
+from array import array
+from collections import defaultdict, deque
 from typing import Dict, List, Set
 import time
 from dataclasses import dataclass
 from threading import Thread, Lock
 import logging
 
+import mmh3
+
 @dataclass
 class Message:
     """Represents a message in the gossip network"""
@@ -13,23 +18,97 @@ class Message:
     timestamp: float
     ttl: int = 10  # Time-to-live in hops
 
+@dataclass
+class Digest:
+    """
+    Bloom filter of the message ids a node holds, sent in a pull request so the
+    peer can answer with only the messages the requester is missing
+    """
+    bits: bytes
+    size: int
+    k: int
+    seed: int
+
+    @classmethod
+    def build(cls, message_ids: List[str], false_positive_rate: float = 0.01) -> "Digest":
+        n = max(1, len(message_ids))
+        size = max(8, int(-n * math.log(false_positive_rate) / math.log(2) ** 2))
+        k = max(1, round(size / n * math.log(2)))
+        # A new seed per request, so a message hidden by a false positive in one
+        # digest is not hidden in the next
+        digest = cls(bytearray((size + 7) // 8), size, k, random.getrandbits(31))
+        for message_id in message_ids:
+            for index in digest._positions(message_id):
+                digest.bits[index >> 3] |= 1 << (index & 7)
+        digest.bits = bytes(digest.bits)
+        return digest
+
+    def _positions(self, message_id: str):
+        h1, h2 = mmh3.hash64(message_id, self.seed, signed=False)
+        return [(h1 + i * h2) % self.size for i in range(self.k)]
+
+    def might_contain(self, message_id: str) -> bool:
+        return all(self.bits[index >> 3] >> (index & 7) & 1
+                   for index in self._positions(message_id))
+
+class SeenFilter:
+    """
+    Fixed-size cache of 64-bit message id hashes: each hash owns one slot until
+    a newer hash lands there, so memory stays at 8 bytes per slot however many
+    messages pass through
+    """
+    def __init__(self, slots: int = 262144):
+        if slots & (slots - 1):
+            raise ValueError("slots must be a power of two")
+        self._mask = slots - 1
+        self._slots = array('Q', bytes(8 * slots))
+
+    @staticmethod
+    def hash_id(message_id: str) -> int:
+        return mmh3.hash64(message_id, signed=False)[0]
+
+    def test_and_set(self, h: int) -> bool:
+        """Record h; return True if it was already recorded"""
+        i = h & self._mask
+        hit = self._slots[i] == h
+        self._slots[i] = h
+        return hit
+
 class Node:
-    def __init__(self, node_id: str, peers: List[str] = None):
+    def __init__(self, node_id: str, peers: List[str] = None, max_messages: int = 10000):
         self.node_id = node_id
         self.peers = set(peers) if peers else set()
+        # Same peers in a list, so gossip() can pick one without copying the set
+        self._peer_list = list(self.peers)
+        # Only the newest max_messages are kept to gossip; older ids stay in the
+        # seen filter, so the message is not accepted again when it comes back
         self.messages: Dict[str, Message] = {}
+        self.max_messages = max_messages
+        self.seen = SeenFilter()
+        # Ids of the most recently evicted messages, still listed in pull digests
+        # so peers do not resend what the seen filter would only reject
+        self.evicted: deque = deque(maxlen=max_messages)
+        # Ids of the messages already gossiped to each peer, so they are not resent
+        self.sent_to: Dict[str, Set[str]] = defaultdict(set)
         self.message_lock = Lock()
         self.running = False
         self.logger = logging.getLogger(f"Node-{node_id}")
         
     def add_peer(self, peer_id: str):
         """Add a peer to this node's network"""
-        if peer_id != self.node_id:
+        if peer_id != self.node_id and peer_id not in self.peers:
             self.peers.add(peer_id)
+            self._peer_list.append(peer_id)
             
     def remove_peer(self, peer_id: str):
         """Remove a peer from this node's network"""
-        self.peers.discard(peer_id)
+        if peer_id in self.peers:
+            self.peers.discard(peer_id)
+            # Swap with the last entry so the pop is O(1)
+            i = self._peer_list.index(peer_id)
+            self._peer_list[i] = self._peer_list[-1]
+            self._peer_list.pop()
+        self.sent_to.pop(peer_id, None)
         
     def broadcast(self, content: str):
         """Create and broadcast a new message to the network"""
@@ -39,7 +118,8 @@ class Node:
             timestamp=time.time()
         )
         with self.message_lock:
-            self.messages[message.id] = message
+            self.seen.test_and_set(SeenFilter.hash_id(message.id))
+            self._store(message)
         self.logger.info(f"Broadcasting message: {message.content}")
         
     def receive_message(self, message: Message) -> bool:
@@ -53,29 +133,65 @@ class Node:
         with self.message_lock:
             if message.id in self.messages:
                 return False
+            if self.seen.test_and_set(SeenFilter.hash_id(message.id)):
+                # Seen before and already evicted from messages
+                return False
                 
             message.ttl -= 1
-            self.messages[message.id] = message
+            self._store(message)
             self.logger.info(f"Received new message: {message.content}")
             return True
             
+    def _store(self, message: Message):
+        """Keep message, evicting the oldest once over max_messages; needs message_lock"""
+        self.messages[message.id] = message
+        if len(self.messages) > self.max_messages:
+            oldest = next(iter(self.messages))
+            del self.messages[oldest]
+            self.evicted.append(oldest)
+            for sent in self.sent_to.values():
+                sent.discard(oldest)
+            
     def gossip(self):
-        """Randomly select a peer and share a random message"""
-        if not self.peers:
+        """Randomly select a peer and share a random message it has not been sent"""
+        if not self._peer_list:
             return
             
         # Select random peer
-        peer = random.choice(list(self.peers))
+        peer = self._peer_list[random.randrange(len(self._peer_list))]
         
         # Select random message to share
         with self.message_lock:
-            if not self.messages:
+            sent = self.sent_to[peer]
+            unsent = [message for message_id, message in self.messages.items()
+                      if message_id not in sent]
+            if not unsent:
                 return
-            message = random.choice(list(self.messages.values()))
+            message = random.choice(unsent)
+            sent.add(message.id)
             
         # In a real implementation, this would actually send to the peer
         self.logger.info(f"Gossiping message {message.id} to peer {peer}")
         
+    def digest(self) -> Digest:
+        """Digest of every message this node holds or recently evicted, for a pull request"""
+        with self.message_lock:
+            return Digest.build([*self.messages, *self.evicted])
+            
+    def missing_from(self, digest: Digest) -> List[Message]:
+        """Answer a pull request: the messages the digest does not contain"""
+        with self.message_lock:
+            return [message for message_id, message in self.messages.items()
+                    if not digest.might_contain(message_id)]
+            
+    def pull(self, peer: "Node") -> int:
+        """
+        Pull-based gossip round: send a digest instead of pushing messages, and
+        receive only what is missing. Returns the number of new messages.
+        """
+        missing = peer.missing_from(self.digest())
+        return sum(self.receive_message(message) for message in missing)
+        
     def start_gossip(self, interval: float = 1.0):
         """Start the gossip process in a background thread"""
         self.running = True
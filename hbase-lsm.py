@@ -1,87 +1,110 @@
 import os
-import json
+import math
+import mmap
+import bisect
 import time
 import heapq
 import struct
 import threading
-from typing import Any, Dict, List, Optional, Tuple, Set
-from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Set
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
 
+import mmh3
+import numpy as np
+import orjson
+
+# Lengths of row, family, qualifier and value, and the timestamp, ahead of the
+# variable-length fields; compiled once instead of building a format per KeyValue
+KV_HEADER = struct.Struct('>IBIQI')
+
 class KeyValue:
     """HBase KeyValue format."""
+    __slots__ = ('row', 'family', 'qualifier', 'value', 'timestamp', '_fields')
+    
     def __init__(self, row: str, family: str, qualifier: str, value: Any, timestamp: int = None):
         self.row = row
         self.family = family
         self.qualifier = qualifier
         self.value = value
         self.timestamp = timestamp or int(time.time() * 1000)
+        self._fields = None
+        
+    def _encoded_fields(self) -> Tuple[bytes, bytes, bytes, bytes]:
+        # Sized on put and add, written on flush: encode only once
+        if self._fields is None:
+            self._fields = (
+                self.row.encode('utf-8'),
+                self.family.encode('utf-8'),
+                self.qualifier.encode('utf-8'),
+                orjson.dumps(self.value),
+            )
+        return self._fields
+        
+    def byte_size(self) -> int:
+        """Length of to_bytes() without building it."""
+        row_bytes, family_bytes, qualifier_bytes, value_bytes = self._encoded_fields()
+        return (KV_HEADER.size + len(row_bytes) + len(family_bytes)
+                + len(qualifier_bytes) + len(value_bytes))
         
     def to_bytes(self) -> bytes:
         """Serialize KeyValue to bytes."""
-        row_bytes = self.row.encode('utf-8')
-        family_bytes = self.family.encode('utf-8')
-        qualifier_bytes = self.qualifier.encode('utf-8')
-        value_bytes = json.dumps(self.value).encode('utf-8')
-        
-        return struct.pack(
-            f'>I{len(row_bytes)}s'
-            f'B{len(family_bytes)}s'
-            f'I{len(qualifier_bytes)}s'
-            f'Q'
-            f'I{len(value_bytes)}s',
-            len(row_bytes), row_bytes,
-            len(family_bytes), family_bytes,
-            len(qualifier_bytes), qualifier_bytes,
-            self.timestamp,
-            len(value_bytes), value_bytes
-        )
+        row_bytes, family_bytes, qualifier_bytes, value_bytes = self._encoded_fields()
+        return b''.join((
+            KV_HEADER.pack(
+                len(row_bytes), len(family_bytes), len(qualifier_bytes),
+                self.timestamp, len(value_bytes)
+            ),
+            row_bytes, family_bytes, qualifier_bytes, value_bytes
+        ))
     
     @classmethod
     def from_bytes(cls, data: bytes) -> 'KeyValue':
         """Deserialize KeyValue from bytes."""
-        pos = 0
+        return cls.read_from(data, 0)[0]
+    
+    @classmethod
+    def read_from(cls, data: bytes, pos: int) -> Tuple['KeyValue', int]:
+        """Deserialize the KeyValue at data[pos:]; returns it and the offset after it."""
+        row_len, family_len, qualifier_len, timestamp, value_len = KV_HEADER.unpack_from(data, pos)
+        pos += KV_HEADER.size
         
-        # Read row
-        row_len = struct.unpack('>I', data[pos:pos+4])[0]
-        pos += 4
         row = data[pos:pos+row_len].decode('utf-8')
         pos += row_len
-        
-        # Read family
-        family_len = struct.unpack('B', data[pos:pos+1])[0]
-        pos += 1
         family = data[pos:pos+family_len].decode('utf-8')
         pos += family_len
-        
-        # Read qualifier
-        qualifier_len = struct.unpack('>I', data[pos:pos+4])[0]
-        pos += 4
         qualifier = data[pos:pos+qualifier_len].decode('utf-8')
         pos += qualifier_len
+        value = orjson.loads(data[pos:pos+value_len])
+        pos += value_len
         
-        # Read timestamp
-        timestamp = struct.unpack('>Q', data[pos:pos+8])[0]
-        pos += 8
-        
-        # Read value
-        value_len = struct.unpack('>I', data[pos:pos+4])[0]
-        pos += 4
-        value = json.loads(data[pos:pos+value_len].decode('utf-8'))
-        
-        return cls(row, family, qualifier, value, timestamp)
+        return cls(row, family, qualifier, value, timestamp), pos
 
 class WAL:
-    """Write-Ahead Log implementation."""
+    """
+    Write-Ahead Log implementation.
+    
+    append() queues the entry and returns a Future; a committer thread writes
+    everything queued since its last fsync in one write and one fsync, then
+    completes the Futures with their sequence ids. Entries that arrive while
+    an fsync is running share the next one.
+    """
     def __init__(self, path: str):
         self.path = path
         self.current_file = None
         self.sequence_id = 0
+        self._synced_id = 0
+        # First failed write or fsync; the entries it covered are not on disk
+        self._error: Optional[Exception] = None
+        self._cv = threading.Condition()
+        self._pending: List[bytes] = []
+        self._pending_futures: List[Future] = []
         self._ensure_directory()
         self._open_current_file()
+        threading.Thread(target=self._committer, daemon=True).start()
         
     def _ensure_directory(self):
         os.makedirs(os.path.dirname(self.path), exist_ok=True)
@@ -89,33 +112,76 @@ class WAL:
     def _open_current_file(self):
         self.current_file = open(self.path, 'ab+')
         
-    def append(self, kv: KeyValue) -> int:
-        """Append KeyValue to WAL."""
-        self.sequence_id += 1
-        entry = {
-            'sequence_id': self.sequence_id,
-            'timestamp': datetime.now().isoformat(),
-            'kv': {
-                'row': kv.row,
-                'family': kv.family,
-                'qualifier': kv.qualifier,
-                'value': kv.value,
-                'timestamp': kv.timestamp
+    def append(self, kv: KeyValue) -> Future:
+        """Append KeyValue to WAL. The Future's result is its sequence id once durable."""
+        future = Future()
+        with self._cv:
+            self.sequence_id += 1
+            entry = {
+                'sequence_id': self.sequence_id,
+                'timestamp': datetime.now().isoformat(),
+                'kv': {
+                    'row': kv.row,
+                    'family': kv.family,
+                    'qualifier': kv.qualifier,
+                    'value': kv.value,
+                    'timestamp': kv.timestamp
+                }
             }
-        }
-        
-        serialized = json.dumps(entry) + '\n'
-        self.current_file.write(serialized.encode())
-        self.current_file.flush()
-        os.fsync(self.current_file.fileno())
-        return self.sequence_id
+            self._pending.append(orjson.dumps(entry) + b'\n')
+            self._pending_futures.append(future)
+            self._cv.notify_all()
+        return future
+        
+    def _committer(self):
+        while True:
+            with self._cv:
+                self._cv.wait_for(lambda: self._pending)
+                batch, self._pending = self._pending, []
+                futures, self._pending_futures = self._pending_futures, []
+                last_id = self.sequence_id
+            try:
+                self.current_file.write(b''.join(batch))
+                self.current_file.flush()
+                os.fsync(self.current_file.fileno())
+            except Exception as e:
+                with self._cv:
+                    if self._error is None:
+                        self._error = e
+                for future in futures:
+                    future.set_exception(e)
+            else:
+                first_id = last_id - len(futures) + 1
+                for sequence_id, future in enumerate(futures, first_id):
+                    future.set_result(sequence_id)
+            with self._cv:
+                self._synced_id = last_id
+                self._cv.notify_all()
+                
+    def flush_sync(self):
+        """
+        Block until everything appended so far has been written and fsynced.
+        
+        Raises the first write or fsync error if any entry was lost on the way.
+        """
+        with self._cv:
+            target = self.sequence_id
+            self._cv.wait_for(lambda: self._synced_id >= target)
+            if self._error is not None:
+                raise self._error
+
+# Expected entries, bit count and hash count at the start of a saved filter
+BLOOM_HEADER = struct.Struct('>QQI')
 
 class BloomFilter:
     """Bloom filter for HFile block lookups."""
     def __init__(self, expected_entries: int, false_positive_rate: float = 0.01):
+        self.expected_entries = expected_entries
         self.size = self._optimal_size(expected_entries, false_positive_rate)
-        self.num_hashes = self._optimal_hashes(self.size, expected_entries)
-        self.bit_array = [False] * self.size
+        self.num_hashes = max(1, self._optimal_hashes(self.size, expected_entries))
+        # One bit per position, packed 8 to a byte
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        self._steps = np.arange(self.num_hashes, dtype=np.uint64)
         
     def _optimal_size(self, n: int, p: float) -> int:
         return int(-n * math.log(p) / (math.log(2) ** 2))
@@ -123,16 +189,56 @@ class BloomFilter:
     def _optimal_hashes(self, m: int, n: int) -> int:
         return int((m / n) * math.log(2))
         
+    def _hashes(self, item: Any) -> Tuple[int, int]:
+        # Kirsch-Mitzenmacher: all k positions from one 128-bit hash as h1 + i*h2.
+        # mmh3 rather than hash(): str hashes are salted per process, and filters
+        # are shared with compaction workers
+        if not isinstance(item, (str, bytes)):
+            item = str(item)
+        return mmh3.hash64(item, signed=False)
+        
+    def _set(self, idx: np.ndarray):
+        # .at, not |=: two positions can fall in the same byte
+        masks = (1 << (idx & np.uint64(7))).astype(np.uint8)
+        np.bitwise_or.at(self.bits, idx >> np.uint64(3), masks)
+        
     def add(self, item: Any):
-        for seed in range(self.num_hashes):
-            idx = hash(str(item) + str(seed)) % self.size
-            self.bit_array[idx] = True
+        h1, h2 = self._hashes(item)
+        self._set((np.uint64(h1) + self._steps * np.uint64(h2)) % np.uint64(self.size))
+        
+    def add_many(self, items: Iterable[Any]):
+        """Add items in one pass: the positions of all of them as one (n, k) array."""
+        hashes = np.array([self._hashes(item) for item in items], dtype=np.uint64)
+        if len(hashes):
+            self._set((hashes[:, :1] + self._steps * hashes[:, 1:]) % np.uint64(self.size))
             
     def might_contain(self, item: Any) -> bool:
-        return all(
-            self.bit_array[hash(str(item) + str(seed)) % self.size]
-            for seed in range(self.num_hashes)
-        )
+        # A single item's k probes are cheaper as plain int arithmetic than as
+        # numpy calls on a k-element array, and most misses stop at the first.
+        # The mask wraps like the uint64 positions add writes
+        h1, h2 = self._hashes(item)
+        bits = self.bits
+        size = self.size
+        for i in range(self.num_hashes):
+            pos = ((h1 + i * h2) & 0xFFFFFFFFFFFFFFFF) % size
+            if not bits[pos >> 3] >> (pos & 7) & 1:
+                return False
+        return True
+        
+    def save(self, path: str):
+        with open(path, 'wb') as f:
+            f.write(BLOOM_HEADER.pack(self.expected_entries, self.size, self.num_hashes))
+            f.write(self.bits.tobytes())
+            
+    @classmethod
+    def load(cls, path: str) -> 'BloomFilter':
+        with open(path, 'rb') as f:
+            data = f.read()
+        bloom = cls.__new__(cls)
+        bloom.expected_entries, bloom.size, bloom.num_hashes = BLOOM_HEADER.unpack_from(data)
+        bloom.bits = np.frombuffer(data, dtype=np.uint8, offset=BLOOM_HEADER.size).copy()
+        bloom._steps = np.arange(bloom.num_hashes, dtype=np.uint64)
+        return bloom
 
 class HFileBlock:
     """Data block within an HFile."""
@@ -152,27 +258,117 @@ class HFileBlock:
         
     def serialize(self) -> bytes:
         """Serialize block data."""
-        result = bytearray()
-        for kv in self.data:
-            kv_bytes = kv.to_bytes()
-            result.extend(kv_bytes)
-        return bytes(result)
+        # One allocation for the whole block instead of growing a bytearray
+        return b''.join([kv.to_bytes() for kv in self.data])
 
 class HFile:
-    """HBase HFile implementation."""
-    def __init__(self, path: str, block_size: int = 64 * 1024):  # 64KB blocks
+    """
+    HBase HFile implementation.
+    
+    Built with add() and flush(); after that the blocks are dropped from memory
+    and reads go through an mmap of the file, guided by a sparse index of each
+    block's first row.
+    """
+    def __init__(self, path: str, block_size: int = 64 * 1024,  # 64KB blocks
+                 expected_rows: int = 1000):
         self.path = path
+        self.bloom_path = path + '.bloom'
         self.block_size = block_size
         self.blocks: List[HFileBlock] = []
-        self.bloom_filter = BloomFilter(1000)  # Adjust size as needed
+        self.expected_rows = expected_rows
+        self.bloom_filter = BloomFilter(expected_rows)
         self.current_block = HFileBlock(0)
         self.current_block_size = 0
+        # Read side, set up by flush() or open()
+        self.first_rows: List[str] = []
+        self._block_spans: List[Tuple[int, int]] = []  # (start, end) of each block's data
+        self._mm: Optional[mmap.mmap] = None
+        # Readers in get(); a retired file is removed once the last one leaves
+        self._readers = 0
+        self._retired = False
+        self._ref_lock = threading.Lock()
+        
+    @classmethod
+    def open(cls, path: str) -> 'HFile':
+        """Open an HFile written by flush() for reading."""
+        hfile = cls(path)
+        hfile._map()
+        if os.path.exists(hfile.bloom_path):
+            hfile.bloom_filter = BloomFilter.load(hfile.bloom_path)
+        else:
+            # Written without its filter (or the filter was lost): rebuild it
+            rows = set(hfile.iter_rows())
+            hfile.bloom_filter = BloomFilter(max(1, len(rows)))
+            hfile.bloom_filter.add_many(rows)
+            hfile.bloom_filter.save(hfile.bloom_path)
+        hfile.expected_rows = hfile.bloom_filter.expected_entries
+        return hfile
+        
+    def _map(self):
+        """mmap the flushed file and index the first row of every block."""
+        with open(self.path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self._mm
+        header_len = struct.unpack_from('>I', mm)[0]
+        header = orjson.loads(mm[4:4 + header_len])
+        self.block_size = header['block_size']
+        pos = 4 + header_len
+        
+        self.first_rows = []
+        self._block_spans = []
+        for _ in range(header['num_blocks']):
+            block_len = struct.unpack_from('>I', mm, pos)[0]
+            pos += 4
+            if block_len == 0:
+                # Files written before oversized KeyValues were handled can hold empty blocks
+                continue
+            row_start = pos + KV_HEADER.size
+            row_len = KV_HEADER.unpack_from(mm, pos)[0]
+            self.first_rows.append(mm[row_start:row_start + row_len].decode('utf-8'))
+            self._block_spans.append((pos, pos + block_len))
+            pos += block_len
+            
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+            
+    def remove(self):
+        """Close and delete the file and its saved Bloom filter."""
+        self.close()
+        os.remove(self.path)
+        if os.path.exists(self.bloom_path):
+            os.remove(self.bloom_path)
+        
+    def acquire(self) -> bool:
+        """Pin the file for a read. False if it was retired by a compaction."""
+        with self._ref_lock:
+            if self._retired:
+                return False
+            self._readers += 1
+            return True
+            
+    def release(self):
+        with self._ref_lock:
+            self._readers -= 1
+            done = self._retired and self._readers == 0
+        if done:
+            self.remove()
+            
+    def retire(self):
+        """Remove the file now, or when its last reader releases it."""
+        with self._ref_lock:
+            self._retired = True
+            done = self._readers == 0
+        if done:
+            self.remove()
         
     def add(self, kv: KeyValue):
         """Add KeyValue to HFile."""
-        kv_size = len(kv.to_bytes())
+        kv_size = kv.byte_size()
         
-        if self.current_block_size + kv_size > self.block_size:
+        # An oversized KeyValue gets a block of its own rather than an empty one before it
+        if self.current_block.data and self.current_block_size + kv_size > self.block_size:
             self.blocks.append(self.current_block)
             self.current_block = HFileBlock(len(self.blocks))
             self.current_block_size = 0
@@ -181,23 +377,45 @@ class HFile:
         self.current_block_size += kv_size
         self.bloom_filter.add(kv.row)
         
-    def get(self, row: str) -> Optional[KeyValue]:
-        """Get latest value for row."""
+    def iter_kvs(self, first_block: int = 0):
+        """Decode the flushed KeyValues in file order, starting at a block."""
+        mm = self._mm
+        for start, end in self._block_spans[first_block:]:
+            pos = start
+            while pos < end:
+                kv, pos = KeyValue.read_from(mm, pos)
+                yield kv
+        
+    def iter_rows(self):
+        """The row of every flushed KeyValue, without decoding the rest."""
+        mm = self._mm
+        for start, end in self._block_spans:
+            pos = start
+            while pos < end:
+                row_len, family_len, qualifier_len, _, value_len = KV_HEADER.unpack_from(mm, pos)
+                pos += KV_HEADER.size
+                yield mm[pos:pos + row_len].decode('utf-8')
+                pos += row_len + family_len + qualifier_len + value_len
+        
+    def get(self, row: str, family: str = None, qualifier: str = None) -> Optional[KeyValue]:
+        """Get latest value for row, optionally limited to a family/qualifier."""
         if not self.bloom_filter.might_contain(row):
             return None
             
-        # Check current block
-        kv = self.current_block.get(row)
-        if kv:
-            return kv
-            
-        # Check other blocks
-        for block in reversed(self.blocks):
-            kv = block.get(row)
-            if kv:
-                return kv
+        # A row's versions can start in the block before the first block whose
+        # first row is >= row, so begin the scan there
+        first_block = max(bisect.bisect_left(self.first_rows, row) - 1, 0)
+        latest = None
+        for kv in self.iter_kvs(first_block):
+            if kv.row > row:
+                break
+            if (kv.row == row
+                    and (family is None or kv.family == family)
+                    and (qualifier is None or kv.qualifier == qualifier)
+                    and (latest is None or kv.timestamp > latest.timestamp)):
+                latest = kv
                 
-        return None
+        return latest
         
     def flush(self):
         """Flush HFile to disk."""
@@ -210,7 +428,7 @@ class HFile:
                 'block_size': self.block_size,
                 'num_blocks': len(self.blocks)
             }
-            header_bytes = json.dumps(header).encode()
+            header_bytes = orjson.dumps(header)
             f.write(struct.pack('>I', len(header_bytes)))
             f.write(header_bytes)
             
@@ -219,76 +437,123 @@ class HFile:
                 block_data = block.serialize()
                 f.write(struct.pack('>I', len(block_data)))
                 f.write(block_data)
+                
+        # Saved next to the file so opening it later skips the rebuild
+        self.bloom_filter.save(self.bloom_path)
+        
+        # Serve reads from the file from now on
+        self.blocks = []
+        self.current_block = HFileBlock(0)
+        self.current_block_size = 0
+        self._map()
+
+def kv_sort_key(kv: KeyValue) -> Tuple[str, str, str, int]:
+    """HFile order: row, family, qualifier, then newest version first."""
+    return (kv.row, kv.family, kv.qualifier, -kv.timestamp)
+
+def merge_hfiles(hfiles: List[HFile]):
+    """
+    Yield the KeyValues of several HFiles in HFile order.
+    
+    Each file is already sorted, so this is a k-way merge of one KeyValue
+    iterator per file: heapq.merge keeps the heap and the key comparisons in C,
+    where merging whole blocks by their first row would interleave rows.
+    """
+    return heapq.merge(*(hfile.iter_kvs() for hfile in hfiles), key=kv_sort_key)
+
+def compact_partition(paths: List[str], low: Optional[str], high: Optional[str],
+                      out_path: str) -> Optional[str]:
+    """
+    Compaction worker: merge the rows in [low, high) of the HFiles at paths into
+    a new HFile at out_path. Runs in a separate process, so it reads the inputs
+    from disk. Returns out_path, or None if the range held no rows.
+    """
+    hfiles = [HFile.open(path) for path in paths]
+    
+    # Start each input at the block that can hold low instead of decoding every
+    # earlier partition's rows, and size the output's Bloom filter for the
+    # share of each input's blocks that fall in the range
+    iters = []
+    expected_rows = 0
+    for hfile in hfiles:
+        start = max(bisect.bisect_left(hfile.first_rows, low) - 1, 0) if low is not None else 0
+        end = bisect.bisect_left(hfile.first_rows, high) if high is not None else len(hfile.first_rows)
+        iters.append(hfile.iter_kvs(start))
+        if hfile.first_rows:
+            expected_rows += hfile.expected_rows * max(end - start, 0) // len(hfile.first_rows)
+            
+    out = HFile(out_path, expected_rows=max(1, expected_rows))
+    for kv in heapq.merge(*iters, key=kv_sort_key):
+        if high is not None and kv.row >= high:
+            break
+        if low is None or kv.row >= low:
+            out.add(kv)
+    for hfile in hfiles:
+        hfile.close()
+    if not out.current_block.data:
+        return None
+    out.flush()
+    out.close()
+    return out_path
 
 class MemStore:
     """In-memory store for recent updates."""
     def __init__(self, flush_size: int = 64 * 1024 * 1024):  # 64MB
-        self.data: Dict[str, Dict[str, Dict[str, List[KeyValue]]]] = defaultdict(
-            lambda: defaultdict(lambda: defaultdict(list))
-        )
+        # Versions per (row, family, qualifier) in one flat dict, plus the keys of
+        # each row for row- and family-wide lookups
+        self.data: Dict[Tuple[str, str, str], List[KeyValue]] = {}
+        self._by_row: Dict[str, List[Tuple[str, str, str]]] = {}
         self.size = 0
         self.flush_size = flush_size
         self.lock = threading.RLock()
         
     def put(self, kv: KeyValue) -> bool:
         """Add KeyValue to MemStore. Returns True if flush is needed."""
+        key = (kv.row, kv.family, kv.qualifier)
         with self.lock:
-            self.data[kv.row][kv.family][kv.qualifier].append(kv)
-            self.size += len(kv.to_bytes())
+            versions = self.data.get(key)
+            if versions is None:
+                # Publish the key with its first version already in place, so
+                # a reader never finds an empty version list
+                self.data[key] = [kv]
+                self._by_row.setdefault(kv.row, []).append(key)
+            else:
+                versions.append(kv)
+            self.size += kv.byte_size()
             return self.size >= self.flush_size
             
     def get(self, row: str, family: str = None, qualifier: str = None) -> Optional[KeyValue]:
-        """Get latest value for given row/family/qualifier."""
-        with self.lock:
-            if row not in self.data:
-                return None
-                
-            if family is None:
-                # Get latest across all families/qualifiers
-                latest = None
-                latest_ts = -1
-                
-                for fam in self.data[row].values():
-                    for qual in fam.values():
-                        if qual and qual[-1].timestamp > latest_ts:
-                            latest = qual[-1]
-                            latest_ts = latest.timestamp
-                            
-                return latest
-                
-            if family not in self.data[row]:
-                return None
-                
-            if qualifier is None:
-                # Get latest across all qualifiers in family
-                latest = None
-                latest_ts = -1
-                
-                for qual in self.data[row][family].values():
-                    if qual and qual[-1].timestamp > latest_ts:
-                        latest = qual[-1]
-                        latest_ts = latest.timestamp
-                        
-                return latest
-                
-            if qualifier not in self.data[row][family]:
-                return None
-                
-            versions = self.data[row][family][qualifier]
+        """
+        Get latest value for given row/family/qualifier.
+        
+        Takes no lock: put only adds keys and appends versions, and each dict
+        lookup and list append is atomic under the GIL, so a read sees every
+        put that completed before it and never a half-done one.
+        """
+        if family is not None and qualifier is not None:
+            versions = self.data.get((row, family, qualifier))
             return versions[-1] if versions else None
             
+        # Get latest across the row's qualifiers, or the family's if given
+        latest = None
+        latest_ts = -1
+        for key in self._by_row.get(row, ()):
+            if family is not None and key[1] != family:
+                continue
+            kv = self.data[key][-1]
+            if kv.timestamp > latest_ts:
+                latest = kv
+                latest_ts = kv.timestamp
+                
+        return latest
+            
     def to_hfile(self, path: str) -> HFile:
         """Convert MemStore to HFile."""
-        hfile = HFile(path)
+        hfile = HFile(path, expected_rows=max(1, len(self._by_row)))
         
         # Sort all KeyValues by row, family, qualifier, timestamp
-        all_kvs = []
-        for row_data in self.data.values():
-            for family_data in row_data.values():
-                for qualifier_data in family_data.values():
-                    all_kvs.extend(qualifier_data)
-                    
-        all_kvs.sort(key=lambda kv: (kv.row, kv.family, kv.qualifier, -kv.timestamp))
+        all_kvs = [kv for versions in self.data.values() for kv in versions]
+        all_kvs.sort(key=kv_sort_key)
         
         for kv in all_kvs:
             hfile.add(kv)
@@ -300,28 +565,44 @@ class HRegion:
     def __init__(self, 
                  region_id: str,
                  base_dir: str,
-                 memstore_size: int = 64 * 1024 * 1024):  # 64MB
+                 memstore_size: int = 64 * 1024 * 1024,  # 64MB
+                 compaction_workers: int = 1):
         self.region_id = region_id
         self.base_dir = base_dir
+        # Above 1, compactions are split by row range across a process pool
+        self.compaction_workers = compaction_workers
+        self._compaction_pool: Optional[ProcessPoolExecutor] = None
+        self._compacted_hfiles = 0
         self.memstore = MemStore(memstore_size)
-        self.hfiles: List[HFile] = []
         self.wal = WAL(os.path.join(base_dir, f"wal-{region_id}.log"))
         self.lock = threading.RLock()
         
         # Create region directory
         os.makedirs(base_dir, exist_ok=True)
         
-    def put(self, row: str, family: str, qualifier: str, value: Any):
-        """Put value into region."""
+        # Reopen HFiles left by an earlier run, oldest first
+        prefix = f"hfile-{region_id}-"
+        existing = [entry for entry in os.scandir(base_dir)
+                    if entry.name.startswith(prefix) and entry.name.endswith('.db')]
+        existing.sort(key=lambda entry: entry.stat().st_mtime_ns)
+        self.hfiles: List[HFile] = [HFile.open(entry.path) for entry in existing]
+        self._rebuild_row_filter()
+        
+    def put(self, row: str, family: str, qualifier: str, value: Any) -> Future:
+        """
+        Put value into region. Returns the WAL Future; wait on it when the put
+        must be durable before going on.
+        """
         with self.lock:
             kv = KeyValue(row, family, qualifier, value)
             
             # Write to WAL first
-            self.wal.append(kv)
+            durable = self.wal.append(kv)
             
             # Write to MemStore
             if self.memstore.put(kv):
                 self._flush_memstore()
+            return durable
                 
     def get(self, row: str, family: str = None, qualifier: str = None) -> Optional[Any]:
         """Get latest value from region."""
@@ -330,66 +611,110 @@ class HRegion:
         if kv:
             return kv.value
             
-        # Check HFiles in reverse order
-        for hfile in reversed(self.hfiles):
-            kv = hfile.get(row)
-            if kv and (family is None or kv.family == family) and \
-               (qualifier is None or kv.qualifier == qualifier):
-                return kv.value
-                
-        return None
+        # One region-wide filter rules out rows that no HFile holds
+        if not self.row_filter.might_contain(row):
+            return None
+            
+        # Check HFiles in reverse order. A compaction may retire the files of
+        # the list we picked up; those are pinned while read, and if one is
+        # already gone the compacted files published in its place are read instead
+        while True:
+            for hfile in reversed(self.hfiles):
+                if not hfile.acquire():
+                    break
+                try:
+                    kv = hfile.get(row, family, qualifier)
+                finally:
+                    hfile.release()
+                if kv:
+                    return kv.value
+            else:
+                return None
         
     def _flush_memstore(self):
         """Flush MemStore to HFile."""
         hfile_path = os.path.join(
             self.base_dir,
-            f"hfile-{self.region_id}-{int(time.time())}.db"
+            f"hfile-{self.region_id}-{time.time_ns()}.db"
         )
         
         # Convert MemStore to HFile
         hfile = self.memstore.to_hfile(hfile_path)
         hfile.flush()
         
-        # Add to HFiles list
-        self.hfiles.append(hfile)
+        # Add the new rows to the region filter, or resize it once it holds
+        # more rows than it was built for
+        self._row_filter_rows += hfile.expected_rows
+        if self._row_filter_rows > self.row_filter.expected_entries:
+            self.hfiles.append(hfile)
+            self._rebuild_row_filter()
+        else:
+            self.row_filter.add_many(self.memstore._by_row)
+            self.hfiles.append(hfile)
         
         # Create new MemStore
         self.memstore = MemStore(self.memstore.flush_size)
         
-        # Trigger compaction if needed
-        if len(self.hfiles) > 3:  # Configurable threshold
+        # Trigger compaction if needed; a parallel compaction leaves one file per
+        # row range, so only files flushed since then count
+        if len(self.hfiles) - self._compacted_hfiles > 3:  # Configurable threshold
             self._compact_files()
             
+    def _rebuild_row_filter(self):
+        """Build the region-wide row filter with room for twice the rows on disk."""
+        rows = sum(hfile.expected_rows for hfile in self.hfiles)
+        row_filter = BloomFilter(max(1000, 2 * rows))
+        for hfile in self.hfiles:
+            row_filter.add_many(set(hfile.iter_rows()))
+        self.row_filter = row_filter
+        self._row_filter_rows = rows
+        
+    def _partition_bounds(self) -> List[Tuple[Optional[str], Optional[str]]]:
+        """Split the row space into up to compaction_workers ranges of similar size."""
+        rows = sorted(row for hfile in self.hfiles for row in hfile.first_rows)
+        parts = min(self.compaction_workers, len(rows))
+        splits = sorted({rows[len(rows) * i // parts] for i in range(1, parts)})
+        return list(zip([None] + splits, splits + [None]))
+        
     def _compact_files(self):
         """Perform major compaction on HFiles."""
+        bounds = self._partition_bounds()
+        if len(bounds) > 1:
+            self._compact_files_parallel(bounds)
+            return
+            
         # Create new HFile for compacted data
         compact_path = os.path.join(
             self.base_dir,
-            f"hfile-{self.region_id}-compact-{int(time.time())}.db"
+            f"hfile-{self.region_id}-compact-{time.time_ns()}.db"
         )
-        compact_file = HFile(compact_path)
-        
-        # Merge all HFiles using a priority queue
-        pq = []
-        file_iters = []
-        
-        for hfile in self.hfiles:
-            file_iter = iter(hfile.blocks)
-            try:
-                block = next(file_iter)
-                heapq.heappush(pq, (block.data[0].row, block, file_iter))
-            except StopIteration:
-                continue
-                
-        # Process all blocks in sorted order
-        while pq:
-            row, block, file_iter = heapq.heappop(pq)
-            
-            # Add all KeyValues from block
-            for kv in block.data:
-                compact_file.add(kv)
-                
-            # Get next block from same file
-            try:
-                next_block = next(file_iter)
-                heapq.heappush(pq, (next_block.data[0].row, next_block, file_iter))
\ No newline at end of file
+        compact_file = HFile(compact_path,
+                             expected_rows=sum(hfile.expected_rows for hfile in self.hfiles))
+        
+        for kv in merge_hfiles(self.hfiles):
+            compact_file.add(kv)
+        compact_file.flush()
+        self._replace_hfiles([compact_file])
+        
+    def _compact_files_parallel(self, bounds: List[Tuple[Optional[str], Optional[str]]]):
+        """Merge each row range in its own process; the outputs don't overlap."""
+        if self._compaction_pool is None:
+            self._compaction_pool = ProcessPoolExecutor(self.compaction_workers)
+        paths = [hfile.path for hfile in self.hfiles]
+        stamp = time.time_ns()
+        futures = [
+            self._compaction_pool.submit(
+                compact_partition, paths, low, high,
+                os.path.join(self.base_dir, f"hfile-{self.region_id}-compact-{stamp}-{i}.db")
+            )
+            for i, (low, high) in enumerate(bounds)
+        ]
+        out_paths = [future.result() for future in futures]
+        self._replace_hfiles([HFile.open(path) for path in out_paths if path])
+        
+    def _replace_hfiles(self, compacted: List[HFile]):
+        old_hfiles, self.hfiles = self.hfiles, compacted
+        self._compacted_hfiles = len(compacted)
+        self._rebuild_row_filter()
+        for hfile in old_hfiles:
+            hfile.retire()
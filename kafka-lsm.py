@@ -1,11 +1,52 @@
 import os
-import json
+import mmap
 import time
+import zlib
+import struct
 import threading
+import msgspec
 from typing import Any, Dict, List, Optional, Iterator, Tuple
 from collections import OrderedDict
 from pathlib import Path
 
+class Record(msgspec.Struct, array_like=True):
+    """Timestamp and value of a segment entry; the key is encoded ahead of it."""
+    timestamp: float
+    value: Any
+
+# Each entry is a fixed header (payload length, key length, CRC32 of the
+# payload) followed by the payload: the msgpack key, then the msgpack Record.
+# Loading the index only decodes the keys, and a torn or corrupt tail fails
+# its checksum instead of being read as data
+RECORD_HEADER = struct.Struct('<III')
+
+ENCODER = msgspec.msgpack.Encoder()
+KEY_DECODER = msgspec.msgpack.Decoder()
+RECORD_DECODER = msgspec.msgpack.Decoder(Record)
+
+def encode_entry(key: Any, value: Any) -> bytes:
+    """Frame one entry for a segment file."""
+    key_bytes = ENCODER.encode(key)
+    payload = key_bytes + ENCODER.encode(Record(time.time(), value))
+    return RECORD_HEADER.pack(len(payload), len(key_bytes), zlib.crc32(payload)) + payload
+
+def iter_records(buf) -> Iterator[Tuple[int, memoryview, memoryview]]:
+    """
+    Yield (offset, key bytes, Record bytes) for each intact entry in buf,
+    stopping at the first truncated or corrupt one.
+    """
+    view = memoryview(buf)
+    end = len(view)
+    offset = 0
+    while offset + RECORD_HEADER.size <= end:
+        length, key_length, crc = RECORD_HEADER.unpack_from(view, offset)
+        start = offset + RECORD_HEADER.size
+        payload = view[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        yield offset, payload[:key_length], payload[key_length:]
+        offset = start + length
+
 class Segment:
     """Represents an immutable log segment file."""
     def __init__(self, base_dir: str, segment_id: int):
@@ -15,33 +56,31 @@ class Segment:
         self.index: Dict[Any, int] = {}  # key -> file offset
         self._load_index()
         
+    def _map(self) -> Optional[mmap.mmap]:
+        """
+        Map the segment file read-only, or None if it is missing or empty. The
+        mapping is never closed explicitly: record views may still point into it,
+        and CPython unmaps it once the last of them is gone.
+        """
+        if not os.path.exists(self.filename) or os.path.getsize(self.filename) == 0:
+            return None
+        with open(self.filename, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
     def _load_index(self):
         """Load index from segment file."""
-        if not os.path.exists(self.filename):
+        mm = self._map()
+        if mm is None:
             return
             
-        with open(self.filename, 'r') as f:
-            offset = 0
-            while True:
-                line = f.readline()
-                if not line:
-                    break
-                    
-                entry = json.loads(line)
-                self.index[entry['key']] = offset
-                offset = f.tell()
+        for offset, key_bytes, _ in iter_records(mm):
+            self.index[KEY_DECODER.decode(key_bytes)] = offset
     
     def append(self, key: Any, value: Any) -> int:
         """Append key-value pair to segment file."""
-        entry = {
-            'timestamp': time.time(),
-            'key': key,
-            'value': value
-        }
-        
-        with open(self.filename, 'a') as f:
+        with open(self.filename, 'ab') as f:
             offset = f.tell()
-            f.write(json.dumps(entry) + '\n')
+            f.write(encode_entry(key, value))
             f.flush()
             os.fsync(f.fileno())
             
@@ -54,21 +93,44 @@ class Segment:
         if offset is None:
             return None
             
-        with open(self.filename, 'r') as f:
+        with open(self.filename, 'rb') as f:
             f.seek(offset)
-            entry = json.loads(f.readline())
-            return entry['value']
+            length, key_length, _ = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+            payload = f.read(length)
+            return RECORD_DECODER.decode(payload[key_length:]).value
             
     def iter_entries(self) -> Iterator[Tuple[Any, Any]]:
         """Iterate through all entries in segment."""
-        with open(self.filename, 'r') as f:
-            while True:
-                line = f.readline()
-                if not line:
-                    break
-                    
-                entry = json.loads(line)
-                yield entry['key'], entry['value']
+        mm = self._map()
+        if mm is None:
+            return
+            
+        for _, key_bytes, record_bytes in iter_records(mm):
+            yield KEY_DECODER.decode(key_bytes), RECORD_DECODER.decode(record_bytes).value
+    
+    def iter_frames(self) -> Iterator[Tuple[Any, bytes]]:
+        """Yield (key, framed entry) for each entry, decoding only the key."""
+        mm = self._map()
+        if mm is None:
+            return
+            
+        for offset, key_bytes, record_bytes in iter_records(mm):
+            end = offset + RECORD_HEADER.size + len(key_bytes) + len(record_bytes)
+            yield KEY_DECODER.decode(key_bytes), mm[offset:end]
+            
+    def append_frames(self, frames: Dict[Any, bytes]):
+        """Append already framed entries with a single write and fsync."""
+        offsets = {}
+        with open(self.filename, 'ab') as f:
+            offset = f.tell()
+            for key, frame in frames.items():
+                offsets[key] = offset
+                offset += len(frame)
+            f.write(b''.join(frames.values()))
+            f.flush()
+            os.fsync(f.fileno())
+            
+        self.index.update(offsets)
     
     def size(self) -> int:
         """Get size of segment file in bytes."""
@@ -186,17 +248,17 @@ class KafkaLSMTree:
         compact_segment = Segment(self.base_dir, self.next_segment_id)
         self.next_segment_id += 1
         
-        # Track latest value for each key
-        latest_values: Dict[Any, Any] = {}
+        # Track latest entry for each key; entries are copied as they are
+        # framed on disk, so values are never decoded and keep their timestamps
+        latest_frames: Dict[Any, bytes] = {}
         
-        # Collect latest values from all segments
+        # Collect latest entries from all segments
         for segment in self.segments:
-            for key, value in segment.iter_entries():
-                latest_values[key] = value
+            for key, frame in segment.iter_frames():
+                latest_frames[key] = frame
         
         # Write compacted data to new segment
-        for key, value in latest_values.items():
-            compact_segment.append(key, value)
+        compact_segment.append_frames(latest_frames)
         
         # Replace old segments with compacted segment
         old_segments = self.segments
@@ -0,0 +1,170 @@
+import importlib.util
+import os
+import time
+
+import numpy as np
+import pytest
+
+# cassandra-lsm.py is a script, not an importable module name
+_spec = importlib.util.spec_from_file_location(
+    "cassandra_lsm", os.path.join(os.path.dirname(__file__), "cassandra-lsm.py")
+)
+cassandra_lsm = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(cassandra_lsm)
+
+
+def logged_keys(paths):
+    """Keys a replay of these commit log segments would see, in order."""
+    keys = []
+    for path in paths:
+        with open(path, "rb") as f:
+            keys += [cassandra_lsm.LOG_DECODER.decode(payload).key
+                     for payload in cassandra_lsm.iter_frames(f)]
+    return keys
+
+
+def test_commit_log_replays_appended_records(tmp_path):
+    log = cassandra_lsm.CommitLog(str(tmp_path))
+    for i in range(10):
+        log.append(f"k{i}", i, float(i))
+    assert logged_keys(log._segments) == [f"k{i}" for i in range(10)]
+
+
+def test_commit_log_rolls_over_full_segments(tmp_path):
+    log = cassandra_lsm.CommitLog(str(tmp_path))
+    log.segment_size = 256
+    for i in range(50):
+        log.append(f"k{i}", "x" * 10, 0.0)
+    assert len(log._segments) > 1
+    assert logged_keys(log._segments) == [f"k{i}" for i in range(50)]
+
+
+def test_truncate_recycles_only_sealed_segments(tmp_path):
+    log = cassandra_lsm.CommitLog(str(tmp_path))
+    log.append("before", 1, 0.0)
+    sealed = log.rotate()
+    log.append("after", 2, 0.0)
+
+    log.truncate(sealed)
+
+    assert not any(os.path.exists(path) for path in sealed)
+    assert logged_keys(log._segments) == ["after"]
+    # The recycled segment is reused, and its old records are not replayed
+    log.rotate()
+    log.append("reused", 3, 0.0)
+    assert logged_keys(log._segments) == ["reused"]
+
+
+def test_failed_batch_is_reported_and_not_retried(tmp_path, monkeypatch):
+    log = cassandra_lsm.CommitLog(str(tmp_path))
+    write_batch = log._write_batch
+    failures = [OSError("disk full")]
+
+    def flaky_write(batch):
+        if failures:
+            raise failures.pop()
+        write_batch(batch)
+
+    monkeypatch.setattr(log, "_write_batch", flaky_write)
+    with pytest.raises(OSError):
+        log.append("failed", 1, 0.0)
+    log.append("ok", 2, 0.0)
+
+    assert logged_keys(log._segments) == ["ok"]
+
+
+def test_group_mode_settles_futures(tmp_path, monkeypatch):
+    log = cassandra_lsm.CommitLog(str(tmp_path), flush_mode="group", flush_interval_ms=1)
+    futures = [log.append(f"k{i}", i, 0.0) for i in range(5)]
+    for future in futures:
+        future.result(timeout=5)
+    assert logged_keys(log._segments) == [f"k{i}" for i in range(5)]
+
+    def failing_write(batch):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(log, "_write_batch", failing_write)
+    with pytest.raises(OSError):
+        log.append("failed", 1, 0.0).result(timeout=5)
+
+
+def test_flush_keeps_writes_made_after_the_memtable_swap(tmp_path):
+    db = cassandra_lsm.CassandraLSM(str(tmp_path), memtable_threshold=100)
+    i = 0
+    while db.immutable_memtable is None:
+        db.put(f"a{i}", i)
+        i += 1
+    for j in range(5):
+        db.put(f"b{j}", j)
+
+    deadline = time.monotonic() + 10
+    while db.immutable_memtable is not None and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert db.immutable_memtable is None
+
+    keys = logged_keys(db.commit_log._segments)
+    assert [f"b{j}" for j in range(5)] == [key for key in keys if key.startswith("b")]
+    assert not any(key.startswith("a") for key in keys)
+    assert db.get("a0") == 0
+    assert db.get("b4") == 4
+
+
+def test_put_relogs_a_write_whose_memtable_was_swapped(tmp_path, monkeypatch):
+    db = cassandra_lsm.CassandraLSM(str(tmp_path))
+    log = db.commit_log
+    sync = log.sync
+    sealed = []
+
+    def sync_then_rotate(future):
+        # Simulate a memtable swap landing between the log write and the insert
+        sync(future)
+        if not sealed:
+            sealed.extend(log.rotate())
+
+    monkeypatch.setattr(log, "sync", sync_then_rotate)
+    db.put("x", 1)
+
+    assert logged_keys(sealed) == ["x"]
+    assert logged_keys(log._segments) == ["x"]
+    assert db.get("x") == 1
+
+
+def test_xor_filter_has_no_false_negatives(tmp_path):
+    key_hashes = np.array([cassandra_lsm.key_hash(f"k{i}") for i in range(20000)], dtype="<u8")
+    xor_filter = cassandra_lsm.XorFilter.build(key_hashes)
+    assert all(xor_filter.contains(int(h)) for h in key_hashes)
+
+    misses = sum(xor_filter.contains(cassandra_lsm.key_hash(f"x{i}")) for i in range(20000))
+    assert misses / 20000 < 0.01
+
+    path = str(tmp_path / "filter.db")
+    xor_filter.save(path)
+    loaded = cassandra_lsm.XorFilter.load(path)
+    assert loaded.seed == xor_filter.seed
+    assert (loaded.table == xor_filter.table).all()
+
+
+def test_sstable_round_trip(tmp_path):
+    data = {f"k{i:03}": {"v": i} for i in range(200)}
+    timestamps = {key: float(i) for i, key in enumerate(data)}
+    cassandra_lsm.SSTable(0, str(tmp_path)).write(data, timestamps)
+
+    sstable = cassandra_lsm.SSTable(0, str(tmp_path))
+    assert sstable.get("k007") == ({"v": 7}, 7.0)
+    assert sstable.get("missing") is None
+    assert (sstable.min_key, sstable.max_key) == ("k000", "k199")
+    assert [entry.key for entry in sstable.iter_records()] == sorted(data)
+
+
+def test_truncate_in_a_directory_named_like_a_segment(tmp_path):
+    directory = tmp_path / "commitlog-data"
+    log = cassandra_lsm.CommitLog(str(directory))
+    log.append("before", 1, 0.0)
+    sealed = log.rotate()
+
+    log.truncate(sealed)
+
+    assert [name for name in os.listdir(directory) if name.startswith("commitlog-recycled-")]
+    log.rotate()
+    log.append("reused", 2, 0.0)
+    assert logged_keys(log._segments) == ["reused"]
@@ -0,0 +1,197 @@
+import importlib.util
+import itertools
+import os
+
+import pytest
+
+# hbase-lsm.py is a script, not an importable module name
+_spec = importlib.util.spec_from_file_location(
+    "hbase_lsm", os.path.join(os.path.dirname(__file__), "hbase-lsm.py")
+)
+hbase_lsm = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(hbase_lsm)
+
+
+@pytest.fixture
+def ticking_clock(monkeypatch):
+    """Give every KeyValue its own timestamp, so "latest" is never a tie."""
+    ticks = itertools.count(1_000_000)
+    monkeypatch.setattr(hbase_lsm.time, "time", lambda: next(ticks))
+
+
+def write_hfile(path, kvs, block_size=256):
+    hfile = hbase_lsm.HFile(path, block_size=block_size, expected_rows=len(kvs))
+    for kv in sorted(kvs, key=hbase_lsm.kv_sort_key):
+        hfile.add(kv)
+    hfile.flush()
+    return hfile
+
+
+def sample_kvs(rows=100, versions=3, start_ts=1):
+    ts = itertools.count(start_ts)
+    return [
+        hbase_lsm.KeyValue(f"row{r:03}", family, "q", {"r": r, "v": v}, next(ts))
+        for v in range(versions)
+        for r in range(rows)
+        for family in ("a", "b")
+    ]
+
+
+def test_hfile_get_through_mmap(tmp_path):
+    hfile = write_hfile(str(tmp_path / "h.db"), sample_kvs())
+    assert hfile.blocks == []
+    assert len(hfile.first_rows) > 1
+
+    assert hfile.get("row042", "a", "q").value == {"r": 42, "v": 2}
+    assert hfile.get("row042").value == {"r": 42, "v": 2}
+    assert hfile.get("row000", "b").family == "b"
+    assert hfile.get("row042", "c") is None
+    assert hfile.get("row999") is None
+    # Every row is found, including ones whose versions straddle a block boundary
+    assert all(hfile.get(f"row{r:03}", "b", "q").value == {"r": r, "v": 2} for r in range(100))
+
+
+def test_hfile_open_loads_or_rebuilds_its_bloom_filter(tmp_path):
+    path = str(tmp_path / "h.db")
+    write_hfile(path, sample_kvs()).close()
+    assert os.path.exists(path + ".bloom")
+
+    reopened = hbase_lsm.HFile.open(path)
+    assert reopened.expected_rows == 600
+    assert reopened.get("row007", "a", "q").value == {"r": 7, "v": 2}
+    reopened.close()
+
+    os.remove(path + ".bloom")
+    rebuilt = hbase_lsm.HFile.open(path)
+    assert rebuilt.expected_rows == 100
+    assert all(rebuilt.bloom_filter.might_contain(f"row{r:03}") for r in range(100))
+    assert os.path.exists(path + ".bloom")
+
+
+def test_bloom_filter_batch_and_single_adds_agree():
+    items = [f"row{i}" for i in range(5000)] + list(range(100))
+    single = hbase_lsm.BloomFilter(len(items))
+    for item in items:
+        single.add(item)
+    batch = hbase_lsm.BloomFilter(len(items))
+    batch.add_many(items)
+
+    assert (single.bits == batch.bits).all()
+    assert all(batch.might_contain(item) for item in items)
+    assert sum(batch.might_contain(f"miss{i}") for i in range(10000)) < 300
+
+
+def test_merge_hfiles_yields_hfile_order(tmp_path):
+    kvs = sample_kvs()
+    hfiles = [write_hfile(str(tmp_path / f"h{i}.db"), kvs[i::3]) for i in range(3)]
+
+    merged = list(hbase_lsm.merge_hfiles(hfiles))
+
+    assert [hbase_lsm.kv_sort_key(kv) for kv in merged] == sorted(map(hbase_lsm.kv_sort_key, kvs))
+
+
+def test_compact_partition_covers_its_range_only(tmp_path):
+    kvs = sample_kvs()
+    paths = []
+    for i in range(3):
+        paths.append(str(tmp_path / f"h{i}.db"))
+        write_hfile(paths[-1], kvs[i::3]).close()
+
+    bounds = [(None, "row030"), ("row030", "row070"), ("row070", None)]
+    outputs = [
+        hbase_lsm.compact_partition(paths, low, high, str(tmp_path / f"out{i}.db"))
+        for i, (low, high) in enumerate(bounds)
+    ]
+    compacted = [hbase_lsm.HFile.open(path) for path in outputs]
+
+    for hfile, (low, high) in zip(compacted, bounds):
+        rows = {kv.row for kv in hfile.iter_kvs()}
+        assert all((low is None or row >= low) and (high is None or row < high) for row in rows)
+        assert hfile.expected_rows < 600
+    merged = [kv for hfile in compacted for kv in hfile.iter_kvs()]
+    assert [hbase_lsm.kv_sort_key(kv) for kv in merged] == sorted(map(hbase_lsm.kv_sort_key, kvs))
+    assert hbase_lsm.compact_partition(paths, "zzz", None, str(tmp_path / "empty.db")) is None
+
+
+def test_region_compaction_keeps_latest_values(tmp_path, ticking_clock):
+    region = hbase_lsm.HRegion("r1", str(tmp_path), memstore_size=1500)
+    expected = {}
+    for i in range(600):
+        row, qualifier = f"row{i % 40:03}", f"q{i % 3}"
+        region.put(row, "cf", qualifier, i)
+        expected[(row, qualifier)] = i
+    region.wal.flush_sync()
+
+    # More than three flushes trigger compaction, which replaces the files it merged
+    assert 1 <= len(region.hfiles) <= 4
+    assert any("-compact-" in hfile.path for hfile in region.hfiles)
+    names = os.listdir(tmp_path)
+    assert len([name for name in names if name.endswith(".db")]) == len(region.hfiles)
+    assert len([name for name in names if name.endswith(".bloom")]) == len(region.hfiles)
+    for (row, qualifier), value in expected.items():
+        assert region.get(row, "cf", qualifier) == value
+    assert region.get("missing") is None
+
+
+def test_region_reopens_its_hfiles(tmp_path, ticking_clock):
+    region = hbase_lsm.HRegion("r1", str(tmp_path), memstore_size=1500)
+    for i in range(300):
+        region.put(f"row{i % 40:03}", "cf", "q", i)
+    region.wal.flush_sync()
+    flushed = {hfile.path for hfile in region.hfiles}
+    assert flushed
+
+    reopened = hbase_lsm.HRegion("r1", str(tmp_path), memstore_size=1500)
+
+    assert {hfile.path for hfile in reopened.hfiles} == flushed
+    for hfile in reopened.hfiles:
+        for kv in hfile.iter_kvs():
+            assert reopened.row_filter.might_contain(kv.row)
+            assert reopened.get(kv.row, "cf", "q") is not None
+
+
+def test_retired_hfile_is_removed_after_its_last_reader(tmp_path):
+    hfile = write_hfile(str(tmp_path / "h.db"), sample_kvs(rows=10, versions=1))
+
+    assert hfile.acquire()
+    hfile.retire()
+    # Still readable while pinned, but no new reader can pin it
+    assert hfile.get("row003", "a", "q").value == {"r": 3, "v": 0}
+    assert os.path.exists(hfile.path)
+    assert not hfile.acquire()
+
+    hfile.release()
+    assert not os.path.exists(hfile.path)
+    assert not os.path.exists(hfile.bloom_path)
+
+
+def test_keyvalue_larger_than_a_block_gets_its_own_block(tmp_path, ticking_clock):
+    big = "x" * 70_000
+    region = hbase_lsm.HRegion("r1", str(tmp_path), memstore_size=200_000)
+    for i in range(4):
+        region.put(f"row{i}", "cf", "q", big)
+    region.wal.flush_sync()
+
+    assert region.hfiles
+    for hfile in region.hfiles:
+        assert all(end > start for start, end in hfile._block_spans)
+    for i in range(4):
+        assert region.get(f"row{i}", "cf", "q") == big
+    reopened = hbase_lsm.HRegion("r1", str(tmp_path), memstore_size=200_000)
+    assert {hfile.path for hfile in reopened.hfiles} == {hfile.path for hfile in region.hfiles}
+
+
+def test_wal_flush_sync_reports_a_failed_fsync(tmp_path, monkeypatch):
+    wal = hbase_lsm.WAL(str(tmp_path / "wal" / "r1.log"))
+    wal.append(hbase_lsm.KeyValue("row0", "cf", "q", 0)).result(timeout=5)
+    wal.flush_sync()
+
+    def failing_fsync(fd):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(hbase_lsm.os, "fsync", failing_fsync)
+    future = wal.append(hbase_lsm.KeyValue("row1", "cf", "q", 1))
+    with pytest.raises(OSError):
+        future.result(timeout=5)
+    with pytest.raises(OSError):
+        wal.flush_sync()